@@ -3,11 +3,10 @@ import sys
 import json
 import uuid
 import typing
-from functools import lru_cache
 from pathlib import Path
 from enum import Enum
 from dataclasses import dataclass
-from collections import defaultdict
+from collections import Counter, defaultdict
 import click
 import yaml
 from django.db import transaction  # type: ignore
@@ -15,7 +14,21 @@ from yaml.representer import Representer
 from pydantic import ValidationError
 from ..metadata import lookup
 from ..utils.django import init_django  # type: ignore
-from ..utils.people import get_data_path, get_all_abbreviations
+from ..utils.people import (
+    get_data_path,
+    get_all_abbreviations,
+    get_file_index,
+    file_moved,
+)
+from ..utils.people.loader import load_yaml_models
+from ..utils.people.changes import (
+    COMMITTEES_COMMIT_KEY,
+    get_people_repo,
+    get_repo_changes,
+    get_synced_commit,
+    set_synced_commit,
+)
+from ..utils.people.names import NameIndex
 from ..utils.people.to_database import CancelTransaction
 from ..models.committees import Committee, ScrapeCommittee
 from ..models.people import Person
@@ -23,6 +36,11 @@ from ..models.people import Person
 yaml.SafeDumper.add_representer(defaultdict, Representer.represent_dict)
 yaml.SafeDumper.add_multi_representer(Enum, Representer.represent_str)  # type: ignore
 
+# scraped names with no exact match can optionally (--fuzzy-match-distance) be
+# matched to names within this edit distance, off by default since a distance
+# of even 1 can pick the wrong person (e.g. Dunn/Dunne)
+FUZZY_MATCH_DISTANCE = 0
+
 
 @dataclass
 class DirectoryMergePlan:
@@ -33,49 +51,70 @@ class DirectoryMergePlan:
 
 
 class PersonMatcher:
-    def __init__(self, abbr: str, directory: typing.Optional[Path] = None):
+    def __init__(
+        self,
+        abbr: str,
+        directory: typing.Optional[Path] = None,
+        max_distance: int = FUZZY_MATCH_DISTANCE,
+    ):
         self.abbr = abbr
-        # chamber -> name piece -> id set
-        self.current_people: dict[str, dict[str, set[str]]] = {
-            "upper": {},
-            "lower": {},
-            "legislature": {},
+        # chamber -> name index
+        self.current_people: dict[str, NameIndex] = {
+            "upper": NameIndex(max_distance),
+            "lower": NameIndex(max_distance),
+            "legislature": NameIndex(max_distance),
         }
         self.all_ids: set[str] = set()
+        # (chamber, name) -> id, cleared whenever names are added
+        self._cache: dict[tuple[str, str], typing.Optional[str]] = {}
 
         # allow directory override for testing purposes
         if not directory:
             directory = get_data_path(abbr) / "legislature"
 
         # read in people with current roles
-        for filename in directory.glob("*.yml"):
-            person: Person = Person.load_yaml(filename)
+        for _, person in load_yaml_models(Person, directory.glob("*.yml")):
             chamber = ""
             for role in person.roles:
                 if role.is_active():
                     chamber = role.type
                     break
-            self.add_name(chamber, person.name, person.id)
-            if person.family_name:
-                self.add_name(chamber, person.family_name, person.id)
-            for name in person.other_names:
-                self.add_name(chamber, name.name, person.id)
+            self.add_person(chamber, person)
+
+    def _index(self, chamber: str) -> NameIndex:
+        if chamber not in self.current_people:
+            self.current_people[chamber] = NameIndex(
+                self.current_people["legislature"].max_distance
+            )
+        return self.current_people[chamber]
+
+    def add_person(self, chamber: str, person: Person) -> None:
+        self.all_ids.add(person.id)
+        self._cache.clear()
+        self._index(chamber).add_person(person)
+        # add to legislature too
+        if chamber != "legislature":
+            self.current_people["legislature"].add_person(person)
 
     def add_name(self, chamber: str, name_piece: str, id_: str) -> None:
-        name_piece = name_piece.lower()
         self.all_ids.add(id_)
-        if name_piece in self.current_people[chamber]:
-            self.current_people[chamber][name_piece].add(id_)
-        else:
-            self.current_people[chamber][name_piece] = {id_}
+        self._cache.clear()
+        self._index(chamber).add(name_piece, id_)
         # add to legislature too
         if chamber != "legislature":
             self.add_name("legislature", name_piece, id_)
 
-    @lru_cache(500)
     def match(self, chamber: str, name: str) -> typing.Optional[str]:
-        name = name.lower()
-        candidates = self.current_people[chamber].get(name, None)
+        key = (chamber, name)
+        if key not in self._cache:
+            # the cache never needs to be bigger than the roster
+            if len(self._cache) > max(len(self.all_ids), 100) * 4:
+                self._cache.clear()
+            self._cache[key] = self._match(chamber, name)
+        return self._cache[key]
+
+    def _match(self, chamber: str, name: str) -> typing.Optional[str]:
+        candidates = self._index(chamber).lookup(name)
         if not candidates:
             click.secho(
                 f"  no candidates while attempting to match {chamber} {name}",
@@ -95,74 +134,140 @@ class PersonMatcher:
         return id_ in self.all_ids
 
 
-@lru_cache(5)
-def _parent_lookup(jurisdiction_id: str, chamber: str, parent: str) -> str:
-    from openstates.data.models import Organization
+COMMITTEE_CLASSIFICATIONS = ("committee", "subcommittee")
+CHAMBER_CLASSIFICATIONS = ("upper", "lower", "legislature")
+BATCH_SIZE = 1000
 
-    if parent:
-        return parent
-    else:
-        return Organization.objects.get(
-            jurisdiction_id=jurisdiction_id, classification=chamber
-        ).id
 
+def load_committees(committees: list[Committee]) -> list[tuple[bool, bool, bool]]:
+    """
+    Sync committees to the database, returning (created, updated, name_changed)
+    for each.
 
-def committee_to_db(com: Committee) -> tuple[bool, bool, bool]:
+    Existing committees, their chambers and all memberships are fetched in
+    two queries.  Only memberships that were added or removed are written,
+    so unchanged memberships keep their ids.
+    """
     from openstates.data.models import Organization, Membership
+    from django.db.models import Q  # type: ignore
+    from django.utils import timezone  # type: ignore
+
+    com_ids = [com.id for com in committees]
+    jurisdiction_ids = {com.jurisdiction for com in committees}
+    existing = {}
+    chambers = {}
+    for org in Organization.objects.filter(
+        Q(id__in=com_ids)
+        | Q(
+            jurisdiction_id__in=jurisdiction_ids,
+            classification__in=CHAMBER_CLASSIFICATIONS,
+        )
+    ):
+        if org.classification in CHAMBER_CLASSIFICATIONS:
+            chambers[(org.jurisdiction_id, org.classification)] = org.id
+        else:
+            existing[org.id] = org
+    memberships = defaultdict(list)
+    for membership in Membership.objects.filter(organization_id__in=com_ids):
+        memberships[membership.organization_id].append(membership)
+
+    now = timezone.now()
+    results = []
+    to_create = []
+    to_update = []
+    memberships_to_delete = []
+    memberships_to_create = []
+    for com in committees:
+        created = updated = name_changed = False
+        if com.parent:
+            parent_id = com.parent
+        elif (com.jurisdiction, com.chamber) in chambers:
+            parent_id = chambers[(com.jurisdiction, com.chamber)]
+        else:
+            raise Organization.DoesNotExist(
+                f"no {com.chamber} organization for {com.jurisdiction}"
+            )
 
-    updated = False
-    name_changed = False
+        fields = {
+            "jurisdiction_id": com.jurisdiction,
+            "parent_id": parent_id,
+            "classification": com.classification,
+            "extras": com.extras,
+        }
+        for key_name in ("links", "sources", "other_names"):
+            fields[key_name] = [n.dict() for n in getattr(com, key_name)]
+
+        db_com = existing.get(com.id)
+        if db_com is None:
+            db_com = Organization(id=com.id, name=com.name, **fields)
+            to_create.append(db_com)
+            created = True
+        else:
+            if db_com.name != com.name:
+                updated = name_changed = True
+                db_com.name = com.name
+            for field, value in fields.items():
+                if getattr(db_com, field) != value:
+                    setattr(db_com, field, value)
+                    updated = True
+
+        # compare members as multisets, only writing the difference
+        wanted = Counter((m.person_id, m.name, m.role) for m in com.members)
+        for membership in memberships[com.id]:
+            key = (membership.person_id, membership.person_name, membership.role)
+            if wanted[key]:
+                wanted[key] -= 1
+            else:
+                memberships_to_delete.append(membership.id)
+                updated = True
+        for (person_id, name, role), count in wanted.items():
+            for _ in range(count):
+                memberships_to_create.append(
+                    Membership(
+                        role=role,
+                        person_name=name,
+                        person_id=person_id,
+                        organization_id=com.id,
+                    )
+                )
+                updated = True
 
-    db_com, created = Organization.objects.get_or_create(
-        id=com.id,
-        jurisdiction_id=com.jurisdiction,
-        parent_id=_parent_lookup(com.jurisdiction, com.chamber, com.parent),
-        classification=com.classification,
-        defaults=dict(name=com.name, extras=com.extras),
+        if updated and not created:
+            # bulk_update doesn't touch auto_now fields
+            db_com.updated_at = now
+            to_update.append(db_com)
+        # don't set updated to true in return if created
+        results.append((created, updated and not created, name_changed))
+
+    # subcommittees after committees so parents are always created first
+    to_create.sort(key=lambda org: org.classification == "subcommittee")
+    Organization.objects.bulk_create(to_create, batch_size=BATCH_SIZE)
+    Organization.objects.bulk_update(
+        to_update,
+        [
+            "name",
+            "jurisdiction_id",
+            "parent_id",
+            "classification",
+            "extras",
+            "links",
+            "sources",
+            "other_names",
+            "updated_at",
+        ],
+        batch_size=BATCH_SIZE,
     )
+    for i in range(0, len(memberships_to_delete), BATCH_SIZE):
+        Membership.objects.filter(
+            id__in=memberships_to_delete[i : i + BATCH_SIZE]
+        ).delete()
+    Membership.objects.bulk_create(memberships_to_create, batch_size=BATCH_SIZE)
 
-    if db_com.name != com.name:
-        updated = True
-        name_changed = True
-        db_com.name = com.name
-
-    if db_com.extras != com.extras:
-        updated = True
-        db_com.extras = com.extras
-
-    for key_name in ("links", "sources", "other_names"):
-        list_json = [n.dict() for n in getattr(com, key_name)]
-        if list_json != getattr(db_com, key_name):
-            setattr(db_com, key_name, list_json)
-            updated = True
-
-    existing_members = {
-        (m.person_id, m.person_name, m.role)
-        for m in db_com.memberships.all().select_related("person")
-    }
-    scraped_members = {(m.person_id, m.name, m.role) for m in com.members}
-
-    if existing_members != scraped_members:
-        # replace members
-        updated = True
-        new_memberships = [
-            Membership(
-                role=m.role,
-                person_name=m.name,
-                person_id=m.person_id,
-                organization=db_com,
-            )
-            for m in com.members
-        ]
-        db_com.memberships.all().delete()
-        Membership.objects.bulk_create(new_memberships)
+    return results
 
-    if updated:
-        db_com.save()
-        # don't set updated to true in return if created
-        if created:
-            updated = False
-    return created, updated, name_changed
+
+def committee_to_db(com: Committee) -> tuple[bool, bool, bool]:
+    return load_committees([com])[0]
 
 
 def merge_lists(orig: list, new: list, key_attr: str) -> list:
@@ -193,14 +298,16 @@ class CommitteeDir:
         abbr: str,
         raise_errors: bool = True,
         directory: typing.Optional[Path] = None,
+        fuzzy_match_distance: int = FUZZY_MATCH_DISTANCE,
     ):
         self.abbr = abbr
+        self.fuzzy_match_distance = fuzzy_match_distance
         # allow overriding directory explicitly, useful for testing
         self.directory = directory if directory else get_data_path(abbr) / "committees"
         # chamber -> name -> Committee
-        self.coms_by_parent_and_name: defaultdict[str, dict[str, Committee]] = (
-            defaultdict(dict)
-        )
+        self.coms_by_parent_and_name: defaultdict[
+            str, dict[str, Committee]
+        ] = defaultdict(dict)
         self.errors = []
         # person matcher will be prepared if/when needed
         self.person_matcher: typing.Optional[PersonMatcher] = None
@@ -208,14 +315,13 @@ class CommitteeDir:
         # make sure a committees dir exists
         self.directory.mkdir(parents=True, exist_ok=True)
 
-        for filename in self.directory.glob("*.yml"):
-            try:
-                com: Committee = Committee.load_yaml(filename)
-                self.coms_by_parent_and_name[com.parent or com.chamber][com.name] = com
-            except ValidationError as ve:
-                if raise_errors:
-                    raise
-                self.errors.append((filename, ve))
+        errors: list[tuple[Path, Exception]] = []
+        for _, com in load_yaml_models(Committee, self.directory.glob("*.yml"), errors):
+            self.coms_by_parent_and_name[com.parent or com.chamber][com.name] = com
+        for filename, error in errors:
+            if raise_errors or not isinstance(error, ValidationError):
+                raise error
+            self.errors.append((filename, error))
 
     def merge_committees(self, orig: Committee, new: ScrapeCommittee) -> Committee:
         # need new parent id
@@ -277,7 +383,7 @@ class CommitteeDir:
         if com_id.startswith("ocd-organization"):
             com_id = com_id.split("/")[1]
         assert len(com_id) == 36
-        files = list(self.directory.glob(f"*{com_id}.yml"))
+        files = get_file_index(self.directory).find_all(com_id)
         if len(files) == 1:
             return files[0]
         else:
@@ -305,6 +411,7 @@ class CommitteeDir:
                 Dumper=yaml.SafeDumper,
                 sort_keys=False,
             )
+        file_moved(None, filename)
 
     def add_committee(self, committee: ScrapeCommittee) -> None:
         parent_id: typing.Optional[str]
@@ -329,7 +436,9 @@ class CommitteeDir:
 
     def ingest_scraped_json(self, input_dir: str) -> list[ScrapeCommittee]:
         if not self.person_matcher:
-            self.person_matcher = PersonMatcher(self.abbr)
+            self.person_matcher = PersonMatcher(
+                self.abbr, max_distance=self.fuzzy_match_distance
+            )
 
         scraped_data = []
         for filename in Path(input_dir).glob("*"):
@@ -349,7 +458,9 @@ class CommitteeDir:
 
     def update_unmatched_names(self) -> None:
         if not self.person_matcher:
-            self.person_matcher = PersonMatcher(self.abbr)
+            self.person_matcher = PersonMatcher(
+                self.abbr, max_distance=self.fuzzy_match_distance
+            )
 
         # find all committees with unmatched names
         for coms_for_chamber in self.coms_by_parent_and_name.values():
@@ -406,7 +517,18 @@ class CommitteeDir:
             to_merge=to_merge,
         )
 
-    def to_database(self, purge: bool) -> None:
+    def to_database(
+        self,
+        purge: bool,
+        changed_ids: typing.Optional[set[str]] = None,
+        removed_ids: typing.Optional[set[str]] = None,
+    ) -> None:
+        """
+        Sync committees to the database.
+
+        If changed_ids is given only those committees are loaded, and only
+        removed_ids (committees whose files were deleted) are purged.
+        """
         from openstates.data.models import Organization
 
         ids = set()
@@ -415,30 +537,33 @@ class CommitteeDir:
         name_change_count = 0
 
         jurisdiction_id = lookup(abbr=self.abbr).jurisdiction_id
-        existing_ids = set(
-            Organization.objects.filter(
-                jurisdiction_id=jurisdiction_id,
-                classification__in=("committee", "subcommittee"),
-            ).values_list("id", flat=True)
+        existing = Organization.objects.filter(
+            jurisdiction_id=jurisdiction_id,
+            classification__in=("committee", "subcommittee"),
         )
+        if changed_ids is not None:
+            existing = existing.filter(id__in=removed_ids or set())
+        existing_ids = set(existing.values_list("id", flat=True))
+
+        committees = [
+            committee
+            for coms in self.coms_by_parent_and_name.values()
+            for committee in coms.values()
+            if changed_ids is None or committee.id in changed_ids
+        ]
+        results = load_committees(committees)
+        for committee, (created, updated, name_changed) in zip(committees, results):
+            ids.add(committee.id)
 
-        for parent, committees in self.coms_by_parent_and_name.items():
-            # this sorted hack ensures subcommittees are processed after all committees
-            for name, committee in sorted(
-                committees.items(), key=lambda c: c[1].parent or ""
-            ):
-                ids.add(committee.id)
-                created, updated, name_changed = committee_to_db(committee)
-
-                if created:
-                    click.secho(f"created committee {name}", fg="cyan", bold=True)
-                    created_count += 1
-                elif updated:
-                    click.secho(f"updated committee {name}", fg="cyan")
-                    updated_count += 1
+            if created:
+                click.secho(f"created committee {committee.name}", fg="cyan", bold=True)
+                created_count += 1
+            elif updated:
+                click.secho(f"updated committee {committee.name}", fg="cyan")
+                updated_count += 1
 
-                if name_changed:
-                    name_change_count += 1
+            if name_changed:
+                name_change_count += 1
 
         missing_ids = existing_ids - ids
 
@@ -472,11 +597,18 @@ def main() -> None:
 @click.argument("abbr")
 @click.argument("input_dir")
 @click.option("--interactive/--no-interactive", default=False)
-def merge(abbr: str, input_dir: str, interactive: bool) -> None:
+@click.option(
+    "--fuzzy-match-distance",
+    default=FUZZY_MATCH_DISTANCE,
+    help="Match member names with no exact match to names within this edit distance.",
+)
+def merge(
+    abbr: str, input_dir: str, interactive: bool, fuzzy_match_distance: int
+) -> None:
     """
     Merge scraped committee data into repo.
     """
-    comdir = CommitteeDir(abbr)
+    comdir = CommitteeDir(abbr, fuzzy_match_distance=fuzzy_match_distance)
 
     coms_by_parent: defaultdict[str, list[ScrapeCommittee]] = defaultdict(list)
     scraped_data = comdir.ingest_scraped_json(input_dir)
@@ -530,7 +662,12 @@ def merge(abbr: str, input_dir: str, interactive: bool) -> None:
 @click.option(
     "--fix/--no-fix", default=False, help="Enable/disable automatic fixing of data."
 )
-def lint(abbreviations: list[str], fix: bool) -> None:
+@click.option(
+    "--fuzzy-match-distance",
+    default=FUZZY_MATCH_DISTANCE,
+    help="Match member names with no exact match to names within this edit distance.",
+)
+def lint(abbreviations: list[str], fix: bool, fuzzy_match_distance: int) -> None:
     """
     Lint committee YAML files.
     """
@@ -538,7 +675,9 @@ def lint(abbreviations: list[str], fix: bool) -> None:
         abbreviations = get_all_abbreviations()
 
     for abbr in abbreviations:
-        comdir = CommitteeDir(abbr, raise_errors=False)
+        comdir = CommitteeDir(
+            abbr, raise_errors=False, fuzzy_match_distance=fuzzy_match_distance
+        )
         errors = 0
         click.secho(f"==== {abbr} ====")
         for filename, error in comdir.errors:
@@ -568,7 +707,14 @@ def lint(abbreviations: list[str], fix: bool) -> None:
     default=False,
     help="Operate in safe mode, no changes will be written to database.",
 )
-def to_database(abbreviations: list[str], purge: bool, safe: bool) -> None:
+@click.option(
+    "--incremental/--no-incremental",
+    default=False,
+    help="Only load files changed in git since the last sync.",
+)
+def to_database(
+    abbreviations: list[str], purge: bool, safe: bool, incremental: bool
+) -> None:
     """
     Sync YAML files to DB.
     """
@@ -577,16 +723,46 @@ def to_database(abbreviations: list[str], purge: bool, safe: bool) -> None:
     if not abbreviations:
         abbreviations = get_all_abbreviations()
 
+    repo = get_people_repo() if incremental else None
+    head = repo.head.commit.hexsha if repo else ""
+
     for abbr in abbreviations:
         click.secho("==== {} ====".format(abbr), bold=True)
-        comdir = CommitteeDir(abbr)
+        jurisdiction_id = lookup(abbr=abbr).jurisdiction_id
+        changes = None
+        if repo:
+            changes = get_repo_changes(
+                repo,
+                get_synced_commit(jurisdiction_id, COMMITTEES_COMMIT_KEY),
+                abbr,
+                head,
+            )
+        if changes:
+            changed_ids: typing.Optional[set[str]] = {
+                f"ocd-organization/{filename.stem[-36:]}"
+                for filename in changes.committees
+            }
+            removed_ids: typing.Optional[set[str]] = changes.removed_committees
+            click.secho(
+                f"{len(changes.committees)} changed, "
+                f"{len(changes.removed_committees)} removed "
+                f"since {changes.since[:8]}"
+            )
+        else:
+            changed_ids = removed_ids = None
 
         if safe:
             click.secho("running in safe mode, no changes will be made", fg="magenta")
 
         try:
             with transaction.atomic():
-                comdir.to_database(purge=purge)
+                if changed_ids is None or changed_ids or removed_ids:
+                    comdir = CommitteeDir(abbr)
+                    comdir.to_database(
+                        purge=purge, changed_ids=changed_ids, removed_ids=removed_ids
+                    )
+                if repo:
+                    set_synced_commit(jurisdiction_id, COMMITTEES_COMMIT_KEY, head)
                 if safe:
                     click.secho("ran in safe mode, no changes were made", fg="magenta")
                     raise CancelTransaction()
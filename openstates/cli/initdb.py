@@ -1,5 +1,9 @@
 # type: ignore
 # too many django types in this to type for now
+import sys
+import typing
+from dataclasses import dataclass, field
+import click
 from ..metadata import (
     STATES_BY_ABBR,
     NON_US_INTERNATIONAL_ABBRS,
@@ -8,101 +12,288 @@ from ..metadata import (
 from ..utils.django import init_django
 from django.core import management
 from django.db import transaction  # type: ignore
+from django.db.utils import IntegrityError  # type: ignore
 
 
-def create_division(division_id: str, name: str, jurisdiction: str):
-    from ..data.models import Division
+@dataclass
+class Row:
+    # fields an existing row must match, anything else is a conflict
+    lookup: dict[str, typing.Any]
+    # fields only set when creating, as with get_or_create's defaults
+    defaults: dict[str, typing.Any] = field(default_factory=dict)
+
+
+@dataclass
+class Plan:
+    """every row initdb should create, keyed the way it is looked up"""
+
+    divisions: dict[str, Row] = field(default_factory=dict)
+    jurisdictions: dict[str, Row] = field(default_factory=dict)
+    organizations: dict[str, Row] = field(default_factory=dict)
+    # (label, organization_id, division_id) -> Row
+    posts: dict[tuple[str, str, str], Row] = field(default_factory=dict)
+
 
+@dataclass
+class Drift:
+    table: str
+    missing: list = field(default_factory=list)
+    # existing rows whose lookup fields differ: (key, field, wanted, actual)
+    conflicts: list = field(default_factory=list)
+    # existing rows whose default fields differ, these are left alone
+    changed: list = field(default_factory=list)
+
+
+def plan_division(plan: Plan, division_id: str, name: str, jurisdiction: str) -> None:
     if jurisdiction in NON_US_INTERNATIONAL_ABBRS:
         country = jurisdiction.lower()
     else:
         country = "us"
-
-    return Division.objects.get_or_create(
-        id=division_id,
-        country=country,
+    # first plan for a division wins, as the first get_or_create would
+    plan.divisions.setdefault(
+        division_id,
         # TODO: allow changing name
-        defaults=dict(name=name),
-    )[0]
-
+        Row(lookup=dict(id=division_id, country=country), defaults=dict(name=name)),
+    )
 
-def create_chamber(juris, parent, chamber, abbr) -> None:
-    from ..data.models import Organization, Post
 
+def plan_chamber(
+    plan: Plan, juris_id: str, juris_name: str, parent_id: str, chamber, abbr: str
+) -> None:
     if chamber.chamber_type != "unicameral":
-        post_parent, created = Organization.objects.get_or_create(
-            id=chamber.organization_id,
-            classification=chamber.chamber_type,
-            parent_id=parent.id,
-            jurisdiction_id=juris.id,
-            name=chamber.name,
+        post_parent_id = chamber.organization_id
+        plan.organizations[chamber.organization_id] = Row(
+            lookup=dict(
+                id=chamber.organization_id,
+                classification=chamber.chamber_type,
+                parent_id=parent_id,
+                jurisdiction_id=juris_id,
+                name=chamber.name,
+            )
         )
     else:
         # parent is unicameral org
-        post_parent = parent
+        post_parent_id = parent_id
 
-    # create divisions and posts
+    # divisions and posts
     for district in chamber.districts:
-        post_div = create_division(
-            district.division_id, f"{juris.name} {chamber.name} {district.name}", abbr
+        plan_division(
+            plan,
+            district.division_id,
+            f"{juris_name} {chamber.name} {district.name}",
+            abbr,
         )
-        Post.objects.get_or_create(
-            label=district.name,
-            organization=post_parent,
-            division=post_div,
-            # TODO: allow changing role & max_memberships
-            defaults=dict(
-                role=district.title_override or chamber.title,
-                maximum_memberships=district.num_seats,
+        key = (district.name, post_parent_id, district.division_id)
+        plan.posts.setdefault(
+            key,
+            Row(
+                lookup=dict(
+                    label=district.name,
+                    organization_id=post_parent_id,
+                    division_id=district.division_id,
+                ),
+                # TODO: allow changing role & max_memberships
+                defaults=dict(
+                    role=district.title_override or chamber.title,
+                    maximum_memberships=district.num_seats,
+                ),
             ),
         )
 
 
-def create_full_jurisdiction(state) -> None:
-    from ..data.models import Jurisdiction, Organization
-
+def plan_full_jurisdiction(plan: Plan, state) -> None:
     if state.abbr in INTERNATIONAL_ABBRS:
         classification = "country"
     else:
         classification = "state"
 
-    div = create_division(state.division_id, state.name, state.abbr)
-    juris, created = Jurisdiction.objects.get_or_create(
-        id=state.jurisdiction_id,
-        name=state.name,
-        division=div,
-        classification=classification,
+    plan_division(plan, state.division_id, state.name, state.abbr)
+    plan.jurisdictions[state.jurisdiction_id] = Row(
+        lookup=dict(
+            id=state.jurisdiction_id,
+            name=state.name,
+            division_id=state.division_id,
+            classification=classification,
+        ),
         defaults=dict(url=state.url),
     )
-    leg, created = Organization.objects.get_or_create(
-        id=state.legislature_organization_id,
-        classification="legislature",
-        jurisdiction=juris,
+    plan.organizations[state.legislature_organization_id] = Row(
+        lookup=dict(
+            id=state.legislature_organization_id,
+            classification="legislature",
+            jurisdiction_id=state.jurisdiction_id,
+        ),
         defaults=dict(name=state.legislature_name),
     )
-    # create executive
-    Organization.objects.get_or_create(
-        id=state.executive_organization_id,
-        classification="executive",
-        jurisdiction=juris,
+    # executive
+    plan.organizations[state.executive_organization_id] = Row(
+        lookup=dict(
+            id=state.executive_organization_id,
+            classification="executive",
+            jurisdiction_id=state.jurisdiction_id,
+        ),
         defaults=dict(name=state.executive_name),
     )
 
-    if state.unicameral:
-        create_chamber(juris, leg, state.legislature, state.abbr)
-    else:
-        create_chamber(juris, leg, state.lower, state.abbr)
-        create_chamber(juris, leg, state.upper, state.abbr)
+    chambers = [state.legislature] if state.unicameral else [state.lower, state.upper]
+    for chamber in chambers:
+        plan_chamber(
+            plan,
+            state.jurisdiction_id,
+            state.name,
+            state.legislature_organization_id,
+            chamber,
+            state.abbr,
+        )
+
+
+def _compare(table: str, desired: dict, existing: dict) -> Drift:
+    drift = Drift(table)
+    for key, row in desired.items():
+        obj = existing.get(key)
+        if obj is None:
+            drift.missing.append(key)
+            continue
+        for fields, found in (
+            (row.lookup, drift.conflicts),
+            (row.defaults, drift.changed),
+        ):
+            for name, wanted in fields.items():
+                actual = getattr(obj, name)
+                if actual != wanted:
+                    found.append((key, name, wanted, actual))
+    return drift
+
+
+def get_drift(plan: Plan) -> list[Drift]:
+    """compare a plan to the database, with one query per table"""
+    from ..data.models import Division, Jurisdiction, Organization, Post
+
+    posts = {
+        (p.label, p.organization_id, p.division_id): p
+        for p in Post.objects.filter(organization_id__in={key[1] for key in plan.posts})
+    }
+    return [
+        _compare(
+            "division", plan.divisions, Division.objects.in_bulk(list(plan.divisions))
+        ),
+        _compare(
+            "jurisdiction",
+            plan.jurisdictions,
+            Jurisdiction.objects.in_bulk(list(plan.jurisdictions)),
+        ),
+        _compare(
+            "organization",
+            plan.organizations,
+            Organization.objects.in_bulk(list(plan.organizations)),
+        ),
+        _compare("post", plan.posts, posts),
+    ]
+
 
+def apply_plan(plan: Plan) -> list[Drift]:
+    """
+    Insert the rows in plan that don't exist yet.
 
-def load_jurisdictions() -> None:
-    for name, state in STATES_BY_ABBR.items():
-        print("loading", name)
-        create_full_jurisdiction(state)
+    Rows that exist but don't match their lookup fields can't be fixed by
+    inserting, so they raise an IntegrityError before anything is written.
+    """
+    from ..data.models import Division, Jurisdiction, Organization, Post
 
+    drifts = get_drift(plan)
+    for drift in drifts:
+        if drift.conflicts:
+            key, name, wanted, actual = drift.conflicts[0]
+            raise IntegrityError(
+                f"{drift.table} {key} has {name}={actual!r}, expected {wanted!r}"
+            )
 
-def main() -> None:
+    models = {
+        "division": (Division, plan.divisions),
+        "jurisdiction": (Jurisdiction, plan.jurisdictions),
+        "organization": (Organization, plan.organizations),
+        "post": (Post, plan.posts),
+    }
+    for drift in drifts:
+        ModelCls, rows = models[drift.table]
+        ModelCls.objects.bulk_create(
+            [
+                ModelCls(**rows[key].lookup, **rows[key].defaults)
+                for key in drift.missing
+            ],
+            batch_size=1000,
+            ignore_conflicts=True,
+        )
+    return drifts
+
+
+def create_division(division_id: str, name: str, jurisdiction: str):
+    from ..data.models import Division
+
+    plan = Plan()
+    plan_division(plan, division_id, name, jurisdiction)
+    apply_plan(plan)
+    return Division.objects.get(id=division_id)
+
+
+def create_chamber(juris, parent, chamber, abbr) -> None:
+    plan = Plan()
+    plan_chamber(plan, juris.id, juris.name, parent.id, chamber, abbr)
+    apply_plan(plan)
+
+
+def create_full_jurisdiction(state) -> None:
+    plan = Plan()
+    plan_full_jurisdiction(plan, state)
+    apply_plan(plan)
+
+
+def plan_jurisdictions() -> Plan:
+    plan = Plan()
+    for state in STATES_BY_ABBR.values():
+        plan_full_jurisdiction(plan, state)
+    return plan
+
+
+def load_jurisdictions() -> list[Drift]:
+    drifts = apply_plan(plan_jurisdictions())
+    for drift in drifts:
+        print(f"{drift.table}: created {len(drift.missing)}")
+    return drifts
+
+
+def print_drift(drifts: list[Drift]) -> int:
+    """print drifts, returning the number of rows that differ"""
+    count = 0
+    for drift in drifts:
+        if drift.missing:
+            click.secho(f"{len(drift.missing)} missing {drift.table} rows", fg="yellow")
+        for key, name, wanted, actual in drift.conflicts:
+            click.secho(
+                f"{drift.table} {key}: {name} is {actual!r}, expected {wanted!r}",
+                fg="red",
+            )
+        for key, name, wanted, actual in drift.changed:
+            click.secho(
+                f"{drift.table} {key}: {name} is {actual!r}, metadata has {wanted!r}"
+            )
+        count += len(drift.missing) + len(drift.conflicts) + len(drift.changed)
+    return count
+
+
+@click.command()
+@click.option(
+    "--check",
+    is_flag=True,
+    help="Report differences between metadata and the database without writing.",
+)
+def main(check: bool) -> None:
     init_django()
+    if check:
+        if print_drift(get_drift(plan_jurisdictions())):
+            sys.exit(1)
+        click.secho("database matches metadata", fg="green")
+        return
     management.call_command("migrate")
     with transaction.atomic():
         load_jurisdictions()
@@ -9,8 +9,7 @@ import click
 import boto3  # type: ignore
 import logging
 import time
-import yaml
-from django.db import transaction, connection  # type: ignore
+from django.db import transaction  # type: ignore
 from ..utils import abbr_to_jid
 from ..utils.django import init_django  # type: ignore
 from ..models.people import Person, Role, Party, Link
@@ -22,15 +21,30 @@ from ..utils.people import (
     download_state_images,
     load_municipalities,
 )
+from ..utils.people.loader import load_yaml_models
+from ..utils.people.images import ImageSync, LocalStore, get_image_store
 from ..utils.people.retire import retire_person, add_vacancy, retire_file
-from ..utils.people.lint_people import Validator, BadVacancy, PersonType
+from ..utils.people.changes import (
+    PEOPLE_COMMIT_KEY,
+    get_people_repo,
+    get_repo_changes,
+    get_synced_commit,
+    set_synced_commit,
+)
+from ..utils.people.lint_people import BadVacancy, LINT_WORKERS, lint_states
 from ..utils.people.to_database import (
     create_municipalities,
     create_parties,
-    load_person,
+    find_merges,
+    load_people,
+    merge_people,
     CancelTransaction,
 )
-from ..utils.people.merge import process_scrape_dir, incoming_merge
+from ..utils.people.merge import (
+    process_scrape_dir,
+    incoming_merge,
+    benchmark_merge_index,
+)
 from ..utils.instrument import Instrumentation
 
 stats = Instrumentation()
@@ -143,8 +157,7 @@ class Summarizer:
         path = get_data_path(abbr) / "legislature"
         filenames = path.glob("*.yml")
 
-        for filename in filenames:
-            person: Person = Person.load_yaml(filename)
+        for _, person in load_yaml_models(Person, filenames):
             self.summarize(person)
 
 
@@ -183,13 +196,13 @@ def write_csv(files: list[Path], jurisdiction_id: str, output_filename: str) ->
         )
         out.writeheader()
 
-        for filename in files:
-            try:
-                person: Person = Person.load_yaml(filename)
-            except Exception as e:
-                click.secho(f"Cannot load {filename} :: {e}")
-                raise
+        errors: list[tuple[Path, Exception]] = []
+        people = load_yaml_models(Person, files, errors)
+        for filename, error in errors:
+            click.secho(f"Cannot load {filename} :: {error}")
+            raise error
 
+        for filename, person in people:
             # current party
             for p_role in person.party:
                 if p_role.is_active():
@@ -250,47 +263,6 @@ def write_csv(files: list[Path], jurisdiction_id: str, output_filename: str) ->
     click.secho(f"processed {len(files)} files", fg="green")
 
 
-def lint_dir(
-        abbr: str, verbose: bool, municipal: bool, date: str, fix: bool, save_all: bool, ignore_role_warnings: bool
-) -> int:  # pragma: no cover
-    state_dir = get_data_path(abbr)
-    legislative_filenames = (state_dir / "legislature").glob("*.yml")
-    executive_filenames = (state_dir / "executive").glob("*.yml")
-    municipality_filenames = (state_dir / "municipalities").glob("*.yml")
-    retired_filenames = (state_dir / "retired").glob("*.yml")
-
-    # a hack... need to get data path then traverse up
-    settings_file = state_dir.parents[1] / "settings.yml"
-    with open(settings_file) as f:
-        settings = yaml.safe_load(f)
-
-    try:
-        validator = Validator(abbr, settings, fix, save_all, ignore_role_warnings)
-    except BadVacancy:
-        sys.exit(-1)
-
-    all_filenames = [
-        (PersonType.LEGISLATIVE, legislative_filenames),
-        (PersonType.RETIRED, retired_filenames),
-        (PersonType.EXECUTIVE, executive_filenames),
-    ]
-
-    if municipal:
-        all_filenames.append((PersonType.MUNICIPAL, municipality_filenames))
-
-    for person_type, filenames in all_filenames:
-        for filename in filenames:
-            # load just the data here since validate_person will convert to Person and
-            # catch errors
-            with open(filename) as file:
-                data = yaml.safe_load(file)
-            validator.validate_person(data, filename, person_type)
-
-    error_count = validator.print_validation_report(verbose)
-
-    return error_count
-
-
 def _echo_org_status(org: typing.Any, created: bool, updated: bool) -> None:
     if created:
         click.secho(f"{org} created", fg="green")
@@ -298,33 +270,48 @@ def _echo_org_status(org: typing.Any, created: bool, updated: bool) -> None:
         click.secho(f"{org} updated", fg="yellow")
 
 
-def load_directory_to_database(files: list[Path], purge: bool) -> None:
+def load_directory_to_database(
+    files: list[Path], purge: bool, removed_ids: typing.Optional[set[str]] = None
+) -> None:
+    """
+    Load person files to the database.
+
+    files are normally every file for a jurisdiction, and anyone in the
+    database that isn't in them has been merged or needs purging.  For an
+    incremental load files are just the changed ones, and only removed_ids
+    (the people whose files were deleted) are checked for merges & purging.
+    """
     from openstates.data.models import Person as DjangoPerson
-    from openstates.data.models import BillSponsorship, PersonVote, Jurisdiction
+    from openstates.data.models import Jurisdiction
 
     ids = set()
-    merged = {}
     created_count = 0
     updated_count = 0
 
     all_data = []
     all_jurisdictions = []
     updated_jurisdictions = set()
-    for filename in files:
-        person: Person = Person.load_yaml(filename)
+    for filename, person in load_yaml_models(Person, files):
         all_data.append((person, filename))
         if person.roles:
             all_jurisdictions.append(person.roles[0].jurisdiction)
 
-    existing_ids = set(
-        DjangoPerson.objects.filter(
-            memberships__organization__jurisdiction_id__in=all_jurisdictions
-        ).values_list("id", flat=True)
-    )
+    if removed_ids is None:
+        existing_ids = set(
+            DjangoPerson.objects.filter(
+                memberships__organization__jurisdiction_id__in=all_jurisdictions
+            ).values_list("id", flat=True)
+        )
+    else:
+        existing_ids = set(
+            DjangoPerson.objects.filter(id__in=removed_ids).values_list(
+                "id", flat=True
+            )
+        )
 
-    for person, filename in all_data:
+    results = load_people([person for person, _ in all_data])
+    for (person, filename), (created, updated) in zip(all_data, results):
         ids.add(person.id)
-        created, updated = load_person(person)
 
         if created:
             click.secho(f"created person from {filename}", fg="cyan", bold=True)
@@ -339,47 +326,22 @@ def load_directory_to_database(files: list[Path], purge: bool) -> None:
     missing_ids = existing_ids - ids
 
     # check if missing ids are in need of a merge
-    for missing_id in missing_ids:
-        try:
-            found = DjangoPerson.objects.get(
-                identifiers__identifier=missing_id, identifiers__scheme="openstates"
-            )
-            merged[missing_id] = found.id
-        except DjangoPerson.DoesNotExist:
-            pass
-
+    merged = find_merges(missing_ids)
     if merged:
         click.secho(f"{len(merged)} removed via merge", fg="yellow")
         for old, new in merged.items():
             click.secho(f"   {old} => {new}", fg="yellow")
-            # first we do some raw SQL updates because the appropriate Django apps are part of
-            # openstates.org and therefore not installed, but not updating these tables
-            # causes foreign key constraint issues
-            with connection.cursor() as cursor:
-                cursor.execute(
-                    "UPDATE people_admin_unmatchedname SET matched_person_id = %s WHERE matched_person_id = %s",
-                    [new, old],
-                )
-                cursor.execute(
-                    "DELETE FROM people_admin_persondelta WHERE person_id = %s", [old]
-                )
-                cursor.execute(
-                    "DELETE FROM people_admin_personretirement WHERE person_id = %s",
-                    [old],
-                )
-            BillSponsorship.objects.filter(person_id=old).update(person_id=new)
-            PersonVote.objects.filter(voter_id=old).update(voter_id=new)
-            DjangoPerson.objects.filter(id=old).delete()
-            missing_ids.remove(old)
+        merge_people(merged)
+        missing_ids -= merged.keys()
 
     # ids that are still missing would need to be purged
     if missing_ids and not purge:
         click.secho(
             f"{len(missing_ids)} went missing, run with --purge to remove", fg="red"
         )
+        missing_people = DjangoPerson.objects.in_bulk(list(missing_ids))
         for id in missing_ids:
-            mobj = DjangoPerson.objects.get(pk=id)
-            click.secho(f"  {id}: {mobj}")
+            click.secho(f"  {id}: {missing_people[id]}")
         raise CancelTransaction()
     elif missing_ids and purge:
         click.secho(f"{len(missing_ids)} purged", fg="yellow")
@@ -601,7 +563,14 @@ def retire(
     "--skip-existing/--no-skip-existing",
     help="Skip processing for files that already exist on S3. (default: true)",
 )
-def sync_images(abbreviations: list[str], skip_existing: bool) -> None:
+@click.option(
+    "--local-dir",
+    default=None,
+    help="Sync to this local directory instead of S3.",
+)
+def sync_images(
+    abbreviations: list[str], skip_existing: bool, local_dir: typing.Optional[str]
+) -> None:
     """
     Download images and sync them to S3.
 
@@ -610,8 +579,17 @@ def sync_images(abbreviations: list[str], skip_existing: bool) -> None:
     if not abbreviations:
         abbreviations = get_all_abbreviations()
 
-    for abbr in abbreviations:
-        download_state_images(abbr, skip_existing)
+    store = LocalStore(local_dir) if local_dir else get_image_store()
+    syncer = ImageSync(store, skip_existing)
+    try:
+        for abbr in abbreviations:
+            counts = download_state_images(abbr, skip_existing, syncer)
+            click.secho(
+                f"{abbr}: "
+                + ", ".join(f"{count} {name}" for name, count in counts.items())
+            )
+    finally:
+        syncer.close()
 
 
 @main.command()
@@ -641,6 +619,12 @@ def sync_images(abbreviations: list[str], skip_existing: bool) -> None:
     default=False,
     help="Do not emit warnings for people with no active roles.",
 )
+@click.option(
+    "--workers",
+    type=int,
+    default=LINT_WORKERS,
+    help="Number of states to lint in parallel.",
+)
 def lint(
         abbreviations: list[str],
         verbose: bool,
@@ -649,6 +633,7 @@ def lint(
         fix: bool,
         save_all: bool,
         ignore_role_warnings: bool,
+        workers: int,
 ) -> None:
     """
     Lint YAML files.
@@ -660,9 +645,23 @@ def lint(
     if not abbreviations:
         abbreviations = get_all_abbreviations()
 
-    for abbr in abbreviations:
-        click.secho("==== {} ====".format(abbr), bold=True)
-        error_count += lint_dir(abbr, verbose, municipal, date, fix, save_all, ignore_role_warnings)
+    try:
+        reports = lint_states(
+            abbreviations, municipal, fix, save_all, ignore_role_warnings, workers
+        )
+    except BadVacancy as e:
+        click.secho(str(e), fg="red")
+        sys.exit(-1)
+
+    for report in reports:
+        click.secho("==== {} ====".format(report.abbr), bold=True)
+        error_count += report.print(verbose)
+
+    if len(reports) > 1:
+        click.secho("==== summary ====", bold=True)
+        for report in reports:
+            if report.error_count:
+                click.secho(f"{report.abbr}: {report.error_count} errors", fg="red")
 
     if error_count:
         click.secho(f"exiting with {error_count} errors", fg="red")
@@ -681,7 +680,14 @@ def lint(
     default=False,
     help="Operate in safe mode, no changes will be written to database.",
 )
-def to_database(abbreviations: list[str], purge: bool, safe: bool) -> None:
+@click.option(
+    "--incremental/--no-incremental",
+    default=False,
+    help="Only load files changed in git since the last sync.",
+)
+def to_database(
+    abbreviations: list[str], purge: bool, safe: bool, incremental: bool
+) -> None:
     """
     Sync YAML files to DB.
     """
@@ -692,6 +698,9 @@ def to_database(abbreviations: list[str], purge: bool, safe: bool) -> None:
     if not abbreviations:
         abbreviations = get_all_abbreviations()
 
+    repo = get_people_repo() if incremental else None
+    head = repo.head.commit.hexsha if repo else ""
+
     for abbr in abbreviations:
         click.secho("==== {} ====".format(abbr), bold=True)
         directory = get_data_path(abbr)
@@ -700,21 +709,44 @@ def to_database(abbreviations: list[str], purge: bool, safe: bool) -> None:
         with transaction.atomic():
             create_municipalities(municipalities)
 
-        person_files = list(
-            itertools.chain(
-                directory.glob("legislature/*.yml"),
-                directory.glob("executive/*.yml"),
-                directory.glob("municipalities/*.yml"),
-                directory.glob("retired/*.yml"),
+        jurisdiction_id = abbr_to_jid(abbr)
+        changes = None
+        if repo:
+            changes = get_repo_changes(
+                repo,
+                get_synced_commit(jurisdiction_id, PEOPLE_COMMIT_KEY),
+                abbr,
+                head,
             )
-        )
+        if changes:
+            person_files = changes.people
+            removed_ids: typing.Optional[set[str]] = changes.removed_people
+            click.secho(
+                f"{len(person_files)} changed, {len(changes.removed_people)} removed "
+                f"since {changes.since[:8]}"
+            )
+        else:
+            person_files = list(
+                itertools.chain(
+                    directory.glob("legislature/*.yml"),
+                    directory.glob("executive/*.yml"),
+                    directory.glob("municipalities/*.yml"),
+                    directory.glob("retired/*.yml"),
+                )
+            )
+            removed_ids = None
 
         if safe:
             click.secho("running in safe mode, no changes will be made", fg="magenta")
 
         try:
             with transaction.atomic():
-                load_directory_to_database(person_files, purge=purge)
+                if removed_ids is None or person_files or removed_ids:
+                    load_directory_to_database(
+                        person_files, purge=purge, removed_ids=removed_ids
+                    )
+                if repo:
+                    set_synced_commit(jurisdiction_id, PEOPLE_COMMIT_KEY, head)
 
                 if safe:
                     click.secho("ran in safe mode, no changes were made", fg="magenta")
@@ -752,13 +784,17 @@ def merge(abbr: str, input_dir: str, retirement: str, reset_offices: bool) -> No
     jurisdiction_id = abbr_to_jid(abbr)
     new_people = process_scrape_dir(Path(input_dir), jurisdiction_id)
 
-    existing_people: list[Person] = []
     directory = get_data_path(abbr)
-    for filename in itertools.chain(
-            directory.glob("legislature/*.yml"),
-            directory.glob("retired/*.yml"),
-    ):
-        existing_people.append(Person.load_yaml(filename))
+    existing_people: list[Person] = [
+        person
+        for _, person in load_yaml_models(
+            Person,
+            itertools.chain(
+                directory.glob("legislature/*.yml"),
+                directory.glob("retired/*.yml"),
+            ),
+        )
+    ]
 
     stats.write_stats(
         [
@@ -800,5 +836,22 @@ def merge(abbr: str, input_dir: str, retirement: str, reset_offices: bool) -> No
     stats.close()
 
 
+@main.command()
+@click.option("--abbr", default="nh", help="State whose districts are used.")
+@click.option("--size", default=5000, help="Number of synthetic people.")
+@click.option("--sample", default=200, help="Scraped people to time a full scan on.")
+def benchmark_merge(abbr: str, size: int, sample: int) -> None:
+    """
+    Time finding merge candidates on a synthetic roster.
+    """
+    result = benchmark_merge_index(abbr, size, sample)
+    click.secho(f"{result['people']} people")
+    click.secho(f"  full scan: {result['scan_ms_per_person']:.3f}ms per person")
+    click.secho(f"  index:     {result['index_ms_per_person']:.3f}ms per person")
+    if result["mismatches"]:
+        click.secho(f"{result['mismatches']} candidate mismatches", fg="red")
+        sys.exit(1)
+
+
 if __name__ == "__main__":
     main()
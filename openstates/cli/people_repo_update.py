@@ -103,6 +103,11 @@ def main() -> None:
     default=False,
     help="Set to True to ingest only committees.",
 )
+@click.option(
+    "--incremental/--no-incremental",
+    default=False,
+    help="Only ingest files changed since each jurisdiction's last sync.",
+)
 @click.pass_context
 def update(
     ctx: typing.Any,
@@ -111,6 +116,7 @@ def update(
     force_ingest: bool,
     people: bool,
     committees: bool,
+    incremental: bool,
 ) -> int:
     logger.info(f"Begin ingesting people {other_options}")
     [abbr, f_ingest, pur, ppl, comms] = get_args(other_options)
@@ -141,13 +147,20 @@ def update(
     logger.info(
         f"Begin Openstates People Repo to Database for {jurisdictions_to_ingest}."
     )
-    if people and not committees:
-        ctx.invoke(people_to_database, abbreviations=abbreviations, purge=purge)
-    elif committees and not people:
-        ctx.invoke(committee_to_database, abbreviations=abbreviations, purge=True)
-    else:
-        ctx.invoke(people_to_database, abbreviations=abbreviations, purge=purge)
-        ctx.invoke(committee_to_database, abbreviations=abbreviations, purge=True)
+    if people or not committees:
+        ctx.invoke(
+            people_to_database,
+            abbreviations=abbreviations,
+            purge=purge,
+            incremental=incremental,
+        )
+    if committees or not people:
+        ctx.invoke(
+            committee_to_database,
+            abbreviations=abbreviations,
+            purge=True,
+            incremental=incremental,
+        )
     return 0
 
 
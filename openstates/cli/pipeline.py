@@ -0,0 +1,160 @@
+"""
+Pipelined scrape and import for os-update --pipeline.
+
+Scrapers hand each saved object to an ImportPipeline, and a PipelinedImport
+thread imports them as they arrive instead of waiting for the scrape to
+finish and re-reading its JSON from disk.  Importers still run in dependency
+order: jurisdictions are imported once the jurisdiction scrape is done, bills
+stream in while scraping continues, and vote events and events (which refer
+to bills) are held until every scraper has finished.
+
+An object saved more than once is imported once, as last saved, if it hasn't
+been imported yet, the same as the JSON file it overwrites on disk.  One
+re-saved after it was imported is only imported again if it changed.
+
+The whole import, and so the whole scrape, runs in a single transaction, as it
+does without --pipeline: nothing is committed until scraping is over and
+every object has been imported, and a failed scrape imports nothing.
+"""
+import hashlib
+import json
+import queue
+import threading
+import typing
+from .. import utils
+from ..exceptions import CommandError
+
+# in the order they're imported
+IMPORT_ORDER = ("jurisdiction", "bill", "vote_event", "event")
+# bills are imported as they're scraped, so bounding their queue only makes
+# scrapers wait when the import falls behind.  The rest aren't read until
+# scraping is over, bounding them would deadlock.
+BOUNDED_TYPES = {"bill"}
+QUEUE_SIZE = 1000
+
+_DONE = object()
+
+
+class ImportPipeline:
+    def __init__(self, keep_json: bool = True, maxsize: int = QUEUE_SIZE):
+        # whether scrapers should still write their JSON to disk
+        self.keep_json = keep_json
+        self.queues: dict[str, queue.Queue] = {
+            _type: queue.Queue(maxsize if _type in BOUNDED_TYPES else 0)
+            for _type in IMPORT_ORDER
+        }
+        # type -> _id -> (object, digest) of objects queued but not yet imported,
+        # the queues only carry the _id so a re-saved object replaces its copy
+        self.pending: dict[str, dict[str, tuple[dict[str, typing.Any], str]]] = {
+            _type: {} for _type in IMPORT_ORDER
+        }
+        # type -> _id -> digest of objects already handed to the importer
+        self.imported: dict[str, dict[str, str]] = {_type: {} for _type in IMPORT_ORDER}
+        self.lock = threading.Lock()
+        self.finished: set[str] = set()
+        self.aborted = False
+        self.error: typing.Optional[BaseException] = None
+
+    def _put(self, q: queue.Queue, item: typing.Any) -> bool:
+        """put item on q unless the import has failed, returning whether it was"""
+        while self.error is None:
+            try:
+                q.put(item, timeout=1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def put(self, _type: str, data: dict[str, typing.Any]) -> None:
+        """queue a scraped object (as from as_dict()) for import"""
+        q = self.queues.get(_type)
+        if q is None:
+            # not something os-update imports
+            return
+        # round trip through JSON so importers see exactly what's on disk,
+        # and later changes to the scraped object can't leak into the import
+        encoded = json.dumps(data, cls=utils.JSONEncoderPlus)
+        item = json.loads(encoded)
+        digest = hashlib.sha1(encoded.encode()).hexdigest()
+        _id = item["_id"]
+        with self.lock:
+            pending = self.pending[_type]
+            if _id in pending:
+                # saved again before it was imported, last write wins
+                pending[_id] = (item, digest)
+                return
+            if self.imported[_type].get(_id) == digest:
+                return
+            pending[_id] = (item, digest)
+        if not self._put(q, _id):
+            raise CommandError(f"import failed: {self.error}") from self.error
+
+    def finish(self, _type: str) -> None:
+        """no more objects of _type will be scraped"""
+        if _type not in self.finished:
+            self.finished.add(_type)
+            self._put(self.queues[_type], _DONE)
+
+    def close(self) -> None:
+        """scraping is over"""
+        for _type in IMPORT_ORDER:
+            self.finish(_type)
+
+    def abort(self) -> None:
+        """scraping failed, make the import raise (and roll back)"""
+        self.aborted = True
+
+    def stream(self, _type: str) -> typing.Iterator[dict[str, typing.Any]]:
+        q = self.queues[_type]
+        while True:
+            if self.aborted:
+                raise CommandError("scrape failed, abandoning import")
+            try:
+                item = q.get(timeout=1)
+            except queue.Empty:
+                continue
+            if item is _DONE:
+                return
+            with self.lock:
+                data, digest = self.pending[_type].pop(item)
+                self.imported[_type][item] = digest
+            yield data
+
+
+class PipelinedImport:
+    """runs import_func(pipeline) on a thread alongside the scrape"""
+
+    def __init__(
+        self,
+        import_func: typing.Callable[[ImportPipeline], dict[str, typing.Any]],
+        pipeline: ImportPipeline,
+    ):
+        self.import_func = import_func
+        self.pipeline = pipeline
+        self.report: dict[str, typing.Any] = {}
+        self.thread = threading.Thread(target=self._run, name="openstates-import")
+        self.thread.start()
+
+    def _run(self) -> None:
+        from django.db import connections  # type: ignore
+
+        try:
+            self.report = self.import_func(self.pipeline)
+        except BaseException as exc:
+            # stops scrapers waiting on a full queue
+            self.pipeline.error = exc
+        finally:
+            # this thread's connections aren't closed by anything else
+            connections.close_all()
+
+    def result(self) -> dict[str, typing.Any]:
+        """wait for the import to finish once scraping is done"""
+        self.pipeline.close()
+        self.thread.join()
+        if self.pipeline.error is not None:
+            raise self.pipeline.error
+        return self.report
+
+    def abort(self) -> None:
+        self.pipeline.abort()
+        self.thread.join()
@@ -1,7 +1,6 @@
 import typing
 import logging
 from django.db import transaction  # type: ignore
-from django.db.models import Count, Subquery, OuterRef, Q, F  # type: ignore
 from .. import utils
 
 # model imports are inside functions since this file is imported pre-init
@@ -30,6 +29,21 @@ def print_report(report: dict[str, typing.Any]) -> None:
                         type, changes["insert"], changes["update"], changes["noop"]
                     )
                 )
+    if "profile" in report:
+        profile = report["profile"]
+        print("profile ({}):".format(profile["output"]))
+        for phase, details in profile["phases"].items():
+            print(
+                "  {}: {}s, {} queries ({}s)".format(
+                    phase,
+                    details["seconds"],
+                    details["queries"],
+                    details["sql_seconds"],
+                )
+            )
+        print("  hot functions:")
+        for func in profile["top_functions"]:
+            print("    {:5.1f}% {}".format(func["self_pct"], func["function"]))
 
 
 @transaction.atomic
@@ -57,6 +71,7 @@ def save_report(report: dict[str, typing.Any], jurisdiction: str) -> typing.Any:
         end_time=report["end"],
         exception=report.get("exception", ""),
         traceback=report.get("traceback", ""),
+        profile=report.get("profile", {}),
     )
 
     for scraper, details in report.get("scrape", {}).items():
@@ -85,110 +100,177 @@ def save_report(report: dict[str, typing.Any], jurisdiction: str) -> typing.Any:
             )
 
 
-def _simple_count(ModelCls: typing.Any, session: str, **filter: typing.Any) -> int:
-    return (
-        ModelCls.objects.filter(legislative_session_id=session).filter(**filter).count()
+BILL_METRICS_SQL = """
+SELECT b.legislative_session_id,
+    COUNT(*) FILTER (WHERE NOT EXISTS (
+        SELECT 1 FROM {action} a WHERE a.bill_id = b.id
+    )),
+    COUNT(*) FILTER (WHERE NOT EXISTS (
+        SELECT 1 FROM {sponsorship} s WHERE s.bill_id = b.id
+    )),
+    COUNT(*) FILTER (WHERE NOT EXISTS (
+        SELECT 1 FROM {version} v WHERE v.bill_id = b.id
+    ))
+FROM {bill} b
+WHERE b.legislative_session_id = ANY(%(sessions)s::uuid[])
+GROUP BY b.legislative_session_id
+"""
+
+# voters and counts are totalled per vote event first so that joining them
+# doesn't multiply rows, then compared in a single pass over the vote events
+VOTE_METRICS_SQL = """
+WITH voters AS (
+    SELECT pv.vote_event_id,
+        COUNT(*) FILTER (WHERE pv.option = 'yes') AS yes_sum,
+        COUNT(*) FILTER (WHERE pv.option = 'no') AS no_sum,
+        COUNT(*) FILTER (WHERE pv.option = 'other') AS other_sum
+    FROM {personvote} pv JOIN {voteevent} ve ON ve.id = pv.vote_event_id
+    WHERE ve.legislative_session_id = ANY(%(sessions)s::uuid[])
+    GROUP BY pv.vote_event_id
+), counts AS (
+    SELECT vc.vote_event_id,
+        MAX(vc.value) FILTER (WHERE vc.option = 'yes') AS yes_count,
+        MAX(vc.value) FILTER (WHERE vc.option = 'no') AS no_count,
+        MAX(vc.value) FILTER (WHERE vc.option = 'other') AS other_count
+    FROM {votecount} vc JOIN {voteevent} ve ON ve.id = vc.vote_event_id
+    WHERE ve.legislative_session_id = ANY(%(sessions)s::uuid[])
+    GROUP BY vc.vote_event_id
+)
+SELECT ve.legislative_session_id,
+    COUNT(*) FILTER (WHERE ve.bill_id IS NULL),
+    COUNT(*) FILTER (WHERE voters.vote_event_id IS NULL),
+    COUNT(*) FILTER (WHERE counts.yes_count IS NULL),
+    COUNT(*) FILTER (WHERE counts.no_count IS NULL),
+    COUNT(*) FILTER (WHERE
+        COALESCE(voters.yes_sum, 0) != COALESCE(counts.yes_count, 0)
+        OR COALESCE(voters.no_sum, 0) != COALESCE(counts.no_count, 0)
+        OR COALESCE(voters.other_sum, 0) != COALESCE(counts.other_count, 0)
     )
+FROM {voteevent} ve
+LEFT JOIN voters ON voters.vote_event_id = ve.id
+LEFT JOIN counts ON counts.vote_event_id = ve.id
+WHERE ve.legislative_session_id = ANY(%(sessions)s::uuid[])
+GROUP BY ve.legislative_session_id
+"""
 
+UNMATCHED_SQL = """
+SELECT b.legislative_session_id,
+    CASE s.entity_type
+        WHEN 'person' THEN 'unmatched_sponsor_people'
+        ELSE 'unmatched_sponsor_organizations'
+    END,
+    s.name, COUNT(*)
+FROM {sponsorship} s JOIN {bill} b ON b.id = s.bill_id
+WHERE b.legislative_session_id = ANY(%(sessions)s::uuid[])
+    AND s.entity_type IN ('person', 'organization') AND s.person_id IS NULL
+GROUP BY 1, 2, 3
+UNION ALL
+SELECT ve.legislative_session_id, 'unmatched_voters', pv.voter_name, COUNT(*)
+FROM {personvote} pv JOIN {voteevent} ve ON ve.id = pv.vote_event_id
+WHERE ve.legislative_session_id = ANY(%(sessions)s::uuid[])
+    AND pv.voter_id IS NULL
+GROUP BY 1, 2, 3
+"""
 
-def generate_session_report(session: str) -> typing.Any:
+BILL_METRICS = (
+    "bills_missing_actions",
+    "bills_missing_sponsors",
+    "bills_missing_versions",
+)
+VOTE_METRICS = (
+    "votes_missing_bill",
+    "votes_missing_voters",
+    "votes_missing_yes_count",
+    "votes_missing_no_count",
+    "votes_with_bad_counts",
+)
+UNMATCHED_METRICS = (
+    "unmatched_sponsor_people",
+    "unmatched_sponsor_organizations",
+    "unmatched_voters",
+)
+
+
+def _empty_report() -> dict[str, typing.Any]:
+    report: dict[str, typing.Any] = {
+        metric: 0 for metric in BILL_METRICS + VOTE_METRICS
+    }
+    report.update({metric: {} for metric in UNMATCHED_METRICS})
+    return report
+
+
+def compute_session_reports(
+    sessions: typing.Iterable[str],
+) -> dict[str, dict[str, typing.Any]]:
+    """
+    Compute the data quality metrics for each session, keyed by session id.
+
+    Every metric for every session comes from three aggregate queries, no
+    matter how many sessions, bills or votes there are.
+    """
+    from django.db import connection  # type: ignore
     from ..data.models import (
         Bill,
+        BillAction,
+        BillSponsorship,
+        BillVersion,
         VoteEvent,
         VoteCount,
         PersonVote,
-        BillSponsorship,
-        SessionDataQualityReport,
     )
 
-    report: dict[str, typing.Any] = {
-        "bills_missing_actions": _simple_count(Bill, session, actions__isnull=True),
-        "bills_missing_sponsors": _simple_count(
-            Bill, session, sponsorships__isnull=True
-        ),
-        "bills_missing_versions": _simple_count(Bill, session, versions__isnull=True),
-        "votes_missing_bill": _simple_count(VoteEvent, session, bill__isnull=True),
-        "votes_missing_voters": _simple_count(VoteEvent, session, votes__isnull=True),
-        "votes_missing_yes_count": 0,
-        "votes_missing_no_count": 0,
-        "votes_with_bad_counts": 0,
-    }
+    reports = {str(session): _empty_report() for session in sessions}
+    if not reports:
+        return reports
 
-    voteevents = VoteEvent.objects.filter(legislative_session_id=session)
-    # explicitly remove ordering pre-Django 3.1
-    queryset = voteevents.order_by().annotate(
-        yes_sum=Count("pk", filter=Q(votes__option="yes")),
-        no_sum=Count("pk", filter=Q(votes__option="no")),
-        other_sum=Count("pk", filter=Q(votes__option="other")),
-        yes_count=Subquery(
-            VoteCount.objects.filter(vote_event=OuterRef("pk"), option="yes").values(
-                "value"
-            )
-        ),
-        no_count=Subquery(
-            VoteCount.objects.filter(vote_event=OuterRef("pk"), option="no").values(
-                "value"
-            )
-        ),
-        other_count=Subquery(
-            VoteCount.objects.filter(vote_event=OuterRef("pk"), option="other").values(
-                "value"
-            )
-        ),
-    )
+    tables = {
+        "bill": Bill._meta.db_table,
+        "action": BillAction._meta.db_table,
+        "sponsorship": BillSponsorship._meta.db_table,
+        "version": BillVersion._meta.db_table,
+        "voteevent": VoteEvent._meta.db_table,
+        "votecount": VoteCount._meta.db_table,
+        "personvote": PersonVote._meta.db_table,
+    }
+    params = {"sessions": list(reports)}
 
-    for vote in queryset:
-        if vote.yes_count is None:
-            report["votes_missing_yes_count"] += 1
-            vote.yes_count = 0
-        if vote.no_count is None:
-            report["votes_missing_no_count"] += 1
-            vote.no_count = 0
-        if vote.other_count is None:
-            vote.other_count = 0
-        if (
-            vote.yes_sum != vote.yes_count
-            or vote.no_sum != vote.no_count
-            or vote.other_sum != vote.other_count
+    with connection.cursor() as cursor:
+        for sql, metrics in (
+            (BILL_METRICS_SQL, BILL_METRICS),
+            (VOTE_METRICS_SQL, VOTE_METRICS),
         ):
-            report["votes_with_bad_counts"] += 1
+            cursor.execute(sql.format(**tables), params)
+            for session, *values in cursor.fetchall():
+                reports[str(session)].update(zip(metrics, values))
 
-    # handle unmatched
-    queryset = (
-        BillSponsorship.objects.filter(
-            bill__legislative_session_id=session, entity_type="person", person_id=None
-        )
-        .values("name")
-        .annotate(num=Count("name"))
-    )
-    report["unmatched_sponsor_people"] = {
-        item["name"]: item["num"] for item in queryset
-    }
-    queryset = (
-        BillSponsorship.objects.filter(
-            bill__legislative_session_id=session,
-            entity_type="organization",
-            person_id=None,
-        )
-        .values("name")
-        .annotate(num=Count("name"))
-    )
-    report["unmatched_sponsor_organizations"] = {
-        item["name"]: item["num"] for item in queryset
-    }
-    queryset = (
-        PersonVote.objects.filter(
-            vote_event__legislative_session_id=session, voter__isnull=True
-        )
-        .values(name=F("voter_name"))
-        .annotate(num=Count("voter_name"))
-    )
-    report["unmatched_voters"] = {item["name"]: item["num"] for item in queryset}
+        cursor.execute(UNMATCHED_SQL.format(**tables), params)
+        for session, metric, name, num in cursor.fetchall():
+            reports[str(session)][metric][name] = num
+
+    return reports
+
+
+def generate_session_reports(
+    sessions: typing.Iterable[str],
+) -> list[typing.Any]:
+    """compute and save a SessionDataQualityReport for each session"""
+    from ..data.models import SessionDataQualityReport
 
-    # atomically replace the report if it exists
-    new_report = SessionDataQualityReport(legislative_session_id=session, **report)
+    reports = compute_session_reports(sessions)
+    new_reports = [
+        SessionDataQualityReport(legislative_session_id=session, **report)
+        for session, report in reports.items()
+    ]
+
+    # atomically replace the reports if they exist
     with transaction.atomic():
-        SessionDataQualityReport.objects.filter(legislative_session=session).delete()
-        new_report.save()
+        SessionDataQualityReport.objects.filter(
+            legislative_session_id__in=list(reports)
+        ).delete()
+        SessionDataQualityReport.objects.bulk_create(new_reports)
+
+    return new_reports
 
-    return new_report
+
+def generate_session_report(session: str) -> typing.Any:
+    return generate_session_reports([session])[0]
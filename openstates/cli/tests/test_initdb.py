@@ -4,6 +4,9 @@ from openstates.cli.initdb import (
     create_division,
     create_chamber,
     create_full_jurisdiction,
+    get_drift,
+    plan_full_jurisdiction,
+    Plan,
 )
 from openstates.metadata import lookup
 from django.db.utils import IntegrityError  # type: ignore
@@ -186,3 +189,42 @@ def test_create_federal_jurisdiction():
     assert Post.objects.filter(role="Senator").count() == 50
     assert Post.objects.filter(role="Delegate").count() == 5
     assert Post.objects.filter(role="Resident Commissioner").count() == 1
+
+
+@pytest.mark.django_db
+def test_create_full_jurisdiction_bulk(django_assert_max_num_queries):
+    nh = lookup(abbr="NH")
+    # one query per table to find what exists, then one insert per table
+    with django_assert_max_num_queries(10):
+        create_full_jurisdiction(nh)
+    assert Post.objects.count() == len(nh.lower.districts) + len(nh.upper.districts)
+
+
+@pytest.mark.django_db
+def test_get_drift():
+    nc = lookup(abbr="NC")
+    plan = Plan()
+    plan_full_jurisdiction(plan, nc)
+
+    drifts = {d.table: d for d in get_drift(plan)}
+    assert len(drifts["post"].missing) == 170
+
+    create_full_jurisdiction(nc)
+    Post.objects.filter(label="1", role="Senator").update(maximum_memberships=2)
+    Organization.objects.filter(classification="upper").update(name="Upper House")
+
+    drifts = {d.table: d for d in get_drift(plan)}
+    assert not any(d.missing for d in drifts.values())
+    assert drifts["post"].changed == [
+        (
+            ("1", nc.upper.organization_id, nc.upper.districts[0].division_id),
+            "maximum_memberships",
+            1,
+            2,
+        )
+    ]
+    assert drifts["organization"].conflicts == [
+        (nc.upper.organization_id, "name", "Senate", "Upper House")
+    ]
+    with pytest.raises(IntegrityError):
+        create_full_jurisdiction(nc)
@@ -0,0 +1,84 @@
+import datetime
+import pytest  # type: ignore
+from openstates.cli.pipeline import ImportPipeline, PipelinedImport
+from openstates.exceptions import CommandError
+
+
+def import_all(pipeline):
+    # imports in order, like do_import
+    return {
+        _type: [item["_id"] for item in pipeline.stream(_type)]
+        for _type in ("jurisdiction", "bill", "vote_event", "event")
+    }
+
+
+def test_pipelined_import():
+    pipeline = ImportPipeline()
+    importer = PipelinedImport(import_all, pipeline)
+
+    pipeline.put("jurisdiction", {"_id": "j"})
+    pipeline.finish("jurisdiction")
+    pipeline.put("bill", {"_id": "b1", "date": datetime.date(2020, 1, 1)})
+    pipeline.put("vote_event", {"_id": "v1"})
+    pipeline.put("bill", {"_id": "b2"})
+    # not imported by os-update
+    pipeline.put("organization", {"_id": "o1"})
+
+    assert importer.result() == {
+        "jurisdiction": ["j"],
+        "bill": ["b1", "b2"],
+        "vote_event": ["v1"],
+        "event": [],
+    }
+
+
+def test_pipeline_matches_json_on_disk():
+    pipeline = ImportPipeline()
+    data = {"_id": "b1", "date": datetime.date(2020, 1, 1), "actions": []}
+    pipeline.put("bill", data)
+    pipeline.close()
+    assert list(pipeline.stream("bill")) == [
+        {"_id": "b1", "date": "2020-01-01", "actions": []}
+    ]
+
+
+def test_pipeline_abort():
+    pipeline = ImportPipeline()
+    importer = PipelinedImport(import_all, pipeline)
+    pipeline.put("jurisdiction", {"_id": "j"})
+
+    importer.abort()
+    assert isinstance(pipeline.error, CommandError)
+
+
+def test_pipeline_import_failure():
+    def failing_import(pipeline):
+        for item in pipeline.stream("bill"):
+            raise ValueError(item["_id"])
+
+    pipeline = ImportPipeline(maxsize=1)
+    importer = PipelinedImport(failing_import, pipeline)
+
+    # scrapers stop with an error instead of waiting on the full queue forever
+    with pytest.raises(CommandError):
+        for n in range(5):
+            pipeline.put("bill", {"_id": f"b{n}"})
+    with pytest.raises(ValueError):
+        importer.result()
+
+
+def test_pipeline_resaved_objects():
+    pipeline = ImportPipeline()
+    pipeline.put("bill", {"_id": "b1", "title": "first"})
+    pipeline.put("bill", {"_id": "b2", "title": "other"})
+    pipeline.put("bill", {"_id": "b1", "title": "second"})
+    stream = pipeline.stream("bill")
+    # queued once, as last saved
+    assert next(stream) == {"_id": "b1", "title": "second"}
+    assert next(stream) == {"_id": "b2", "title": "other"}
+
+    # saved again once imported: only if it changed
+    pipeline.put("bill", {"_id": "b1", "title": "second"})
+    pipeline.put("bill", {"_id": "b2", "title": "changed"})
+    pipeline.close()
+    assert list(stream) == [{"_id": "b2", "title": "changed"}]
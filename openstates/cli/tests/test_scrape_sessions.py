@@ -0,0 +1,109 @@
+import argparse
+import glob
+import json
+import pytest  # type: ignore
+from unittest import mock
+from openstates.cli import update
+from openstates.cli.update import scrape_sessions
+from openstates.scrape import Bill, State
+from openstates.scrape.base import Scraper
+from openstates.utils.timing import timings
+
+
+class SessionBills(Scraper):
+    def scrape(self, session):
+        for n in range(int(session[-1])):
+            bill = Bill(f"HB {n}", session, "Test")
+            bill.add_source("http://example.com")
+            yield bill
+
+
+class FailingBills(Scraper):
+    def scrape(self, session):
+        raise ValueError(session)
+
+
+class NewJersey(State):
+    scrapers = {"bills": SessionBills, "failing": FailingBills}
+
+
+def make_args(workers):
+    return argparse.Namespace(
+        module=__name__,
+        strict=True,
+        fastmode=False,
+        realtime=False,
+        kafka=None,
+        archive=False,
+        http_resilience=False,
+        session_workers=workers,
+        profile=False,
+    )
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_scrape_sessions(tmp_path, workers):
+    sessions = ["2021", "2023", "2022"]
+    results = list(
+        scrape_sessions(
+            NewJersey(), make_args(workers), str(tmp_path), "bills", {}, sessions
+        )
+    )
+
+    # in the order given, whether or not they were scraped at the same time
+    assert [session for session, _ in results] == sessions
+    assert [report["objects"]["bill"] for _, report in results] == [1, 3, 2]
+    assert all(report["end"] >= report["start"] for _, report in results)
+    assert len(glob.glob(str(tmp_path / "bill_*.json"))) == 6
+
+
+def test_scrape_sessions_worker_timings(tmp_path, monkeypatch):
+    exported = tmp_path / "timings.jsonl"
+
+    def write_timings(timings, tags, prefix=""):
+        # workers are forked, so they write here too
+        with open(exported, "a") as f:
+            for metric in timings.export(prefix):
+                f.write(json.dumps(metric["tags"]) + "\n")
+
+    monkeypatch.setattr(update.stats, "write_timings", write_timings)
+    timings.reset()
+    timings.record("scrape.parent", 0.1)
+
+    datadir = tmp_path / "data"
+    datadir.mkdir()
+    list(
+        scrape_sessions(
+            NewJersey(), make_args(2), str(datadir), "bills", {}, ["2021", "2022"]
+        )
+    )
+
+    worker_stages = {json.loads(line)["stage"] for line in open(exported)}
+    assert "scrape.save.write" in worker_stages
+    # what the parent recorded is only sent by the parent
+    assert "scrape.parent" not in worker_stages
+    assert [m["tags"]["stage"] for m in timings.export()] == ["scrape.parent"]
+
+
+def test_scrape_sessions_profile_one_at_a_time(tmp_path, monkeypatch):
+    args = make_args(2)
+    args.profile = True
+    submitted = []
+    monkeypatch.setattr(update, "ProcessPoolExecutor", submitted.append)
+    results = list(
+        scrape_sessions(NewJersey(), args, str(tmp_path), "bills", {}, ["2021", "2022"])
+    )
+    # scraped here, where the profiler can see them
+    assert submitted == []
+    assert [report["objects"]["bill"] for _, report in results] == [1, 2]
+
+
+def test_scrape_session_process_closes_kafka_producer(tmp_path, monkeypatch):
+    producer = mock.Mock()
+    monkeypatch.setattr(update, "init_kafka_producer", lambda kafka: producer)
+    args = make_args(2)
+    args.kafka = "localhost:9092"
+    # even when the scrape fails
+    with pytest.raises(ValueError):
+        update._scrape_session_process(args, str(tmp_path), "failing", {}, "2021", 2)
+    producer.close.assert_called_once_with()
@@ -7,8 +7,9 @@ from openstates.data.models import (
     Person,
     Bill,
     VoteEvent,
+    SessionDataQualityReport,
 )
-from openstates.cli.reports import generate_session_report
+from openstates.cli.reports import generate_session_report, generate_session_reports
 
 
 def create_data():
@@ -249,3 +250,38 @@ def test_unmatched_voters():
     voter.save()
     report = generate_session_report(session)
     assert report.unmatched_voters == {"Wendy": 2}
+
+
+@pytest.mark.django_db
+def test_generate_session_reports(django_assert_max_num_queries):
+    session, org, person = create_data()
+    other = Jurisdiction.objects.get().legislative_sessions.get(identifier="1899").id
+    b = Bill.objects.create(
+        identifier="HB1", title="One", legislative_session_id=session
+    )
+    b.sponsorships.create(name="Roy", entity_type="person")
+    Bill.objects.create(identifier="HB1", title="One", legislative_session_id=other)
+    v = VoteEvent.objects.create(
+        legislative_session_id=other, motion_text="Passage", organization=org
+    )
+    v.counts.create(option="yes", value=2)
+    v.votes.create(option="yes", voter_name="Wendy")
+
+    with django_assert_max_num_queries(6):
+        reports = generate_session_reports([session, other])
+
+    report, other_report = reports
+    assert report.bills_missing_actions == other_report.bills_missing_actions == 1
+    assert report.bills_missing_sponsors == 0
+    assert other_report.bills_missing_sponsors == 1
+    assert report.unmatched_sponsor_people == {"Roy": 1}
+    assert other_report.unmatched_sponsor_people == {}
+    assert report.votes_missing_bill == 0
+    assert other_report.votes_missing_bill == 1
+    assert other_report.votes_missing_no_count == 1
+    assert other_report.votes_with_bad_counts == 1
+    assert other_report.unmatched_voters == {"Wendy": 1}
+
+    # reports are replaced, not added to
+    generate_session_reports([session, other])
+    assert SessionDataQualityReport.objects.count() == 2
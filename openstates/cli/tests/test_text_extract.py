@@ -0,0 +1,152 @@
+import csv
+import json
+import pytest  # type: ignore
+from click.testing import CliRunner
+from openstates.cli import text_extract
+from openstates.fulltext.utils import (
+    text_from_element_lxml,
+    text_from_element_xpath,
+    text_from_element_streaming,
+)
+
+AK_HTML = b"""<html><body>
+<div id="nav">navigation</div>
+<div id="draftOverlay">AN ACT relating to overtaking vehicles.</div>
+</body></html>"""
+
+
+@pytest.fixture
+def raw_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(text_extract, "get_raw_dir", lambda: tmp_path)
+    rows = [
+        {
+            "id": "1",
+            "session": "30",
+            "identifier": "HB 1",
+            "title": "An Act",
+            "jurisdiction_id": "ocd-jurisdiction/country:us/state:ak/government",
+            "media_type": "text/html",
+            "url": "https://example.com/1",
+            "note": "HB0001A",
+        },
+        {
+            "id": "2",
+            "session": "30",
+            "identifier": "HB 2",
+            "title": "An Act",
+            "jurisdiction_id": "ocd-jurisdiction/country:us/state:ak/government",
+            "media_type": "text/html",
+            "url": "https://example.com/2",
+            "note": "HB0002A",
+        },
+    ]
+    with open(tmp_path / "ak.csv", "w") as f:
+        out = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+        out.writeheader()
+        out.writerows(rows)
+    # only the first document has been downloaded
+    (tmp_path / "ak").mkdir()
+    (tmp_path / "ak" / "30-HB 1-HB0001A.html").write_bytes(AK_HTML)
+    return tmp_path
+
+
+def test_percentile():
+    assert text_extract._percentile([], 50) == 0.0
+    assert text_extract._percentile([1.0, 2.0, 3.0, 4.0], 50) == 2.0
+    assert text_extract._percentile([1.0, 2.0, 3.0, 4.0], 95) == 4.0
+
+
+def test_benchmark_state(raw_dir):
+    report = text_extract.benchmark_state("ak")
+    assert report["missing"] == 1
+    assert report["skipped"] == 0
+    result = report["extractors"]["text/html"]
+    assert result["extractor"] == "extractor_for_element_by_selector"
+    assert result["docs"] == 1
+    assert result["errors"] == 0
+    assert result["input_bytes"] == len(AK_HTML)
+    assert result["output_bytes"] == len("AN ACT relating to overtaking vehicles.")
+    assert result["p50_ms"] <= result["p95_ms"]
+    assert result["peak_rss_kb"] >= 0
+
+
+def test_benchmark_state_peak_rss_per_extractor(raw_dir):
+    # memory the benchmarking process already holds isn't counted
+    held = b"x" * (64 * 1024 * 1024)
+    report = text_extract.benchmark_state("ak")
+    del held
+    assert report["extractors"]["text/html"]["peak_rss_kb"] < 32 * 1024
+
+
+def test_benchmark_command_baseline(raw_dir):
+    output = raw_dir / "report.json"
+    baseline = raw_dir / "baseline.json"
+    baseline.write_text(
+        json.dumps(
+            {"states": {"ak": {"extractors": {"text/html": {"output_bytes": 1000}}}}}
+        )
+    )
+    result = CliRunner().invoke(
+        text_extract.main,
+        ["benchmark", "ak", "--output", str(output), "--baseline", str(baseline)],
+    )
+    # output shrank from 1000 bytes, flagged as a regression
+    assert result.exit_code == 1
+    assert "output shrank for ak text/html" in result.output
+    report = json.loads(output.read_text())
+    assert report["states"]["ak"]["extractors"]["text/html"]["output_bytes_delta"] < 0
+
+
+STREAMING_HTML = b"""<html><head><title>HB 1</title></head><body>
+<!-- header -->intro<div id="nav">nav <div>links</div></div>
+<div id="bill" class="WordSection2">AN ACT <b>relating <!-- x -->to <i>roads</i></b>;
+<br>amending<div>section 1</div><p>section 2</p>end</div>footer
+</body></html>"""
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, 1024 * 1024])
+def test_streaming_matches_tree_extraction(chunk_size):
+    assert text_from_element_streaming(
+        STREAMING_HTML, path="html", chunk_size=chunk_size
+    ) == text_from_element_xpath(STREAMING_HTML, "//html")
+    assert text_from_element_streaming(
+        STREAMING_HTML, tag="div", element_id="bill", chunk_size=chunk_size
+    ) == text_from_element_lxml(STREAMING_HTML, ".//div[@id='bill']")
+    assert text_from_element_streaming(
+        STREAMING_HTML, element_class="WordSection2", chunk_size=chunk_size
+    ) == text_from_element_lxml(STREAMING_HTML, ".//div[@class='WordSection2']")
+
+
+def test_streaming_requires_single_match():
+    with pytest.raises(AssertionError):
+        text_from_element_streaming(STREAMING_HTML, element_id="missing")
+
+
+@pytest.mark.django_db
+def test_iter_bills_for_update():
+    from openstates.data.models import Division, Jurisdiction, Bill
+
+    Division.objects.create(id="ocd-division/country:us", name="USA")
+    j = Jurisdiction.objects.create(id="jid", division_id="ocd-division/country:us")
+    session = j.legislative_sessions.create(identifier="1900", name="1900")
+    bills = [
+        Bill.objects.create(
+            identifier=f"HB{i}", title="Title", legislative_session=session
+        )
+        for i in range(5)
+    ]
+    old = bills[0].versions.create(note="Introduced", date="1900-01-01")
+    old.links.create(url="https://example.com/old", media_type="text/html")
+    new = bills[0].versions.create(note="Enrolled", date="1900-02-01")
+    new.links.create(url="https://example.com/new", media_type="text/html")
+
+    chunks = list(text_extract.iter_bills_for_update(Bill.objects.all(), 2))
+    assert [len(c) for c in chunks] == [2, 2, 1]
+
+    by_id = {b.id: b for chunk in chunks for b in chunk}
+    assert len(by_id) == 5
+    assert [link.url for link in by_id[bills[0].id].latest_version_links] == [
+        "https://example.com/new"
+    ]
+    assert by_id[bills[1].id].latest_version_links == []
+    assert by_id[bills[1].id].legislative_session.jurisdiction.id == "jid"
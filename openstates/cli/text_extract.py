@@ -1,25 +1,35 @@
 #!/usr/bin/env python
 import os
+import json
 import typing
 import sys
 import csv
 import math
+import multiprocessing
+import resource
 import warnings
 import click
+import contextlib
 import scrapelib
 import time
+from collections import defaultdict
+from concurrent.futures import Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass
 from pathlib import Path
 from django.contrib.postgres.search import SearchVector  # type: ignore
 from django.db import transaction  # type: ignore
-from django.db.models import Count  # type: ignore
+from django.db.models import Count, OuterRef, Subquery  # type: ignore
 from openstates.utils.django import init_django
 from openstates.utils import jid_to_abbr, abbr_to_jid
 from openstates.fulltext import (
     get_extract_func,
     DoNotDownload,
     CONVERSION_FUNCTIONS,
+    ExtractorFunc,
     Metadata,
 )
+from openstates.fulltext import ocr
+from openstates.fulltext.store import save_version_texts, collect_garbage
 from ..utils.instrument import Instrumentation
 
 stats = Instrumentation()
@@ -47,9 +57,7 @@ def _cleanup(text: str) -> str:
     return text.replace("\0", "")
 
 
-def download(
-    version: dict[str, str]
-) -> tuple[typing.Optional[str], typing.Optional[bytes]]:
+def get_raw_filename(version: dict[str, str]) -> str:
     abbr = jid_to_abbr(version["jurisdiction_id"])
     ext = MIMETYPES[version["media_type"]]
     filename = str(
@@ -57,6 +65,14 @@ def download(
         / f'{abbr}/{version["session"]}-{version["identifier"]}-{version["note"]}.{ext}'
     )
     filename.replace("#", "__")
+    return filename
+
+
+def download(
+    version: dict[str, str]
+) -> tuple[typing.Optional[str], typing.Optional[bytes]]:
+    abbr = jid_to_abbr(version["jurisdiction_id"])
+    filename = get_raw_filename(version)
 
     # FL "dh key too small" error due to bad Diffie Hellman key on the server side
     ciphers_list_addition = None
@@ -119,16 +135,72 @@ def extract_to_file(
     return text_filename, len(text)
 
 
-def update_bill(bill: typing.Any) -> int:
-    from openstates.data.models import SearchableBill
+def iter_bills_for_update(
+    bills: typing.Any, chunk_size: int
+) -> typing.Iterator[list[typing.Any]]:
+    """
+    Yield bills in chunks, each with its jurisdiction and the links of its
+    latest version attached (as latest_version_links).
+
+    Bills are keyset-paginated by id so every chunk costs two queries no matter
+    how far into the state we are, instead of several queries per bill.
+    """
+    from openstates.data.models import BillVersion, BillVersionLink
+
+    latest_version = (
+        BillVersion.objects.filter(bill=OuterRef("pk"))
+        .order_by("-date", "-note")
+        .values("id")[:1]
+    )
+    bills = (
+        bills.select_related("legislative_session__jurisdiction")
+        .annotate(latest_version_id=Subquery(latest_version))
+        .order_by("id")
+    )
+
+    last_id = None
+    while True:
+        page = bills.filter(id__gt=last_id) if last_id else bills
+        chunk = list(page[:chunk_size])
+        if not chunk:
+            return
+
+        links_by_version = defaultdict(list)
+        for link in BillVersionLink.objects.select_related("version").filter(
+            version_id__in=[b.latest_version_id for b in chunk if b.latest_version_id]
+        ):
+            links_by_version[link.version_id].append(link)
+        for bill in chunk:
+            bill.latest_version_links = links_by_version[bill.latest_version_id]
+
+        yield chunk
+        last_id = chunk[-1].id
+
+
+@dataclass
+class PendingOCR:
+    """a bill to re-extract once the OCR queued for its document is done"""
+
+    searchable: typing.Any
+    func: ExtractorFunc
+    data: bytes
+    metadata: Metadata
+    futures: list[Future]
 
-    try:
-        latest_version = bill.versions.order_by("-date", "-note").prefetch_related(
-            "links"
-        )[0]
-        links = latest_version.links.all()
-    except IndexError:
-        links = []
+
+def update_bill(
+    bill: typing.Any,
+    links: list[typing.Any],
+    pending_ocr: typing.Optional[list[PendingOCR]] = None,
+) -> typing.Any:
+    """
+    Extract text for a bill from the links of its latest version, returning an
+    unsaved SearchableBill so that callers can bulk_create them.
+
+    If pending_ocr is passed, OCR isn't waited on: the bill gets the text
+    pdftotext found for now, and is added to pending_ocr for fill_in_ocr.
+    """
+    from openstates.data.models import SearchableBill
 
     # check if there's an old entry and we can use it
     # if bill.searchable:
@@ -146,7 +218,9 @@ def update_bill(bill: typing.Any) -> int:
     is_error = True
     raw_text = ""
     link = None
+    ocr_job = None
     for link in links:
+        ocr_job = None
         # TODO: if we need other exceptions, change this to a pluggable interface
         if (
             bill.legislative_session.jurisdiction_id
@@ -162,6 +236,7 @@ def update_bill(bill: typing.Any) -> int:
             "media_type": link.media_type,
             "title": bill.title,
             "jurisdiction_id": bill.legislative_session.jurisdiction_id,
+            "session": bill.legislative_session.identifier,
         }
         func = get_extract_func(metadata)
         if func == DoNotDownload:
@@ -175,10 +250,19 @@ def update_bill(bill: typing.Any) -> int:
             ).content
         except Exception:
             continue
+        queued: list[Future] = []
+        defer_ocr = (
+            ocr.deferred()
+            if pending_ocr is not None
+            else contextlib.nullcontext(queued)
+        )
         try:
-            raw_text = func(data, metadata)
+            with defer_ocr as queued:
+                raw_text = func(data, metadata)
         except Exception as e:
             click.secho(f"exception processing {metadata['url']}: {e}", fg="red")
+        if queued:
+            ocr_job = (func, data, metadata, queued)
 
         # TODO: clean up whitespace
         raw_text = _cleanup(raw_text)
@@ -187,7 +271,7 @@ def update_bill(bill: typing.Any) -> int:
             is_error = False
             break
 
-    sb = SearchableBill.objects.create(
+    searchable = SearchableBill(
         bill=bill,
         version_link=link,
         all_titles=bill.title,  # TODO: add other titles
@@ -195,7 +279,45 @@ def update_bill(bill: typing.Any) -> int:
         is_error=is_error,
         search_vector="",
     )
-    return sb.id
+    if pending_ocr is not None and ocr_job:
+        pending_ocr.append(PendingOCR(searchable, *ocr_job))
+    return searchable
+
+
+def fill_in_ocr(pending: list[PendingOCR], block: bool = False) -> list[PendingOCR]:
+    """
+    Re-extract and save the text of bills whose OCR is done, returning those
+    still waiting on it.  If block is set, waits for all of them.
+    """
+    from openstates.data.models import SearchableBill
+
+    waiting = []
+    updated = []
+    for item in pending:
+        if block:
+            wait(item.futures)
+        elif not all(future.done() for future in item.futures):
+            waiting.append(item)
+            continue
+        try:
+            # picks up the OCRed pages, never waits on OCR again
+            with ocr.deferred():
+                text = _cleanup(item.func(item.data, item.metadata))
+        except Exception as e:
+            click.secho(f"exception processing {item.metadata['url']}: {e}", fg="red")
+            continue
+        searchable = item.searchable
+        if text and text != searchable.raw_text:
+            searchable.raw_text = text
+            searchable.is_error = False
+            updated.append(searchable)
+
+    if updated:
+        print(f"filling in OCRed text for {len(updated)} bills")
+        SearchableBill.objects.bulk_update(updated, ["raw_text", "is_error"])
+        save_version_texts((sb.version_link, sb.raw_text) for sb in updated)
+        reindex([sb.id for sb in updated])
+    return waiting
 
 
 @click.group()
@@ -295,6 +417,197 @@ def test(ctx: typing.Any) -> None:
     sys.exit(failures)
 
 
+def _percentile(values: list[float], pct: float) -> float:
+    """nearest-rank percentile, values must already be sorted"""
+    if not values:
+        return 0.0
+    rank = max(math.ceil(pct / 100 * len(values)), 1)
+    return values[rank - 1]
+
+
+def _extractor_name(func: typing.Any) -> str:
+    # closures built by the extractor_for_* factories are named after the factory
+    name = getattr(func, "__qualname__", repr(func))
+    return name.split(".<locals>")[0]
+
+
+def _raw_documents(
+    state: str,
+) -> typing.Iterator[tuple[dict[str, str], typing.Any, typing.Optional[bytes]]]:
+    """
+    (version, extract func, raw bytes) for each row of the state's sample csv,
+    bytes are None if the raw file hasn't been downloaded
+    """
+    with open(get_raw_dir() / f"{state}.csv") as f:
+        for version in csv.DictReader(f):
+            func = get_extract_func(typing.cast(Metadata, version))
+            if func == DoNotDownload:
+                yield version, func, None
+                continue
+            filename = get_raw_filename(version)
+            if not os.path.exists(filename):
+                yield version, func, None
+                continue
+            with open(filename, "rb") as rawf:
+                yield version, func, rawf.read()
+
+
+def _extractor_peak_rss_kb(state: str, media_type: str) -> int:
+    """
+    Run in a process of its own: how far extracting every media_type document
+    for the state raised the process's peak RSS, in KB on Linux.
+    """
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    for version, func, data in _raw_documents(state):
+        if data is None or version["media_type"] != media_type:
+            continue
+        try:
+            func(data, typing.cast(Metadata, version))
+        except Exception:
+            pass
+    return max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline, 0)
+
+
+def benchmark_state(state: str) -> dict[str, typing.Any]:
+    """
+    Run every extractor for a state against the already-downloaded raw files
+    listed in the state's sample csv, never touching the network.
+
+    Timings come from an uninstrumented pass.  Peak RSS, which includes what
+    lxml and other native code allocate, is measured afterwards by running
+    each extractor again in a fresh process of its own.
+    """
+    timings: dict[str, list[float]] = {}
+    results: dict[str, dict[str, typing.Any]] = {}
+    missing = skipped = 0
+
+    for version, func, data in _raw_documents(state):
+        if func == DoNotDownload:
+            skipped += 1
+            continue
+        if data is None:
+            missing += 1
+            continue
+
+        media_type = version["media_type"]
+        if media_type not in results:
+            timings[media_type] = []
+            results[media_type] = {
+                "extractor": _extractor_name(func),
+                "docs": 0,
+                "errors": 0,
+                "empty": 0,
+                "input_bytes": 0,
+                "output_bytes": 0,
+            }
+        result = results[media_type]
+
+        start = time.perf_counter()
+        try:
+            text = _cleanup(func(data, typing.cast(Metadata, version)))
+        except Exception as e:
+            click.secho(
+                f"exception processing {get_raw_filename(version)}: {e}", fg="red"
+            )
+            result["errors"] += 1
+            text = ""
+        timings[media_type].append(time.perf_counter() - start)
+
+        result["docs"] += 1
+        result["input_bytes"] += len(data)
+        result["output_bytes"] += len(text)
+        if not text:
+            result["empty"] += 1
+
+    for media_type, result in results.items():
+        elapsed = sorted(timings[media_type])
+        total = sum(elapsed)
+        result["seconds"] = round(total, 4)
+        result["docs_per_sec"] = round(result["docs"] / total, 2) if total else 0
+        result["bytes_per_sec"] = round(result["input_bytes"] / total) if total else 0
+        result["p50_ms"] = round(_percentile(elapsed, 50) * 1000, 2)
+        result["p95_ms"] = round(_percentile(elapsed, 95) * 1000, 2)
+        # a new process per extractor, so its high-water mark is its own
+        with ProcessPoolExecutor(
+            1, mp_context=multiprocessing.get_context("fork")
+        ) as pool:
+            result["peak_rss_kb"] = pool.submit(
+                _extractor_peak_rss_kb, state, media_type
+            ).result()
+
+    return {"missing": missing, "skipped": skipped, "extractors": results}
+
+
+def compare_benchmarks(
+    report: dict[str, typing.Any], baseline: dict[str, typing.Any], max_shrink: float
+) -> list[str]:
+    """
+    Annotate report with output size deltas against a previous report,
+    returning a list of extractors whose output shrank more than max_shrink.
+    """
+    regressions = []
+    for state, state_report in report["states"].items():
+        old_state = baseline.get("states", {}).get(state, {})
+        for media_type, result in state_report["extractors"].items():
+            old = old_state.get("extractors", {}).get(media_type)
+            if not old:
+                result["output_bytes_delta"] = None
+                continue
+            delta = result["output_bytes"] - old["output_bytes"]
+            result["output_bytes_delta"] = delta
+            if old["output_bytes"] and -delta / old["output_bytes"] > max_shrink:
+                regressions.append(f"{state} {media_type}")
+    return regressions
+
+
+@main.command(help="benchmark extractors against already-downloaded raw files")
+@click.argument("states", nargs=-1)
+@click.option("--output", default=None, help="write a JSON report to this path")
+@click.option("--baseline", default=None, help="previous JSON report to compare to")
+@click.option(
+    "--max-shrink",
+    default=0.1,
+    help="fail if output shrinks by more than this fraction vs. the baseline",
+)
+def benchmark(
+    states: tuple[str, ...],
+    output: typing.Optional[str],
+    baseline: typing.Optional[str],
+    max_shrink: float,
+) -> None:
+    if not states:
+        states = tuple(
+            state
+            for state in sorted(CONVERSION_FUNCTIONS.keys())
+            if (get_raw_dir() / f"{state}.csv").exists()
+        )
+
+    report: dict[str, typing.Any] = {"generated": int(time.time()), "states": {}}
+    for state in states:
+        report["states"][state] = state_report = benchmark_state(state)
+        for media_type, result in state_report["extractors"].items():
+            click.secho(
+                f"{state:3} {media_type:16} {result['extractor']:35} "
+                f"{result['docs']:4} docs {result['docs_per_sec']:8} docs/s "
+                f"p50={result['p50_ms']}ms p95={result['p95_ms']}ms "
+                f"rss={result['peak_rss_kb']}KB"
+            )
+
+    regressions: list[str] = []
+    if baseline:
+        with open(baseline) as f:
+            regressions = compare_benchmarks(report, json.load(f), max_shrink)
+        for regression in regressions:
+            click.secho(f"output shrank for {regression}", fg="red")
+
+    if output:
+        with open(output, "w") as f:
+            json.dump(report, f, indent=2)
+        click.secho(f"wrote benchmark report to {output}")
+
+    sys.exit(1 if regressions else 0)
+
+
 @main.command(help="print a status table showing the current condition of states")
 def status() -> None:
     init_django()
@@ -353,6 +666,14 @@ def reindex_state(state: str, session: str = None) -> None:
     reindex(ids)
 
 
+@main.command(help="delete stored bill text no longer used by any version")
+def gc() -> None:
+    init_django()
+    with transaction.atomic():
+        deleted = collect_garbage()
+    click.secho(f"deleted {deleted} unreferenced text contents")
+
+
 @main.command(help="update the saved bill text in the database")
 @click.argument("state")
 @click.option("-n", default=None)
@@ -414,53 +735,62 @@ def update(
                 missing_search = missing_search.exclude(
                     legislative_session__jurisdiction__name=state_name
                 )
-        print(f"{len(missing_search)} missing, updating")
+
+    missing_count = missing_search.count()
+    if state == "all":
+        print(f"{missing_count} missing, updating")
     else:
         print(
-            f"{state}: {len(all_bills)} bills, {len(missing_search)} without search results"
+            f"{state}: {all_bills.count()} bills, {missing_count} without search results"
         )
     stats.write_stats(
         [
             {
                 "metric": "text_extraction_missing",
-                "fields": {"vectors": len(missing_search)},
+                "fields": {"vectors": missing_count},
                 "tags": {"jurisdiction": state},
             }
         ]
     )
 
-    if n:
-        missing_search = missing_search[: int(n)]
-    else:
-        n = len(missing_search)
-
-    ids_to_update = []
+    n = min(int(n), missing_count) if n else missing_count
     updated_count = 0
+    # bills with OCR still running, their text is filled in once it's done
+    pending_ocr: list[PendingOCR] = []
 
     # going to manage our own transactions here so we can save in chunks
     transaction.set_autocommit(False)
 
-    for b in missing_search:
-        ids_to_update.append(update_bill(b))
-        updated_count += 1
-        if updated_count % status_num == 0:
-            print(f"{state}: updated {updated_count} out of {n}")
-        if updated_count % checkpoint == 0:
-            reindex(ids_to_update)
-            transaction.commit()
-            ids_to_update = []
+    for chunk in iter_bills_for_update(missing_search, chunk_size=checkpoint):
+        searchables = []
+        for b in chunk[: n - updated_count]:
+            searchables.append(update_bill(b, b.latest_version_links, pending_ocr))
+            updated_count += 1
+            if updated_count % status_num == 0:
+                print(f"{state}: updated {updated_count} out of {n}")
+        SearchableBill.objects.bulk_create(searchables)
+        save_version_texts(
+            (sb.version_link, sb.raw_text) for sb in searchables if not sb.is_error
+        )
+        reindex([sb.id for sb in searchables])
+        pending_ocr = fill_in_ocr(pending_ocr)
+        transaction.commit()
+        if updated_count >= n:
+            break
+
+    if pending_ocr:
+        print(f"{state}: waiting on OCR for {len(pending_ocr)} bills")
+        fill_in_ocr(pending_ocr, block=True)
 
     stats.write_stats(
         [
             {
                 "metric": "text_extraction",
-                "fields": {"updates": len(ids_to_update)},
+                "fields": {"updates": updated_count},
                 "tags": {"jurisdiction": state},
             }
         ]
     )
-    # be sure to reindex final set
-    reindex(ids_to_update)
     transaction.commit()
     transaction.set_autocommit(True)
     stats.write_stats(
@@ -16,6 +16,7 @@ import time
 import traceback
 import typing
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from kafka import KafkaProducer
 from types import ModuleType
 
@@ -26,7 +27,10 @@ from ..exceptions import CommandError
 from ..scrape import JurisdictionScraper, State
 from ..utils.django import init_django
 from ..utils.instrument import Instrumentation
-from .reports import generate_session_report, print_report, save_report
+from ..utils.profiler import RunProfiler
+from ..utils.timing import timings
+from .pipeline import ImportPipeline, PipelinedImport
+from .reports import generate_session_reports, print_report, save_report
 
 logger = logging.getLogger('openstates')
 stats = Instrumentation()
@@ -98,11 +102,147 @@ def init_kafka_producer(kafka_cluster_name: str) -> KafkaProducer:
 
     return producer
 
+
+def scrape_session(
+    juris: State,
+    args: argparse.Namespace,
+    datadir: str,
+    scraper_name: str,
+    scrape_args: dict[str, str],
+    session: str,
+    kafka_producer: typing.Optional[KafkaProducer] = None,
+    pipeline: typing.Optional[ImportPipeline] = None,
+    workers: int = 1,
+) -> dict[str, typing.Any]:
+    """scrape one session with a new scraper, returning its partial report"""
+    ScraperCls = juris.scrapers[scraper_name]
+    scraper = ScraperCls(
+        juris,
+        datadir,
+        strict_validation=args.strict,
+        fastmode=args.fastmode,
+        realtime=args.realtime,
+        kafka=args.kafka,
+        kafka_producer=kafka_producer,
+        file_archiving_enabled=args.archive,
+        http_resilience_mode=args.http_resilience,
+        import_pipeline=pipeline,
+    )
+    if workers > 1 and scraper.requests_per_minute:
+        # sessions scraped at the same time share the rate limit
+        scraper.requests_per_minute = max(1, scraper.requests_per_minute // workers)
+    partial_report = scraper.do_scrape(**scrape_args, session=session)
+    if args.realtime:
+        scraper.upload_to_gcs_real_time(force_upload=True)
+    return partial_report
+
+
+def _scrape_session_process(
+    args: argparse.Namespace,
+    datadir: str,
+    scraper_name: str,
+    scrape_args: dict[str, str],
+    session: str,
+    workers: int,
+) -> dict[str, typing.Any]:
+    """scrape_session in a --session-workers process"""
+    # forked with a copy of everything the parent had recorded, which the
+    # parent sends itself
+    timings.reset()
+    # neither the jurisdiction nor a kafka producer can be pickled, make our own
+    juris, _ = get_jurisdiction(args.module)
+    kafka_producer = init_kafka_producer(args.kafka) if args.kafka else None
+    try:
+        return scrape_session(
+            juris,
+            args,
+            datadir,
+            scraper_name,
+            scrape_args,
+            session,
+            kafka_producer=kafka_producer,
+            workers=workers,
+        )
+    finally:
+        # this process's timings and queued stats go away with it
+        stats.write_timings(
+            timings,
+            {'jurisdiction': juris.name, 'phase': 'scrape', 'session': session},
+        )
+        stats.close()
+        if kafka_producer:
+            # flushes anything still buffered
+            kafka_producer.close()
+
+
+def scrape_sessions(
+    juris: State,
+    args: argparse.Namespace,
+    datadir: str,
+    scraper_name: str,
+    scrape_args: dict[str, str],
+    sessions: typing.Iterable[str],
+    kafka_producer: typing.Optional[KafkaProducer] = None,
+    pipeline: typing.Optional[ImportPipeline] = None,
+) -> typing.Iterator[tuple[str, dict[str, typing.Any]]]:
+    """
+    Scrape each session, yielding (session, partial report) in the order
+    sessions are given.  With --session-workers, up to that many sessions are
+    scraped at once, each in its own process with its own scraper and a share
+    of the rate limit.  Their output doesn't collide since every object is
+    saved under its own id.
+    """
+    sessions = list(sessions)
+    workers = min(args.session_workers, len(sessions))
+    if workers > 1 and pipeline:
+        logger.warning('--pipeline imports in this process, scraping sessions one at a time')
+        workers = 1
+    if workers > 1 and args.profile:
+        # the profiler only samples this process, which would just be waiting
+        logger.warning('--profile only samples this process, scraping sessions one at a time')
+        workers = 1
+
+    if workers <= 1:
+        for session in sessions:
+            yield session, scrape_session(
+                juris,
+                args,
+                datadir,
+                scraper_name,
+                scrape_args,
+                session,
+                kafka_producer=kafka_producer,
+                pipeline=pipeline,
+            )
+        return
+
+    logger.info(f'scraping {len(sessions)} sessions with {workers} workers')
+    pool = ProcessPoolExecutor(workers)
+    try:
+        futures = [
+            pool.submit(
+                _scrape_session_process,
+                args,
+                datadir,
+                scraper_name,
+                scrape_args,
+                session,
+                workers,
+            )
+            for session in sessions
+        ]
+        for session, future in zip(sessions, futures):
+            yield session, future.result()
+    finally:
+        # don't start any more sessions if one failed
+        pool.shutdown(cancel_futures=True)
+
 def do_scrape(
     juris: State,
     args: argparse.Namespace,
     scrapers: dict[str, dict[str, str]],
     active_sessions: set[str],
+    pipeline: typing.Optional[ImportPipeline] = None,
 ) -> dict[str, typing.Any]:
     # make output and cache dirs
     utils.makedirs(settings.CACHE_DIR)
@@ -127,8 +267,11 @@ def do_scrape(
         kafka_producer=kafka_producer,
         file_archiving_enabled=args.archive,
         http_resilience_mode=args.http_resilience,
+        import_pipeline=pipeline,
     )
     report['jurisdiction'] = jscraper.do_scrape()
+    if pipeline:
+        pipeline.finish('jurisdiction')
     stats.write_stats(
         [
             {
@@ -160,20 +303,16 @@ def do_scrape(
                 'end': None,
                 'objects': defaultdict(int),
             }
-            for session in active_sessions:
-                # new scraper each time
-                scraper = ScraperCls(
-                    juris,
-                    datadir,
-                    strict_validation=args.strict,
-                    fastmode=args.fastmode,
-                    realtime=args.realtime,
-                    kafka=args.kafka,
-                    kafka_producer=kafka_producer,
-                    file_archiving_enabled=args.archive,
-                    http_resilience_mode=args.http_resilience,
-                )
-                partial_report = scraper.do_scrape(**scrape_args, session=session)
+            for session, partial_report in scrape_sessions(
+                juris,
+                args,
+                datadir,
+                scraper_name,
+                scrape_args,
+                active_sessions,
+                kafka_producer=kafka_producer,
+                pipeline=pipeline,
+            ):
                 stats.write_stats(
                     [
                         {
@@ -197,8 +336,6 @@ def do_scrape(
                         }
                     ]
                 )
-                if args.realtime:
-                    scraper.upload_to_gcs_real_time(force_upload=True)
         else:
             scraper = ScraperCls(
                 juris,
@@ -210,6 +347,7 @@ def do_scrape(
                 kafka_producer=kafka_producer,
                 file_archiving_enabled=args.archive,
                 http_resilience_mode=args.http_resilience,
+                import_pipeline=pipeline,
             )
             report[scraper_name] = scraper.do_scrape(**scrape_args)
             session = scrape_args.get("session", "")
@@ -251,6 +389,16 @@ def do_scrape(
     if args.archive:  # and not args.realtime:
         archive_to_cloud_storage(datadir, juris, last_scrape_datetime)
 
+    # only the scrape's own stages, a pipelined import is still recording
+    # into timings, and it can't finish and send them until after close()
+    logger.debug('scrape timings:\n%s', timings.summary())
+    stats.write_timings(
+        timings, {'jurisdiction': juris.name, 'phase': 'scrape'}, prefix='scrape.'
+    )
+
+    if pipeline:
+        pipeline.close()
+
     return report
 
 
@@ -306,7 +454,11 @@ def archive_to_cloud_storage(
 
 
 
-def do_import(juris: State, args: argparse.Namespace) -> dict[str, typing.Any]:
+def do_import(
+    juris: State,
+    args: argparse.Namespace,
+    pipeline: typing.Optional[ImportPipeline] = None,
+) -> dict[str, typing.Any]:
     # import inside here because to avoid loading Django code unnecessarily
     from openstates.data.models import Jurisdiction as DatabaseJurisdiction
     from openstates.importers import (
@@ -324,26 +476,28 @@ def do_import(juris: State, args: argparse.Namespace) -> dict[str, typing.Any]:
     event_importer = EventImporter(juris.jurisdiction_id, vote_event_importer)
     report = {}
 
+    def import_type(importer, **kwargs):  # type: ignore
+        # from the scrape as it happens, or from the JSON it left on disk
+        if pipeline:
+            return importer.import_data(pipeline.stream(importer._type), **kwargs)
+        return importer.import_directory(datadir, **kwargs)
+
+    # with --pipeline this transaction is held open for the whole scrape, so
+    # nothing is committed (or visible to other connections) until it's over
     with transaction.atomic():
         logger.info('import jurisdictions...')
-        report.update(juris_importer.import_directory(datadir))
+        report.update(import_type(juris_importer))
         logger.info("import bills...")
         report.update(
-            bill_importer.import_directory(
-                datadir, allow_duplicates=args.allow_duplicates
-            )
+            import_type(bill_importer, allow_duplicates=args.allow_duplicates)
         )
         logger.info("import vote events...")
         report.update(
-            vote_event_importer.import_directory(
-                datadir, allow_duplicates=args.allow_duplicates
-            )
+            import_type(vote_event_importer, allow_duplicates=args.allow_duplicates)
         )
         logger.info("import events...")
         report.update(
-            event_importer.import_directory(
-                datadir, allow_duplicates=args.allow_duplicates
-            )
+            import_type(event_importer, allow_duplicates=args.allow_duplicates)
         )
         DatabaseJurisdiction.objects.filter(id=juris.jurisdiction_id).update(
             latest_bill_update=datetime.datetime.utcnow()
@@ -353,8 +507,10 @@ def do_import(juris: State, args: argparse.Namespace) -> dict[str, typing.Any]:
     seen_sessions = set()
     seen_sessions.update(bill_importer.get_seen_sessions())
     seen_sessions.update(vote_event_importer.get_seen_sessions())
-    for session in seen_sessions:
-        generate_session_report(session)
+    generate_session_reports(seen_sessions)
+
+    logger.debug('import timings:\n%s', timings.summary())
+    stats.write_timings(timings, {'jurisdiction': juris.name, 'phase': 'import'})
 
     return report
 
@@ -466,9 +622,33 @@ def do_update(
     if 'scrape' in args.actions:
         active_sessions = check_session_list(juris)
 
+    profiler = RunProfiler(args.profile_interval / 1000) if args.profile else None
+
+    def phase(name: str) -> typing.ContextManager:
+        return profiler.phase(name) if profiler else contextlib.nullcontext()
+
+    # import alongside the scrape, rather than from its output afterwards
+    pipeline = None
+    pipelined_import = None
+    if args.pipeline and 'scrape' in args.actions and 'import' in args.actions:
+        pipeline = ImportPipeline(keep_json=not args.pipeline_skip_json)
+
+    if profiler:
+        profiler.start()
     try:
+        if pipeline:
+
+            def import_func(pipeline: ImportPipeline) -> dict[str, typing.Any]:
+                # profiled from the import thread, so its queries are counted
+                with phase('import'):
+                    return do_import(juris, args, pipeline)
+
+            pipelined_import = PipelinedImport(import_func, pipeline)
         if 'scrape' in args.actions:
-            report['scrape'] = do_scrape(juris, args, scrapers, active_sessions)
+            with phase('scrape'):
+                report['scrape'] = do_scrape(
+                    juris, args, scrapers, active_sessions, pipeline
+                )
             stats.write_stats(
                 [
                     {
@@ -492,7 +672,11 @@ def do_update(
         # we skip import in realtime mode since this happens via the lambda function
         # realtime and normal import coexist for now as we refactor realtime
         if "import" in args.actions:  # and not args.realtime:
-            report["import"] = do_import(juris, args)
+            if pipelined_import:
+                report["import"] = pipelined_import.result()
+            else:
+                with phase('import'):
+                    report["import"] = do_import(juris, args)
             stats.write_stats(
                 [
                     {
@@ -507,6 +691,10 @@ def do_update(
             )
         report['success'] = True
     except Exception as exc:
+        if pipelined_import:
+            pipelined_import.abort()
+        if profiler:
+            report['profile'] = finish_profile(profiler, args)
         stats.write_stats(
             [
                 {
@@ -526,7 +714,15 @@ def do_update(
         if 'import' in args.actions:
             save_report(report, juris.jurisdiction_id)
         raise
+    except BaseException:
+        # e.g. KeyboardInterrupt, the import thread would otherwise wait on
+        # scrapers that are never coming and keep the process from exiting
+        if pipelined_import:
+            pipelined_import.abort()
+        raise
     else:
+        if profiler:
+            report['profile'] = finish_profile(profiler, args)
         finish = utils.utcnow()
 
         for scrape_type, details in report.get('scrape', {}).items():  # type: ignore
@@ -580,6 +776,15 @@ def do_update(
         return report
 
 
+def finish_profile(profiler: RunProfiler, args: argparse.Namespace) -> dict:
+    profiler.stop()
+    outdir = os.path.join(settings.SCRAPED_DATA_DIR, args.module)
+    utils.makedirs(outdir)
+    profile = profiler.results(os.path.join(outdir, 'profile.folded'))
+    logger.info(f"wrote collapsed stacks to {profile['output']}")
+    return profile
+
+
 def parse_args() -> tuple[argparse.Namespace, list[str]]:
     parser = argparse.ArgumentParser('openstates', description='openstates CLI')
     parser.add_argument('--debug', action='store_true', help='open debugger on error')
@@ -671,6 +876,44 @@ def parse_args() -> tuple[argparse.Namespace, list[str]]:
         help='enable archiving of realtime processing JSON files, defaults to false',
     )
 
+    # pipelined mode
+    parser.add_argument(
+        '--pipeline',
+        action='store_true',
+        help='import objects while they are being scraped, instead of after the scrape '
+        '(the import transaction stays open for the whole scrape)',
+    )
+    parser.add_argument(
+        '--pipeline-skip-json',
+        action='store_true',
+        dest='pipeline_skip_json',
+        help='with --pipeline, skip writing scraped JSON to the data directory',
+    )
+
+    # parallel sessions
+    parser.add_argument(
+        '--session-workers',
+        type=int,
+        default=1,
+        dest='session_workers',
+        help='scrape up to this many sessions at once, in separate processes (default 1, '
+        'ignored with --pipeline or --profile)',
+    )
+
+    # profiling
+    parser.add_argument(
+        '--profile',
+        action='store_true',
+        help='sample stacks and count queries during the run, results are added to the report',
+    )
+    parser.add_argument(
+        '--profile-interval',
+        type=float,
+        default=10,
+        dest='profile_interval',
+        help='milliseconds between profiler samples (default 10)',
+    )
+
     # process args
     return parser.parse_known_args()
 
@@ -0,0 +1,42 @@
+# Generated by Django 3.2.14 on 2026-10-19 18:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data', '0045_auto_20240705_1812'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BillVersionTextContent',
+            fields=[
+                ('hash', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('depth', models.PositiveIntegerField(default=0)),
+                ('data', models.BinaryField()),
+                ('length', models.PositiveIntegerField()),
+                ('base', models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='data.billversiontextcontent')),
+            ],
+            options={
+                'db_table': 'opencivicdata_billversiontextcontent',
+            },
+        ),
+        migrations.CreateModel(
+            name='BillVersionText',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('bill', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='version_texts', to='data.bill')),
+                ('content', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='data.billversiontextcontent')),
+                ('version_link', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='text', to='data.billversionlink')),
+            ],
+            options={
+                'db_table': 'opencivicdata_billversiontext',
+                'index_together': {('bill', 'created_at')},
+            },
+        ),
+    ]
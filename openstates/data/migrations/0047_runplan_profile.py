@@ -0,0 +1,18 @@
+# Generated by Django 3.2.14 on 2026-10-19 20:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data', '0046_bill_version_text'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='runplan',
+            name='profile',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 3.2.14 on 2026-10-19 23:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def set_urls(apps, schema_editor):
+    BillVersionText = apps.get_model("data", "BillVersionText")
+    for version_text in BillVersionText.objects.select_related("version_link"):
+        version_text.url = version_text.version_link.url
+        version_text.save(update_fields=["url"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data', '0047_runplan_profile'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='billversiontext',
+            name='url',
+            field=models.URLField(default='', max_length=2000),
+            preserve_default=False,
+        ),
+        migrations.RunPython(set_urls, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='billversiontext',
+            name='version_link',
+            field=models.OneToOneField(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='text', to='data.billversionlink'),
+        ),
+        migrations.AlterIndexTogether(
+            name='billversiontext',
+            index_together={('bill', 'created_at'), ('bill', 'url')},
+        ),
+    ]
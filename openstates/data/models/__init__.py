@@ -27,6 +27,8 @@ from .bill import (
     BillActionRelatedEntity,
     BillAction,
     SearchableBill,
+    BillVersionTextContent,
+    BillVersionText,
 )
 from .vote import VoteEvent, VoteCount, PersonVote, VoteSource
 from .event import (
@@ -263,3 +263,61 @@ class SearchableBill(models.Model):
     class Meta:
         db_table = "opencivicdata_searchablebill"
         indexes = [GinIndex(name="search_index", fields=["search_vector"])]
+
+
+class BillVersionTextContent(models.Model):
+    """
+    Compressed extracted text, deduplicated by the sha256 of the full text.
+
+    If base is set, data is a delta against base's text rather than the text
+    itself; depth is the number of deltas to apply to get back to full text.
+    """
+
+    hash = models.CharField(max_length=64, primary_key=True)
+    base = models.ForeignKey(
+        "self", related_name="+", null=True, on_delete=models.PROTECT
+    )
+    depth = models.PositiveIntegerField(default=0)
+    data = models.BinaryField()
+    length = models.PositiveIntegerField()
+
+    def __str__(self):
+        return self.hash
+
+    class Meta:
+        db_table = "opencivicdata_billversiontextcontent"
+
+
+class BillVersionText(models.Model):
+    """
+    The text extracted from a single BillVersionLink, kept for every version
+    of a bill (unlike SearchableBill, which only has the latest).
+
+    Importers delete and recreate version links whenever a bill's versions
+    change, so the text outlives its link (version_link is set to null) and
+    is re-attached to the new link with the same url.
+    """
+
+    version_link = models.OneToOneField(
+        BillVersionLink,
+        related_name="text",
+        null=True,
+        on_delete=models.SET_NULL,
+    )
+    bill = models.ForeignKey(
+        Bill, related_name="version_texts", on_delete=models.CASCADE
+    )
+    url = models.URLField(max_length=2000)
+    content = models.ForeignKey(
+        BillVersionTextContent, related_name="+", on_delete=models.PROTECT
+    )
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return "text of {0}".format(self.version_link)
+
+    class Meta:
+        db_table = "opencivicdata_billversiontext"
+        index_together = [["bill", "created_at"], ["bill", "url"]]
@@ -23,6 +23,8 @@ class RunPlan(models.Model):
     end_time = models.DateTimeField()
     exception = models.TextField(blank=True, default="")
     traceback = models.TextField(blank=True, default="")
+    # from os-update --profile: per-phase timings and query counts, hot functions
+    profile = models.JSONField(default=dict, blank=True)
 
     class Meta:
         db_table = "pupa_runplan"
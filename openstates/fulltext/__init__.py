@@ -9,8 +9,10 @@ from .common import (
     extractor_for_elements_by_class,
     extractor_for_element_by_id,
     extractor_for_element_by_xpath,
+    extractor_for_element_streaming,
     extract_from_code_tags_html,
     textract_extractor,
+    with_ocr,
     Metadata,
     ExtractorFunc,
 )
@@ -41,7 +43,8 @@ CONVERSION_FUNCTIONS = {
     },
     "co": {"application/pdf": extract_sometimes_numbered_pdf},
     "ct": {"text/html": extract_from_p_tags_html, "application/pdf": DoNotDownload},
-    "dc": {"application/pdf": textract_extractor(extension="pdf", method="tesseract")},
+    # DC PDFs are mostly scanned, the OCR fallback takes care of those pages
+    "dc": {"application/pdf": with_ocr(extract_simple_pdf)},
     "de": {
         "text/html": handle_delaware,
         "application/pdf": handle_delaware,
@@ -116,10 +119,10 @@ CONVERSION_FUNCTIONS = {
     },
     "ri": {"application/pdf": extract_sometimes_numbered_pdf},
     # aggressive, but the Washington & Texas HTML are both basically bare
-    "tx": {"text/html": extractor_for_element_by_xpath("//html")},
+    "tx": {"text/html": extractor_for_element_streaming(path="html")},
     "va": {"text/html": extractor_for_element_by_id("mainC")},
     "vt": {"application/pdf": extract_sometimes_numbered_pdf},
-    "wa": {"text/html": extractor_for_element_by_xpath("//html")},
+    "wa": {"text/html": extractor_for_element_streaming(path="html")},
     "wi": {
         "application/pdf": extract_sometimes_numbered_pdf,
         "text/html": DoNotDownload,
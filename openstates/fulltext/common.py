@@ -3,6 +3,7 @@ import re
 import tempfile
 import textract  # type: ignore
 
+from .ocr import pdfdata_to_text_with_ocr
 from .utils import (
     pdfdata_to_text,
     text_after_line_numbers,
@@ -11,30 +12,60 @@ from .utils import (
     text_from_element_xpath,
     text_from_element_siblings_lxml,
     text_from_element_siblings_xpath,
+    text_from_element_streaming,
     clean,
 )
 
 
-class Metadata(typing.TypedDict):
+class _RequiredMetadata(typing.TypedDict):
     url: str
     media_type: str
     title: str
     jurisdiction_id: str
 
 
+class Metadata(_RequiredMetadata, total=False):
+    # session identifier, used to prioritize OCR work
+    session: str
+    # set by with_ocr
+    ocr: bool
+
+
 ExtractorFunc = typing.Callable[[bytes, Metadata], str]
 
 
-def extract_simple_pdf(data: bytes, metadata: Metadata) -> str:
+def with_ocr(func: ExtractorFunc) -> ExtractorFunc:
+    """
+    Turn on the OCR fallback for the PDFs func extracts, for states whose
+    PDFs are (partly) scanned images.
+    """
+
+    def extractor_with_ocr(data: bytes, metadata: Metadata) -> str:
+        return func(data, typing.cast(Metadata, dict(metadata, ocr=True)))
+
+    return extractor_with_ocr
+
+
+def pdf_to_text(data: bytes, metadata: Metadata) -> str:
+    """
+    pdftotext, falling back to OCR for pages that look like scanned images if
+    the extractor was wrapped in with_ocr
+    """
+    if metadata.get("ocr"):
+        return pdfdata_to_text_with_ocr(data, session=metadata.get("session"))
     return pdfdata_to_text(data)
 
 
+def extract_simple_pdf(data: bytes, metadata: Metadata) -> str:
+    return pdf_to_text(data, metadata)
+
+
 def extract_line_numbered_pdf(data: bytes, metadata: Metadata) -> str:
-    return text_after_line_numbers(pdfdata_to_text(data))
+    return text_after_line_numbers(pdf_to_text(data, metadata))
 
 
 def extract_line_post_numbered_pdf(data: bytes, metadata: Metadata) -> str:
-    return text_before_line_numbers(pdfdata_to_text(data))
+    return text_before_line_numbers(pdf_to_text(data, metadata))
 
 
 def extract_sometimes_numbered_pdf(data: bytes, metadata: Metadata) -> str:
@@ -44,7 +75,7 @@ def extract_sometimes_numbered_pdf(data: bytes, metadata: Metadata) -> str:
     to determine which extraction function to use.
     """
 
-    pdf_text = pdfdata_to_text(data)
+    pdf_text = pdf_to_text(data, metadata)
     lines = pdf_text.split("\n")
 
     # Looking for lines that begin with a number
@@ -57,10 +88,11 @@ def extract_sometimes_numbered_pdf(data: bytes, metadata: Metadata) -> str:
 
     ratio_of_numbered_lines = len(number_of_numbered_lines) / len(lines)
 
+    # reuse the text rather than re-running extraction (and possibly OCR)
     if ratio_of_numbered_lines > THRESHOLD_NUMBERED_PDF:
-        return extract_line_numbered_pdf(data, metadata)
+        return text_after_line_numbers(pdf_text)
     else:
-        return extract_simple_pdf(data, metadata)
+        return pdf_text
 
 
 def extract_pre_tag_html(data: bytes, metadata: Metadata) -> str:
@@ -115,6 +147,30 @@ def extractor_for_element_by_xpath(bill_text_element_selector: str) -> Extractor
     return _my_extractor
 
 
+def extractor_for_element_streaming(
+    tag: str = "*",
+    element_id: typing.Optional[str] = None,
+    element_class: typing.Optional[str] = None,
+    path: typing.Optional[str] = None,
+) -> ExtractorFunc:
+    """
+    For very large pages (e.g. TX & WA omnibus bills) parse incrementally,
+    keeping only the text inside the target element.
+    """
+
+    def _my_extractor(data: bytes, metadata: Metadata) -> str:
+        text_inside_matching_tag = text_from_element_streaming(
+            data,
+            tag=tag,
+            element_id=element_id,
+            element_class=element_class,
+            path=path,
+        )
+        return clean(text_inside_matching_tag)
+
+    return _my_extractor
+
+
 def extractor_for_elements_by_xpath(bill_text_element_selector: str) -> ExtractorFunc:
     def _my_extractor(data: bytes, metadata: Metadata) -> str:
         text_inside_matching_tag = text_from_element_siblings_xpath(
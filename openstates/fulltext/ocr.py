@@ -0,0 +1,249 @@
+import os
+import re
+import time
+import queue
+import typing
+import hashlib
+import logging
+import tempfile
+import itertools
+import threading
+import contextlib
+import contextvars
+import subprocess
+from concurrent.futures import Future
+
+from .utils import pdfdata_to_text
+
+logger = logging.getLogger("openstates")
+
+# pages with fewer letters/digits than this are assumed to be scanned images
+MIN_PAGE_CHARS = 20
+OCR_WORKERS = int(os.environ.get("OCR_WORKERS", max(1, (os.cpu_count() or 2) // 2)))
+# maximum number of seconds spent on OCR for any one document
+OCR_TIME_BUDGET = float(os.environ.get("OCR_TIME_BUDGET", 120))
+
+
+def sparse_pages(pages: list[str], min_chars: int = MIN_PAGE_CHARS) -> list[int]:
+    """return indexes of pages where pdftotext found (next to) no text"""
+    return [
+        i for i, page in enumerate(pages) if sum(c.isalnum() for c in page) < min_chars
+    ]
+
+
+def session_priority(session: typing.Optional[str]) -> int:
+    """
+    Sort key for OCR work, lower runs first: newest sessions first.
+
+    Session identifiers vary by state ("2023", "2023S1", "30", "2021-2022"),
+    the largest number in them is used as the session's age.
+    """
+    numbers = [int(n) for n in re.findall(r"\d+", session or "")]
+    return -max(numbers) if numbers else 0
+
+
+def ocr_pdf_page(pdf_path: str, page: int, timeout: float) -> str:
+    """rasterize a single (0-indexed) page with pdftoppm and OCR it with tesseract"""
+    deadline = time.monotonic() + timeout
+    # keep tesseract from spreading across cores, the worker pool is the bound
+    env = dict(os.environ, OMP_THREAD_LIMIT="1")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        prefix = os.path.join(tmpdir, "page")
+        subprocess.run(
+            [
+                "pdftoppm",
+                "-f",
+                str(page + 1),
+                "-l",
+                str(page + 1),
+                "-r",
+                "300",
+                "-gray",
+                "-png",
+                "-singlefile",
+                pdf_path,
+                prefix,
+            ],
+            check=True,
+            capture_output=True,
+            timeout=timeout,
+        )
+        result = subprocess.run(
+            ["tesseract", prefix + ".png", "stdout"],
+            check=True,
+            capture_output=True,
+            env=env,
+            timeout=max(deadline - time.monotonic(), 0.01),
+        )
+    return result.stdout.decode("utf8", "ignore")
+
+
+class _Document:
+    """a PDF queued for OCR, resolving future once all its pages are done"""
+
+    def __init__(
+        self,
+        path: str,
+        pages: list[int],
+        time_budget: float,
+        on_done: typing.Callable[[dict[int, str]], None],
+    ):
+        self.path = path
+        self.on_done = on_done
+        self.time_budget = time_budget
+        self.remaining = len(pages)
+        self.results: dict[int, str] = {}
+        # the budget starts once the first page is worked on, not when queued
+        self.deadline: typing.Optional[float] = None
+        self.future: Future = Future()
+        self.lock = threading.Lock()
+
+    def start_page(self) -> float:
+        """seconds left for this document"""
+        with self.lock:
+            if self.deadline is None:
+                self.deadline = time.monotonic() + self.time_budget
+            return self.deadline - time.monotonic()
+
+    def page_done(self) -> None:
+        with self.lock:
+            self.remaining -= 1
+            if self.remaining:
+                return
+        os.remove(self.path)
+        # before the future resolves, so whoever waits on it sees the results
+        self.on_done(self.results)
+        self.future.set_result(self.results)
+
+
+class OCRScheduler:
+    """
+    Runs OCR for individual pages on a fixed-size pool of worker threads
+    (each driving pdftoppm/tesseract subprocesses) so OCR can't take over
+    every core of the machine.
+
+    Pages from every queued document share one priority queue, and each
+    document gets a time budget once work on it starts, pages that haven't
+    been OCRed by then are given up on.
+    """
+
+    def __init__(
+        self, workers: int = OCR_WORKERS, time_budget: float = OCR_TIME_BUDGET
+    ):
+        self.workers = workers
+        self.time_budget = time_budget
+        self._queue: queue.PriorityQueue = queue.PriorityQueue()
+        self._counter = itertools.count()
+        self._threads: list[threading.Thread] = []
+        self._lock = threading.Lock()
+        # sha1 of a document -> OCRed pages, until the document is re-extracted
+        self.completed: dict[str, dict[int, str]] = {}
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._threads:
+                return
+            for _ in range(self.workers):
+                thread = threading.Thread(target=self._work, daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _work(self) -> None:
+        while True:
+            _, _, (doc, page) = self._queue.get()
+            try:
+                remaining = doc.start_page()
+                if remaining <= 0:
+                    raise TimeoutError(f"no time left to OCR page {page}")
+                doc.results[page] = ocr_pdf_page(doc.path, page, remaining)
+            except Exception as e:
+                logger.warning(f"OCR failed for page {page}: {e}")
+            finally:
+                doc.page_done()
+
+    def submit(
+        self, data: bytes, pages: list[int], priority: int = 0, keep: bool = True
+    ) -> Future:
+        """
+        Queue the given pages of a PDF for OCR without waiting.  The future
+        resolves to text for each page that was successfully OCRed, which
+        (if keep is set) is also kept in completed for the next extraction of
+        the same document.
+        """
+        if not pages:
+            future: Future = Future()
+            future.set_result({})
+            return future
+        self._start()
+        key = hashlib.sha1(data).hexdigest()
+
+        def on_done(results: dict[int, str]) -> None:
+            if keep:
+                self.completed[key] = results
+
+        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmpf:
+            tmpf.write(data)
+        doc = _Document(tmpf.name, pages, self.time_budget, on_done)
+        for page in pages:
+            self._queue.put((priority, next(self._counter), (doc, page)))
+        return doc.future
+
+    def ocr_pages(
+        self, data: bytes, pages: list[int], priority: int = 0
+    ) -> dict[int, str]:
+        """OCR the given pages of a PDF, waiting for them to be done"""
+        return typing.cast(
+            dict[int, str], self.submit(data, pages, priority, keep=False).result()
+        )
+
+
+scheduler = OCRScheduler()
+
+_deferred: contextvars.ContextVar[
+    typing.Optional[list[Future]]
+] = contextvars.ContextVar("deferred_ocr", default=None)
+
+
+@contextlib.contextmanager
+def deferred() -> typing.Iterator[list[Future]]:
+    """
+    Within the block OCR is queued rather than waited on: documents come back
+    with only their pdftotext text, and the future for each one queued is
+    added to the yielded list.  Extracting a document again once its future
+    is done picks up the OCRed pages.
+    """
+    queued: list[Future] = []
+    token = _deferred.set(queued)
+    try:
+        yield queued
+    finally:
+        _deferred.reset(token)
+
+
+def pdfdata_to_text_with_ocr(data: bytes, session: typing.Optional[str] = None) -> str:
+    """
+    Tiered PDF extraction: pdftotext for everything, then OCR only for the
+    pages that came back (nearly) empty, e.g. scanned images.
+    """
+    text = pdfdata_to_text(data)
+    # pdftotext ends every page with a form feed
+    pages = text.split("\f")
+    if text.endswith("\f"):
+        pages.pop()
+
+    ocr_text = scheduler.completed.pop(hashlib.sha1(data).hexdigest(), None)
+    if ocr_text is None:
+        sparse = sparse_pages(pages)
+        queued = _deferred.get()
+        if queued is not None:
+            if sparse:
+                queued.append(
+                    scheduler.submit(data, sparse, priority=session_priority(session))
+                )
+            return text
+        ocr_text = scheduler.ocr_pages(data, sparse, priority=session_priority(session))
+    if not ocr_text:
+        return text
+    for page, page_text in ocr_text.items():
+        pages[page] = page_text
+    return "".join(page + "\f" for page in pages)
@@ -0,0 +1,259 @@
+"""
+Versioned storage of extracted bill text.
+
+Every BillVersionLink that text was extracted from gets a BillVersionText
+pointing at a BillVersionTextContent.  Contents are zlib-compressed and keyed
+by the sha256 of the full text, so identical text is only ever stored once.
+A new version of a bill is stored as a line-based delta against the previous
+version's text whenever that is smaller, with a full copy at least every
+MAX_DELTA_DEPTH versions so that reading the latest text stays cheap.
+
+Importers recreate version links, so a BillVersionText whose link was deleted
+is kept (with version_link unset) and re-attached by url when text for the new
+link is saved.  Contents no longer referenced are removed by collect_garbage.
+"""
+import json
+import zlib
+import typing
+import difflib
+import hashlib
+
+MAX_DELTA_DEPTH = 8
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf8")).hexdigest()
+
+
+def make_delta(base: str, text: str) -> bytes:
+    """
+    Encode text relative to base as a list of operations:
+    [start, end] copies base lines start:end, a string is inserted as-is.
+    """
+    base_lines = base.splitlines(keepends=True)
+    lines = text.splitlines(keepends=True)
+    ops: list[typing.Union[list[int], str]] = []
+    matcher = difflib.SequenceMatcher(None, base_lines, lines)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            ops.append([i1, i2])
+        elif tag in ("replace", "insert"):
+            ops.append("".join(lines[j1:j2]))
+    return zlib.compress(json.dumps(ops).encode("utf8"), 9)
+
+
+def apply_delta(base: str, delta: bytes) -> str:
+    base_lines = base.splitlines(keepends=True)
+    parts = []
+    for op in json.loads(zlib.decompress(delta)):
+        if isinstance(op, str):
+            parts.append(op)
+        else:
+            parts.extend(base_lines[op[0] : op[1]])
+    return "".join(parts)
+
+
+CHAIN_SQL = """
+WITH RECURSIVE chain AS (
+    SELECT * FROM opencivicdata_billversiontextcontent WHERE hash = %s
+  UNION ALL
+    SELECT c.* FROM opencivicdata_billversiontextcontent c
+    JOIN chain ON c.hash = chain.base_id
+)
+SELECT * FROM chain
+"""
+
+
+def get_text(content: typing.Any) -> str:
+    """reconstruct the full text of a BillVersionTextContent"""
+    from openstates.data.models import BillVersionTextContent
+
+    if content.base_id:
+        # the whole delta chain in one query, full text (depth 0) first
+        chain = sorted(
+            BillVersionTextContent.objects.raw(CHAIN_SQL, [content.base_id]),
+            key=lambda c: c.depth,
+        )
+    else:
+        chain = []
+    chain.append(content)
+
+    text = zlib.decompress(chain[0].data).decode("utf8")
+    for delta in chain[1:]:
+        text = apply_delta(text, delta.data)
+    return text
+
+
+def _build_content(
+    text: str, previous: typing.Any, previous_text: typing.Optional[str]
+) -> typing.Any:
+    from openstates.data.models import BillVersionTextContent
+
+    content = BillVersionTextContent(
+        hash=text_hash(text),
+        data=zlib.compress(text.encode("utf8"), 9),
+        length=len(text),
+    )
+    if previous is not None and previous.depth < MAX_DELTA_DEPTH:
+        delta = make_delta(previous_text or "", text)
+        if len(delta) < len(content.data):
+            content.base = previous
+            content.depth = previous.depth + 1
+            content.data = delta
+    return content
+
+
+def _texts_for_links(
+    links: list[typing.Any], select_related: typing.Sequence[str] = ()
+) -> dict[str, typing.Any]:
+    """
+    BillVersionTexts for a list of links by link id, falling back to the most
+    recent text left behind (with no link) by an earlier link with the same url
+    """
+    from openstates.data.models import BillVersionText
+
+    texts = {
+        vt.version_link_id: vt
+        for vt in BillVersionText.objects.filter(version_link__in=links).select_related(
+            *select_related
+        )
+    }
+    missing = {(link.version.bill_id, link.url): link for link in links}
+    for link in links:
+        if link.id in texts:
+            missing.pop((link.version.bill_id, link.url), None)
+    if missing:
+        for vt in (
+            BillVersionText.objects.filter(
+                version_link__isnull=True,
+                bill_id__in={bill_id for bill_id, _ in missing},
+                url__in={url for _, url in missing},
+            )
+            .select_related(*select_related)
+            .order_by("created_at")
+        ):
+            link = missing.get((vt.bill_id, vt.url))
+            if link:
+                # later rows overwrite earlier ones, so the newest wins
+                texts[link.id] = vt
+    return texts
+
+
+def save_version_texts(
+    items: typing.Iterable[tuple[typing.Any, str]]
+) -> list[typing.Any]:
+    """
+    Store extracted text for a batch of (BillVersionLink, text) pairs, at most
+    one per bill, returning the saved BillVersionText objects.
+
+    Existing contents, existing texts and each bill's previous version are
+    looked up for the whole batch at once.  A text orphaned by the importer
+    recreating its link is re-attached to the new link with the same url.
+    """
+    from openstates.data.models import BillVersionText, BillVersionTextContent
+
+    items = [(link, text) for link, text in items if text]
+    if not items:
+        return []
+
+    hashes = {text_hash(text) for _, text in items}
+    contents = BillVersionTextContent.objects.in_bulk(list(hashes))
+    existing = _texts_for_links([link for link, _ in items])
+    bill_ids = {link.version.bill_id for link, _ in items}
+    previous: dict[str, typing.Any] = {}
+    for vt in (
+        BillVersionText.objects.filter(bill_id__in=bill_ids)
+        .select_related("content")
+        .order_by("bill_id", "-created_at")
+        .distinct("bill_id")
+    ):
+        previous[vt.bill_id] = vt
+
+    new_contents: dict[str, typing.Any] = {}
+    to_create = []
+    to_update = []
+    for link, text in items:
+        content_hash = text_hash(text)
+        if content_hash not in contents and content_hash not in new_contents:
+            prev = previous.get(link.version.bill_id)
+            prev_content = prev.content if prev else None
+            prev_text = get_text(prev_content) if prev_content else None
+            new_contents[content_hash] = _build_content(text, prev_content, prev_text)
+
+        if link.id in existing:
+            version_text = existing[link.id]
+            if (
+                version_text.content_id != content_hash
+                or version_text.version_link_id != link.id
+            ):
+                version_text.content_id = content_hash
+                version_text.version_link = link
+                to_update.append(version_text)
+        else:
+            version_text = BillVersionText(
+                version_link=link,
+                bill_id=link.version.bill_id,
+                url=link.url,
+                content_id=content_hash,
+            )
+            to_create.append(version_text)
+
+    BillVersionTextContent.objects.bulk_create(
+        new_contents.values(), ignore_conflicts=True
+    )
+    BillVersionText.objects.bulk_create(to_create)
+    BillVersionText.objects.bulk_update(to_update, ["content", "version_link"])
+    return to_create + to_update
+
+
+def latest_text(bill: typing.Any) -> typing.Optional[str]:
+    """text of the most recently stored version of a bill"""
+    from openstates.data.models import BillVersionText
+
+    version_text = (
+        BillVersionText.objects.filter(bill=bill)
+        .select_related("content")
+        .order_by("-created_at")
+        .first()
+    )
+    return get_text(version_text.content) if version_text else None
+
+
+def diff_version_texts(old_link: typing.Any, new_link: typing.Any) -> str:
+    """unified diff between the stored text of two BillVersionLinks"""
+    texts = {
+        link_id: get_text(vt.content)
+        for link_id, vt in _texts_for_links(
+            [old_link, new_link], select_related=["content"]
+        ).items()
+    }
+    return "".join(
+        difflib.unified_diff(
+            texts.get(old_link.id, "").splitlines(keepends=True),
+            texts.get(new_link.id, "").splitlines(keepends=True),
+            fromfile=str(old_link.version),
+            tofile=str(new_link.version),
+        )
+    )
+
+
+def collect_garbage() -> int:
+    """
+    delete contents that no BillVersionText uses and that no other content is
+    a delta against, returning how many were deleted
+    """
+    from django.db.models import Exists, OuterRef  # type: ignore
+    from openstates.data.models import BillVersionText, BillVersionTextContent
+
+    deleted = 0
+    while True:
+        # removing a delta can leave its base unreferenced, so repeat until
+        # nothing else goes
+        unreferenced = BillVersionTextContent.objects.filter(
+            ~Exists(BillVersionText.objects.filter(content_id=OuterRef("hash"))),
+            ~Exists(BillVersionTextContent.objects.filter(base_id=OuterRef("hash"))),
+        )
+        count, _ = unreferenced.delete()
+        if not count:
+            return deleted
+        deleted += count
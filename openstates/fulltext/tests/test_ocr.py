@@ -0,0 +1,120 @@
+import time
+import threading
+import pytest  # type: ignore
+from openstates.fulltext import common, ocr
+
+
+def test_sparse_pages():
+    pages = ["AN ACT relating to roads and bridges", "  \n  3  \n", ""]
+    assert ocr.sparse_pages(pages) == [1, 2]
+
+
+def test_session_priority_newest_first():
+    sessions = ["2021", "2023S1", "29", "2021-2022", None]
+    assert sorted(sessions, key=ocr.session_priority) == [
+        "2023S1",
+        "2021-2022",
+        "2021",
+        "29",
+        None,
+    ]
+
+
+def test_scheduler_priority_order(monkeypatch):
+    order = []
+    release = threading.Event()
+
+    def fake_ocr(pdf_path, page, timeout):
+        release.wait()
+        order.append(page)
+        return f"page {page}"
+
+    monkeypatch.setattr(ocr, "ocr_pdf_page", fake_ocr)
+    scheduler = ocr.OCRScheduler(workers=1, time_budget=5)
+
+    # block the single worker so that the rest queue up
+    blocker = threading.Thread(target=scheduler.ocr_pages, args=(b"", [0], 0))
+    blocker.start()
+    time.sleep(0.1)
+    old = threading.Thread(target=scheduler.ocr_pages, args=(b"", [10], -2019))
+    old.start()
+    time.sleep(0.1)
+    results = {}
+
+    def run_new():
+        results.update(scheduler.ocr_pages(b"", [20, 21], -2023))
+
+    new = threading.Thread(target=run_new)
+    new.start()
+    time.sleep(0.1)
+    release.set()
+    for thread in (blocker, old, new):
+        thread.join()
+
+    assert order == [0, 20, 21, 10]
+    assert results == {20: "page 20", 21: "page 21"}
+
+
+def test_scheduler_time_budget(monkeypatch):
+    def slow_ocr(pdf_path, page, timeout):
+        time.sleep(0.3)
+        return "text"
+
+    monkeypatch.setattr(ocr, "ocr_pdf_page", slow_ocr)
+    scheduler = ocr.OCRScheduler(workers=1, time_budget=0.5)
+    # only the first page or so fits in the budget, the rest are skipped
+    results = scheduler.ocr_pages(b"", [0, 1, 2, 3])
+    assert 1 <= len(results) < 4
+
+
+@pytest.mark.parametrize("ocr_result", [{}, {1: "OCR TEXT"}])
+def test_pdfdata_to_text_with_ocr(monkeypatch, ocr_result):
+    text = "page one has plenty of text on it\fscanned\f"
+    requested = []
+
+    def fake_ocr_pages(data, pages, priority=0):
+        requested.append(pages)
+        return ocr_result
+
+    monkeypatch.setattr(ocr, "pdfdata_to_text", lambda data: text)
+    monkeypatch.setattr(ocr.scheduler, "ocr_pages", fake_ocr_pages)
+    result = ocr.pdfdata_to_text_with_ocr(b"", session="2023")
+    assert requested == [[1]]
+    if ocr_result:
+        assert result == "page one has plenty of text on it\fOCR TEXT\f"
+    else:
+        assert result == text
+
+
+def test_deferred_ocr(monkeypatch):
+    text = "page one has plenty of text on it\fscanned\f"
+    monkeypatch.setattr(ocr, "pdfdata_to_text", lambda data: text)
+    monkeypatch.setattr(ocr, "ocr_pdf_page", lambda path, page, timeout: "OCR TEXT")
+    monkeypatch.setattr(ocr, "scheduler", ocr.OCRScheduler(workers=1))
+
+    # queued, not waited on
+    with ocr.deferred() as queued:
+        assert ocr.pdfdata_to_text_with_ocr(b"pdf", session="2023") == text
+    (future,) = queued
+    assert future.result(timeout=5) == {1: "OCR TEXT"}
+
+    # extracting again once it's done picks up the OCRed page
+    with ocr.deferred() as queued:
+        result = ocr.pdfdata_to_text_with_ocr(b"pdf", session="2023")
+    assert result == "page one has plenty of text on it\fOCR TEXT\f"
+    assert queued == []
+    assert ocr.scheduler.completed == {}
+
+
+def test_ocr_is_opt_in(monkeypatch):
+    requested = []
+    monkeypatch.setattr(
+        common, "pdfdata_to_text_with_ocr", lambda data, session: requested.append(1)
+    )
+    monkeypatch.setattr(common, "pdfdata_to_text", lambda data: "text")
+    metadata = {"url": "", "media_type": "", "title": "", "jurisdiction_id": ""}
+
+    assert common.extract_simple_pdf(b"", metadata) == "text"
+    assert requested == []
+    common.with_ocr(common.extract_simple_pdf)(b"", metadata)
+    assert requested == [1]
@@ -0,0 +1,142 @@
+import pytest  # type: ignore
+from openstates.fulltext import store
+
+BILL_TEXT = "".join(f"Section {i}. The state shall do thing {i}.\n" for i in range(200))
+
+
+def test_delta_roundtrip():
+    amended = BILL_TEXT.replace("thing 10.", "other thing 10.").replace(
+        "Section 150. The state shall do thing 150.\n", ""
+    )
+    amended += "Section 200. Effective date.\n"
+    delta = store.make_delta(BILL_TEXT, amended)
+    assert store.apply_delta(BILL_TEXT, delta) == amended
+    # only the changed lines are stored
+    assert len(delta) < len(amended) / 10
+
+
+def test_delta_no_trailing_newline():
+    delta = store.make_delta("a\nb", "a\nc")
+    assert store.apply_delta("a\nb", delta) == "a\nc"
+
+
+@pytest.mark.django_db
+def test_save_version_texts():
+    from openstates.data.models import (
+        Division,
+        Jurisdiction,
+        Bill,
+        BillVersionText,
+        BillVersionTextContent,
+    )
+
+    Division.objects.create(id="ocd-division/country:us", name="USA")
+    j = Jurisdiction.objects.create(id="jid", division_id="ocd-division/country:us")
+    session = j.legislative_sessions.create(identifier="1900", name="1900")
+    bill = Bill.objects.create(
+        identifier="HB1", title="One", legislative_session=session
+    )
+    other = Bill.objects.create(
+        identifier="HB2", title="Two", legislative_session=session
+    )
+
+    v1 = bill.versions.create(note="Introduced", date="1900-01-01")
+    link1 = v1.links.create(url="https://example.com/1", media_type="text/html")
+    store.save_version_texts([(link1, BILL_TEXT)])
+    first = BillVersionTextContent.objects.get()
+    assert first.base is None
+
+    amended = BILL_TEXT.replace("thing 10.", "other thing 10.")
+    v2 = bill.versions.create(note="Amended", date="1900-02-01")
+    link2 = v2.links.create(url="https://example.com/2", media_type="text/html")
+    store.save_version_texts([(link2, amended)])
+    second = BillVersionTextContent.objects.get(hash=store.text_hash(amended))
+    assert second.base_id == first.hash
+    assert second.depth == 1
+    assert store.latest_text(bill) == amended
+    assert "+Section 10. The state shall do other thing 10." in (
+        store.diff_version_texts(link1, link2)
+    )
+
+    # identical text on another bill is deduplicated
+    ov = other.versions.create(note="Introduced", date="1900-01-01")
+    olink = ov.links.create(url="https://example.com/3", media_type="text/html")
+    store.save_version_texts([(olink, BILL_TEXT)])
+    assert BillVersionTextContent.objects.count() == 2
+    assert BillVersionText.objects.count() == 3
+    assert store.latest_text(other) == BILL_TEXT
+
+
+def _make_bill():
+    from openstates.data.models import Division, Jurisdiction, Bill
+
+    Division.objects.create(id="ocd-division/country:us", name="USA")
+    j = Jurisdiction.objects.create(id="jid", division_id="ocd-division/country:us")
+    session = j.legislative_sessions.create(identifier="1900", name="1900")
+    return Bill.objects.create(
+        identifier="HB1", title="One", legislative_session=session
+    )
+
+
+@pytest.mark.django_db
+def test_save_version_texts_after_reimport():
+    from openstates.data.models import BillVersionText, BillVersionTextContent
+
+    bill = _make_bill()
+    v1 = bill.versions.create(note="Introduced", date="1900-01-01")
+    link1 = v1.links.create(url="https://example.com/1", media_type="text/html")
+    store.save_version_texts([(link1, BILL_TEXT)])
+
+    # the importer deletes and recreates versions whenever they change
+    bill.versions.all().delete()
+    assert BillVersionText.objects.get().version_link is None
+    v1 = bill.versions.create(note="Introduced", date="1900-01-01")
+    link1 = v1.links.create(url="https://example.com/1", media_type="text/html")
+    amended = BILL_TEXT.replace("thing 10.", "other thing 10.")
+    v2 = bill.versions.create(note="Amended", date="1900-02-01")
+    link2 = v2.links.create(url="https://example.com/2", media_type="text/html")
+
+    store.save_version_texts([(link2, amended)])
+    second = BillVersionTextContent.objects.get(hash=store.text_hash(amended))
+    assert second.base_id == store.text_hash(BILL_TEXT)
+    assert "+Section 10. The state shall do other thing 10." in (
+        store.diff_version_texts(link1, link2)
+    )
+
+    # saving the old version again re-attaches its text instead of adding one
+    store.save_version_texts([(link1, BILL_TEXT)])
+    assert BillVersionText.objects.count() == 2
+    assert BillVersionText.objects.get(url="https://example.com/1").version_link == (
+        link1
+    )
+
+
+@pytest.mark.django_db
+def test_collect_garbage():
+    from openstates.data.models import BillVersionText, BillVersionTextContent
+
+    bill = _make_bill()
+    texts = [BILL_TEXT]
+    for n in range(3):
+        texts.append(texts[-1].replace(f"thing {n}.", f"other thing {n}."))
+    for n, text in enumerate(texts):
+        version = bill.versions.create(note=f"Version {n}", date="1900-01-01")
+        link = version.links.create(url=f"https://example.com/{n}", media_type="pdf")
+        store.save_version_texts([(link, text)])
+    assert BillVersionTextContent.objects.count() == 4
+    assert store.collect_garbage() == 0
+
+    # the latest two texts go, the first two are still used
+    BillVersionText.objects.filter(
+        url__in=["https://example.com/2", "https://example.com/3"]
+    ).delete()
+    assert store.collect_garbage() == 2
+    assert BillVersionTextContent.objects.count() == 2
+    assert store.latest_text(bill) == texts[1]
+
+    # a content that is only a base for another is kept until that one goes
+    BillVersionText.objects.filter(url="https://example.com/0").delete()
+    assert store.collect_garbage() == 0
+    BillVersionText.objects.all().delete()
+    assert store.collect_garbage() == 2
+    assert not BillVersionTextContent.objects.exists()
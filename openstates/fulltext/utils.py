@@ -1,8 +1,9 @@
 import re
 import tempfile
+import typing
 import functools
 import subprocess
-from lxml import html  # type: ignore
+from lxml import etree, html  # type: ignore
 
 
 def pdfdata_to_text(data: bytes) -> str:
@@ -35,7 +36,7 @@ def clean(text: str) -> str:
 
 
 def _text_near_line_numbers(lines: str, regex: str) -> str:
-    """ used for before & after line numbers """
+    """used for before & after line numbers"""
     text = []
     for line in lines.splitlines():
         # real bill text starts with an optional space, line number,
@@ -106,3 +107,99 @@ def text_from_element_siblings_xpath(data: bytes, lxml_query: str) -> str:
         text_inside_elements += element.text_content() + "\n"
 
     return text_inside_elements
+
+
+def text_from_element_streaming(
+    data: bytes,
+    tag: str = "*",
+    element_id: typing.Optional[str] = None,
+    element_class: typing.Optional[str] = None,
+    path: typing.Optional[str] = None,
+    chunk_size: int = 1024 * 1024,
+) -> str:
+    """
+    Incremental equivalent of text_from_element_lxml for very large pages.
+
+    The target element is selected by tag, exact id/class attribute, and/or
+    a simple path of tags from the root (e.g. "html" or "html/body/div").
+
+    After every chunk the finished parts of the document are turned into
+    text (inside the target) or thrown away (outside of it), so the full
+    tree never exists in memory.  Parser events are only requested for the
+    target's tag, which keeps the per-element Python overhead off the hot path.
+    """
+    path_tags = path.strip("/").split("/") if path else None
+    if tag == "*" and path_tags:
+        tag = path_tags[-1]
+    # html is always requested so that the root is known as early as possible
+    parser = etree.HTMLPullParser(
+        events=("start", "end"), tag=None if tag == "*" else ["html", tag]
+    )
+
+    root = None
+    target = None
+    collected: list[str] = []
+    results: list[str] = []
+
+    def matches(element: typing.Any) -> bool:
+        if tag != "*" and element.tag != tag:
+            return False
+        if element_id is not None and element.get("id") != element_id:
+            return False
+        if element_class is not None and element.get("class") != element_class:
+            return False
+        if path_tags is not None:
+            ancestors = [a.tag for a in element.iterancestors()]
+            return ancestors[::-1] + [element.tag] == path_tags
+        return True
+
+    def handle_events() -> None:
+        nonlocal root, target
+        for event, element in parser.read_events():
+            if root is None:
+                root = element.getroottree().getroot()
+            if event == "start":
+                if target is None and matches(element):
+                    target = element
+            elif element is target:
+                collected.append(
+                    etree.tostring(
+                        element, method="text", encoding=str, with_tail=False
+                    )
+                )
+                results.append("".join(collected))
+                collected.clear()
+                target = None
+                element.clear(keep_tail=True)
+
+    def trim() -> None:
+        # every open element is the last child of its parent, so walking the
+        # chain of last children visits all of them (including the target);
+        # anything before that chain has been completely parsed
+        element = root
+        inside = False
+        while element is not None and len(element):
+            inside = inside or element is target
+            if inside and element.text:
+                collected.append(element.text)
+                element.text = None
+            finished = len(element) - 1
+            if finished and inside:
+                holder = etree.Element("div")
+                holder.extend(element[:finished])
+                collected.append(etree.tostring(holder, method="text", encoding=str))
+            elif finished:
+                del element[:finished]
+            element = element[-1]
+
+    view = memoryview(data)
+    for start in range(0, len(view), chunk_size):
+        parser.feed(bytes(view[start : start + chunk_size]))
+        handle_events()
+        trim()
+    parser.close()
+    handle_events()
+
+    # same contract as text_from_element_lxml: exactly one match is expected
+    assert len(results) == 1, f"{len(results)} matches for {tag} {path or ''}"
+    return results[0]
@@ -12,7 +12,9 @@ from .. import settings
 from ..data.models import LegislativeSession, Person, Bill
 from ..exceptions import DuplicateItemError, UnresolvedIdError, DataImportError
 from ..utils import get_pseudo_id, utcnow
+from ..utils.timing import timings
 from ._types import _ID, _JsonDict, _RelatedModels, _TransformerMapping
+from .queries import ImportQueryStats
 
 _PersonCacheKey = typing.Tuple[str, typing.Optional[str], typing.Optional[str]]
 
@@ -234,7 +236,9 @@ class BaseImporter:
 
         if json_id.startswith("~"):
             # keep caches of all the pseudo-ids to avoid doing 1000s of lookups during import
-            if json_id not in self.pseudo_id_cache:
+            cached = json_id in self.pseudo_id_cache
+            timings.count("resolve_json_id", hit=cached)
+            if not cached:
                 spec = get_pseudo_id(json_id)
                 spec = self.limit_spec(spec)
 
@@ -323,24 +327,35 @@ class BaseImporter:
             "start": utcnow(),
             "records": {"insert": [], "update": [], "noop": []},
         }
+        query_stats = ImportQueryStats(self)
+
+        with query_stats.capture():
+            for json_id, data in self._prepare_imports(data_items):
+                with query_stats.item():
+                    obj_id, what = self.import_item(data, allow_duplicates)
+                if not obj_id or not what:
+                    "Skipping data because it did not have an associated ID or type"
+                    continue
+                self.json_to_db_id[json_id] = obj_id
+                record["records"][what].append(obj_id)
+                record[what] += 1
 
-        for json_id, data in self._prepare_imports(data_items):
-            obj_id, what = self.import_item(data, allow_duplicates)
-            if not obj_id or not what:
-                "Skipping data because it did not have an associated ID or type"
-                continue
-            self.json_to_db_id[json_id] = obj_id
-            record["records"][what].append(obj_id)
-            record[what] += 1
-
-        # all objects are loaded, a perfect time to do inter-object resolution and other tasks
-        if self.json_to_db_id and self.do_postimport:
-            # only do postimport step if requested by client code AND there are some items of this type
-            # resolution of bills take a long time if not
-            # and events & votes get deleted!
-            self.postimport()
+            # all objects are loaded, a perfect time to do inter-object resolution and other tasks
+            if self.json_to_db_id and self.do_postimport:
+                # only do postimport step if requested by client code AND there are some items of this type
+                # resolution of bills take a long time if not
+                # and events & votes get deleted!
+                self.postimport()
 
         record["end"] = utcnow()
+        if query_stats.enabled:
+            record["queries"] = query_stats.summary()
+            for pattern in record["queries"]["n_plus_one"]:
+                self.warning(
+                    f"possible N+1 in {pattern['method']}: ran {pattern['max_per_item']} "
+                    f"times for one {self._type} ({pattern['items']} items): "
+                    f"{pattern['fingerprint'][:200]}"
+                )
 
         return {self._type: record}
 
@@ -359,14 +374,16 @@ class BaseImporter:
             data.pop("bill_identifier", None)
 
         # add fields/etc.
-        data = self.apply_transformers(data)
-        try:
-            data = self.prepare_for_db(data)
-        except UnresolvedIdError:
-            return None, what
+        with timings.timer(f"import.{self._type}.prepare"):
+            data = self.apply_transformers(data)
+            try:
+                data = self.prepare_for_db(data)
+            except UnresolvedIdError:
+                return None, what
 
         try:
-            obj = self.get_object(data)
+            with timings.timer(f"import.{self._type}.get_object"):
+                obj = self.get_object(data)
         except self.model_class.DoesNotExist:
             obj = None
 
@@ -389,29 +406,32 @@ class BaseImporter:
                     setattr(obj, key, value)
                     what = "update"
 
-            updated = self._update_related(obj, related, self.related_models)
+            with timings.timer(f"import.{self._type}.related_diff"):
+                updated = self._update_related(obj, related, self.related_models)
             if updated:
                 what = "update"
 
             if what == "update":
-                # make sure to do this after create related
-                self.update_computed_fields(obj)
-                obj.save()
+                with timings.timer(f"import.{self._type}.write"):
+                    # make sure to do this after create related
+                    self.update_computed_fields(obj)
+                    obj.save()
 
         # need to create the data
         else:
             what = "insert"
-            try:
-                obj = self.model_class(**data)
-                obj.save()
-            except Exception as e:
-                raise DataImportError(
-                    "{} while importing {} as {}".format(e, data, self.model_class)
-                )
-            self._create_related(obj, related, self.related_models)
+            with timings.timer(f"import.{self._type}.write"):
+                try:
+                    obj = self.model_class(**data)
+                    obj.save()
+                except Exception as e:
+                    raise DataImportError(
+                        "{} while importing {} as {}".format(e, data, self.model_class)
+                    )
+                self._create_related(obj, related, self.related_models)
 
-            # make sure to do this after create related
-            self.update_computed_fields(obj)
+                # make sure to do this after create related
+                self.update_computed_fields(obj)
 
             # Fire post-save signal after related objects are created to allow
             # for handlers make use of related objects
@@ -573,7 +593,9 @@ class BaseImporter:
     ) -> str:
         cache_key = (psuedo_person_id, start_date, end_date)
         if cache_key in self.person_cache:
+            timings.count("resolve_person", hit=True)
             return self.person_cache[cache_key]
+        timings.count("resolve_person", hit=False)
 
         # turn spec into DB query
         spec = get_pseudo_id(psuedo_person_id)
@@ -0,0 +1,184 @@
+"""
+Per-query accounting for importers.
+
+ImportQueryStats is installed as a Django execute_wrapper for the length of
+an import.  Every query is attributed to the innermost importer method on the
+stack and to a fingerprint of its SQL (literals and parameters stripped), and
+queries are also counted per imported item so that the same fingerprint
+running many times for one item, the usual sign of an N+1 pattern, can be
+flagged.
+"""
+import contextlib
+import functools
+import re
+import sys
+import time
+import typing
+from .. import settings
+
+_Stat = typing.List[typing.Any]  # [count, seconds]
+
+_NORMALIZE = (
+    (re.compile(r"'(?:[^']|'')*'"), "?"),
+    (re.compile(r'"s\d+_x\d+"'), '"s?"'),
+    (re.compile(r"%s|\b\d+(?:\.\d+)?\b"), "?"),
+    (re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)"), "(...)"),
+    (re.compile(r"\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+"), "(...)"),
+    (re.compile(r"\s+"), " "),
+)
+
+
+@functools.lru_cache(maxsize=4096)
+def fingerprint(sql: str) -> str:
+    """normalize sql so that queries differing only in their values match"""
+    for pattern, replacement in _NORMALIZE:
+        sql = pattern.sub(replacement, sql)
+    return sql.strip()
+
+
+def _importer_methods(importer_cls: type) -> dict[typing.Any, str]:
+    """code object -> name for every method the importer class defines"""
+    from .base import BaseImporter
+
+    methods: dict[typing.Any, str] = {}
+    for cls in reversed(importer_cls.__mro__):
+        if not issubclass(cls, BaseImporter):
+            continue
+        for name, attr in vars(cls).items():
+            code = getattr(attr, "__code__", None)
+            if code is not None:
+                methods[code] = f"{cls.__name__}.{name}"
+    return methods
+
+
+class ImportQueryStats:
+    def __init__(
+        self,
+        importer: typing.Any,
+        threshold: typing.Optional[int] = None,
+        enabled: typing.Optional[bool] = None,
+    ):
+        self.enabled = settings.IMPORT_QUERY_STATS if enabled is None else enabled
+        # a fingerprint running more than this many times for one item is flagged
+        self.threshold = (
+            settings.IMPORT_N_PLUS_ONE_THRESHOLD if threshold is None else threshold
+        )
+        self._methods = _importer_methods(type(importer))
+        self.count = 0
+        self.seconds = 0.0
+        self.by_method: dict[str, _Stat] = {}
+        self.by_fingerprint: dict[str, _Stat] = {}
+        self.items = 0
+        self.max_per_item = 0
+        # (fingerprint, method) -> [items flagged, most times run for one item]
+        self.n_plus_one: dict[typing.Tuple[str, str], typing.List[int]] = {}
+        # (fingerprint, method) -> count, while an item is being imported
+        self._item: typing.Optional[dict[typing.Tuple[str, str], int]] = None
+
+    def _method(self) -> str:
+        frame = sys._getframe(2)
+        while frame is not None:
+            name = self._methods.get(frame.f_code)
+            if name:
+                return name
+            frame = frame.f_back  # type: ignore
+        return "(other)"
+
+    def __call__(
+        self,
+        execute: typing.Callable,
+        sql: str,
+        params: typing.Any,
+        many: bool,
+        context: dict[str, typing.Any],
+    ) -> typing.Any:
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            method = self._method()
+            key = fingerprint(sql)
+            self.count += 1
+            self.seconds += elapsed
+            for stats, name in ((self.by_method, method), (self.by_fingerprint, key)):
+                stat = stats.setdefault(name, [0, 0.0])
+                stat[0] += 1
+                stat[1] += elapsed
+            if self._item is not None:
+                self._item[key, method] = self._item.get((key, method), 0) + 1
+
+    @contextlib.contextmanager
+    def capture(self) -> typing.Iterator[None]:
+        """count the queries run on the default connection inside the block"""
+        if not self.enabled:
+            yield
+            return
+        from django.db import connection  # type: ignore
+
+        with connection.execute_wrapper(self):
+            yield
+
+    @contextlib.contextmanager
+    def item(self) -> typing.Iterator[None]:
+        """count the queries for importing a single item"""
+        if not self.enabled:
+            yield
+            return
+        self._item = {}
+        try:
+            yield
+        finally:
+            item, self._item = self._item, None
+            self.items += 1
+            self.max_per_item = max(self.max_per_item, sum(item.values()))
+            for key, count in item.items():
+                if count > self.threshold:
+                    flagged = self.n_plus_one.setdefault(key, [0, 0])
+                    flagged[0] += 1
+                    flagged[1] = max(flagged[1], count)
+
+    def summary(self, top: int = 10) -> dict[str, typing.Any]:
+        """totals, the busiest methods and fingerprints, and probable N+1s"""
+
+        def busiest(stats: dict[str, _Stat]) -> list[dict[str, typing.Any]]:
+            ranked = sorted(stats.items(), key=lambda kv: kv[1][1], reverse=True)
+            return [
+                {"name": name, "count": count, "seconds": round(seconds, 3)}
+                for name, (count, seconds) in ranked[:top]
+            ]
+
+        return {
+            "count": self.count,
+            "seconds": round(self.seconds, 3),
+            "items": self.items,
+            "max_per_item": self.max_per_item,
+            "by_method": busiest(self.by_method),
+            "by_fingerprint": busiest(self.by_fingerprint),
+            "n_plus_one": [
+                {
+                    "fingerprint": sql,
+                    "method": method,
+                    "items": items,
+                    "max_per_item": most,
+                }
+                for (sql, method), (items, most) in sorted(
+                    self.n_plus_one.items(), key=lambda kv: kv[1][1], reverse=True
+                )
+            ],
+        }
+
+
+def assert_max_queries_per_item(
+    record: dict[str, typing.Any], max_queries: int
+) -> None:
+    """
+    For tests: fail if importing any single object took more than
+    max_queries queries, given the record import_data returned.
+    """
+    for type, details in record.items():
+        queries = details["queries"]
+        assert queries["max_per_item"] <= max_queries, (
+            f"importing a {type} took {queries['max_per_item']} queries "
+            f"(max {max_queries}), busiest: {queries['by_fingerprint'][:3]}"
+        )
@@ -0,0 +1,103 @@
+import pytest
+from openstates.scrape import Bill as ScrapeBill
+from openstates.importers import BillImporter
+from openstates.importers.base import BaseImporter
+from openstates.importers.queries import (
+    ImportQueryStats,
+    assert_max_queries_per_item,
+    fingerprint,
+)
+from openstates.data.models import Jurisdiction, Division
+
+
+def test_fingerprint():
+    assert fingerprint(
+        'SELECT "a"."id" FROM "a" WHERE ("a"."name" = %s AND "a"."n" = 12)'
+    ) == fingerprint(
+        'SELECT "a"."id"\nFROM "a" WHERE ("a"."name" = %s AND "a"."n" = 7)'
+    )
+    assert (
+        fingerprint("SELECT * FROM a WHERE id IN (%s, %s, %s)")
+        == fingerprint("SELECT * FROM a WHERE id IN (%s)")
+        == "SELECT * FROM a WHERE id IN (...)"
+    )
+    assert fingerprint("INSERT INTO a VALUES (%s, %s), (%s, %s)") == (
+        "INSERT INTO a VALUES (...)"
+    )
+    assert fingerprint("SELECT 'x' FROM a") == "SELECT ? FROM a"
+    assert fingerprint('SAVEPOINT "s1234_x5"') == 'SAVEPOINT "s?"'
+
+
+def query(stats, sql):
+    # stands in for the ORM code between an importer method and the wrapper
+    return stats(lambda *args: "ok", sql, (), False, {})
+
+
+class FakeImporter(BaseImporter):
+    _type = "bill"
+
+    def __init__(self, stats=None):
+        super().__init__("jid")
+        self.stats = stats
+
+    def get_object(self, data):
+        return query(self.stats, 'SELECT * FROM "bill" WHERE "id" = %s')
+
+    def resolve_person(self, name):
+        return query(self.stats, 'SELECT * FROM "person" WHERE "name" = %s')
+
+
+def test_import_query_stats():
+    importer = FakeImporter()
+    stats = ImportQueryStats(importer, threshold=2, enabled=True)
+    importer.stats = stats
+
+    with stats.item():
+        assert importer.get_object({}) == "ok"
+        for _ in range(3):
+            importer.resolve_person("Roy")
+    with stats.item():
+        importer.get_object({})
+        importer.resolve_person("Roy")
+    # outside an item, not counted towards N+1s
+    query(stats, "SELECT 1")
+
+    summary = stats.summary()
+    assert summary["count"] == 7
+    assert summary["items"] == 2
+    assert summary["max_per_item"] == 4
+    assert {m["name"]: m["count"] for m in summary["by_method"]} == {
+        "FakeImporter.get_object": 2,
+        "FakeImporter.resolve_person": 4,
+        "(other)": 1,
+    }
+    assert summary["n_plus_one"] == [
+        {
+            "fingerprint": 'SELECT * FROM "person" WHERE "name" = ?',
+            "method": "FakeImporter.resolve_person",
+            "items": 1,
+            "max_per_item": 3,
+        }
+    ]
+
+    with pytest.raises(AssertionError):
+        assert_max_queries_per_item({"bill": {"queries": summary}}, 3)
+
+
+@pytest.mark.django_db
+def test_bill_import_queries_per_item():
+    Division.objects.create(id="ocd-division/country:us", name="USA")
+    j = Jurisdiction.objects.create(id="jid", division_id="ocd-division/country:us")
+    j.legislative_sessions.create(identifier="1900", name="1900")
+
+    bills = []
+    for n in range(5):
+        bill = ScrapeBill(f"HB {n}", "1900", "Axe & Tack Tax Act", chamber="lower")
+        bill.add_source("http://example.com")
+        bill.add_version_link("Introduced", f"http://example.com/{n}.pdf")
+        bills.append(bill.as_dict())
+
+    record = BillImporter("jid").import_data(bills)
+    assert record["bill"]["queries"]["items"] == 5
+    assert record["bill"]["queries"]["n_plus_one"] == []
+    assert_max_queries_per_item(record, 25)
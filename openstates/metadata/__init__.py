@@ -1,14 +1,23 @@
 import typing
-from .data import (  # noqa: F401
-    STATES_BY_ABBR,
-    INTERNATIONAL,
-    STATES_BY_JID,
-    NON_US_INTERNATIONAL_ABBRS,
-    INTERNATIONAL_ABBRS,
-    STATES_BY_NAME,
-)
+from .index import StateMapping, get_index
 from .models import State, Chamber, District
 
+# states are read from the compiled index on first use, see index.py
+STATES_BY_ABBR = StateMapping("abbr")
+STATES_BY_JID = StateMapping("jurisdiction_id")
+STATES_BY_NAME = StateMapping("name")
+
+
+def __getattr__(name: str) -> typing.Any:
+    # lists that need the index are built lazily as well
+    if name == "INTERNATIONAL":
+        return get_index().group("international")
+    if name == "INTERNATIONAL_ABBRS":
+        return list(get_index().groups["international"])
+    if name == "NON_US_INTERNATIONAL_ABBRS":
+        return [abbr for abbr in get_index().groups["international"] if abbr != "US"]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 def lookup(
     *,
@@ -25,10 +34,26 @@ def lookup(
     raise ValueError(f"invalid lookup call {abbr} {jurisdiction_id} {name}")
 
 
+# division_id -> (State, Chamber, District), filled in a state at a time
+_DISTRICTS_BY_DIVISION: dict[str, typing.Tuple[State, Chamber, District]] = {}
+_INDEXED_STATES: set[str] = set()
+
+
+def _index_state_districts(state: State) -> None:
+    if state.abbr in _INDEXED_STATES:
+        return
+    for chamber in state.chambers:
+        for district in chamber.districts:
+            if district.division_id:
+                _DISTRICTS_BY_DIVISION.setdefault(
+                    district.division_id, (state, chamber, district)
+                )
+    _INDEXED_STATES.add(state.abbr)
+
+
 def lookup_district_with_ancestors(
     *, division_id: str
 ) -> typing.Tuple[State, Chamber, District]:
-    district: typing.Optional[District] = None
     pieces = division_id.split("/")
     if len(pieces) == 4:
         state_portion = pieces[2]
@@ -45,21 +70,17 @@ def lookup_district_with_ancestors(
     else:
         raise ValueError(f"invalid division id: {division_id}")
 
+    if division_id in _DISTRICTS_BY_DIVISION:
+        return _DISTRICTS_BY_DIVISION[division_id]
+
     try:
         state = lookup(abbr=state_portion.split(":")[1])
     except KeyError:
         raise ValueError(f"invalid division id: {division_id}, no such state")
 
-    district = state.lookup_district(division_id)
+    _index_state_districts(state)
 
-    if not district:
+    if division_id not in _DISTRICTS_BY_DIVISION:
         raise ValueError(f"invalid division id: {division_id}, no such district")
 
-    if state.unicameral:
-        chamber = typing.cast(Chamber, state.legislature)
-    elif "sldl" in division_id:
-        chamber = typing.cast(Chamber, state.lower)
-    elif "sldu" in division_id:
-        chamber = typing.cast(Chamber, state.upper)
-
-    return state, chamber, district
+    return _DISTRICTS_BY_DIVISION[division_id]
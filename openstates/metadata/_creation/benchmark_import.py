@@ -0,0 +1,42 @@
+"""
+Time importing openstates.metadata (and a first lookup) against importing
+every data module, each in a fresh interpreter.
+
+    poetry run python metadata/_creation/benchmark_import.py [runs]
+"""
+import sys
+import statistics
+import subprocess
+
+CASES = {
+    "import data modules": "import openstates.metadata.data",
+    "import metadata": "import openstates.metadata",
+    "import + lookup(abbr='nh')": "import openstates.metadata as m; m.lookup(abbr='nh')",
+    "import + lookup every state": (
+        "import openstates.metadata as m; [m.lookup(abbr=a) for a in m.STATES_BY_ABBR]"
+    ),
+}
+# openstates itself is imported first so only the metadata cost is measured
+TEMPLATE = """
+import time
+import openstates
+start = time.perf_counter()
+{code}
+print(time.perf_counter() - start)
+"""
+
+
+def time_case(code: str, runs: int) -> float:
+    timings = []
+    for _ in range(runs):
+        output = subprocess.check_output(
+            [sys.executable, "-c", TEMPLATE.format(code=code)], text=True
+        )
+        timings.append(float(output.strip()))
+    return statistics.median(timings)
+
+
+if __name__ == "__main__":
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    for name, code in CASES.items():
+        print(f"{name:<30} {time_case(code, runs) * 1000:8.2f}ms")
@@ -1,4 +1,5 @@
 import us  # type: ignore
+import sys
 import typing
 import csv
 import uuid
@@ -78,7 +79,7 @@ def make_districts(
         )
 
 
-if __name__ == "__main__":
+def write_state_modules() -> None:
     settings = yaml.load(open("metadata/_creation/settings.yml"))
     jurisdictions = csv.DictReader(open("metadata/_creation/jurisdictions.csv"))
     jurisdictions_by_name = {j["state"]: j for j in jurisdictions}
@@ -186,3 +187,26 @@ if __name__ == "__main__":
     {seats_block}
 )"""
             )
+
+
+def write_index() -> None:
+    """compile the data modules into the index openstates.metadata reads from"""
+    from openstates.metadata import data
+    from openstates.metadata.index import write_index as write
+
+    write(
+        {
+            "states": data.STATES,
+            "territories": data.TERRITORIES,
+            "districts": data.states.DISTRICTS,
+            "international": data.INTERNATIONAL,
+        },
+        "metadata/data/index.json",
+    )
+
+
+if __name__ == "__main__":
+    # --index-only recompiles the index after editing data modules by hand
+    if "--index-only" not in sys.argv:
+        write_state_modules()
+    write_index()
@@ -0,0 +1,141 @@
+"""
+Compiled index of the state metadata in data/.
+
+Importing the data modules means executing thousands of District(...)
+constructors, so _creation/write_data.py also serializes every state into
+data/index.json.  The index is only read on first use, and each state in it
+is a separate JSON document that is decoded the first time it's looked up.
+"""
+import json
+import typing
+import attr
+from functools import lru_cache
+from pathlib import Path
+from .models import State, Chamber, District
+
+INDEX_PATH = Path(__file__).parent / "data" / "index.json"
+INDEX_VERSION = 1
+# groups of states, in the order they're listed in data/__init__.py
+GROUPS = ("states", "territories", "districts", "international")
+
+
+def _chamber_to_list(chamber: typing.Optional[Chamber]) -> typing.Optional[list]:
+    if chamber is None:
+        return None
+    return [
+        chamber.chamber_type,
+        chamber.name,
+        chamber.title,
+        chamber.num_seats,
+        chamber.organization_id,
+        [
+            [d.name, d.chamber_type, d.division_id, d.num_seats, d.title_override]
+            for d in chamber.districts
+        ],
+    ]
+
+
+def _chamber_from_list(data: typing.Optional[list]) -> typing.Optional[Chamber]:
+    if data is None:
+        return None
+    chamber_type, name, title, num_seats, organization_id, districts = data
+    return Chamber(
+        chamber_type=chamber_type,
+        name=name,
+        title=title,
+        num_seats=num_seats,
+        organization_id=organization_id,
+        districts=[District(*d) for d in districts],
+    )
+
+
+def state_to_dict(state: State) -> dict[str, typing.Any]:
+    data = {
+        field.name: getattr(state, field.name)
+        for field in attr.fields(State)
+        if field.name not in ("lower", "upper", "legislature")
+    }
+    data["lower"] = _chamber_to_list(state.lower)
+    data["upper"] = _chamber_to_list(state.upper)
+    data["legislature"] = _chamber_to_list(state.legislature)
+    return data
+
+
+def state_from_dict(data: dict[str, typing.Any]) -> State:
+    data = dict(data)
+    for chamber in ("lower", "upper", "legislature"):
+        data[chamber] = _chamber_from_list(data[chamber])
+    return State(**data)
+
+
+def write_index(
+    groups: dict[str, list[State]], filename: typing.Union[str, Path] = INDEX_PATH
+) -> None:
+    index: dict[str, typing.Any] = {
+        "version": INDEX_VERSION,
+        "groups": {group: [s.abbr for s in groups[group]] for group in GROUPS},
+        # abbr -> [jurisdiction_id, name] so lookups by either need no decoding
+        "keys": {},
+        "states": {},
+    }
+    for group in GROUPS:
+        for state in groups[group]:
+            index["keys"][state.abbr] = [state.jurisdiction_id, state.name]
+            index["states"][state.abbr] = json.dumps(
+                state_to_dict(state), separators=(",", ":")
+            )
+    with open(filename, "w") as f:
+        json.dump(index, f, indent=0)
+        f.write("\n")
+
+
+class MetadataIndex:
+    def __init__(self, data: dict[str, typing.Any]):
+        if data.get("version") != INDEX_VERSION:
+            raise ValueError(
+                f"unsupported metadata index version {data.get('version')}"
+            )
+        self.groups: dict[str, list[str]] = data["groups"]
+        self.keys: dict[str, dict[str, str]] = {
+            "abbr": {abbr: abbr for abbr in data["keys"]},
+            "jurisdiction_id": {jid: abbr for abbr, (jid, _) in data["keys"].items()},
+            "name": {name.lower(): abbr for abbr, (_, name) in data["keys"].items()},
+        }
+        self._documents: dict[str, str] = data["states"]
+        self._states: dict[str, State] = {}
+
+    def state(self, abbr: str) -> State:
+        if abbr not in self._states:
+            self._states[abbr] = state_from_dict(json.loads(self._documents[abbr]))
+        return self._states[abbr]
+
+    def group(self, group: str) -> list[State]:
+        return [self.state(abbr) for abbr in self.groups[group]]
+
+
+@lru_cache(maxsize=None)
+def get_index() -> MetadataIndex:
+    with open(INDEX_PATH) as f:
+        return MetadataIndex(json.load(f))
+
+
+class StateMapping(typing.Mapping[str, State]):
+    """read-only mapping of key (abbr, jurisdiction_id or name) to State"""
+
+    def __init__(self, key: str):
+        self.key = key
+
+    def _abbrs(self) -> dict[str, str]:
+        return get_index().keys[self.key]
+
+    def __getitem__(self, key: str) -> State:
+        return get_index().state(self._abbrs()[key])
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._abbrs()
+
+    def __iter__(self) -> typing.Iterator[str]:
+        return iter(self._abbrs())
+
+    def __len__(self) -> int:
+        return len(self._abbrs())
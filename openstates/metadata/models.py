@@ -19,6 +19,23 @@ class Chamber:
     num_seats: int
     organization_id: str
     districts: typing.List[District]
+    # positions in districts by division_id & name, built on first lookup
+    _by_division_id: typing.Optional[typing.Dict[str, int]] = attr.ib(
+        default=None, init=False, repr=False, eq=False
+    )
+    _by_name: typing.Optional[typing.Dict[str, int]] = attr.ib(
+        default=None, init=False, repr=False, eq=False
+    )
+
+    def _build_indexes(self) -> None:
+        by_division_id: typing.Dict[str, int] = {}
+        by_name: typing.Dict[str, int] = {}
+        for i, d in enumerate(self.districts):
+            if d.division_id:
+                by_division_id.setdefault(d.division_id, i)
+            by_name.setdefault(d.name, i)
+        self._by_division_id = by_division_id
+        self._by_name = by_name
 
     def lookup_district(
         self,
@@ -26,12 +43,17 @@ class Chamber:
         *,
         name: typing.Optional[str] = None,
     ) -> typing.Optional[District]:
-        for d in self.districts:
-            if division_id and d.division_id == division_id:
-                return d
-            if name and d.name == name:
-                return d
-        return None
+        if self._by_division_id is None or self._by_name is None:
+            self._build_indexes()
+        by_division_id = typing.cast(typing.Dict[str, int], self._by_division_id)
+        by_name = typing.cast(typing.Dict[str, int], self._by_name)
+        # if both are given, whichever district comes first wins
+        matches = []
+        if division_id and division_id in by_division_id:
+            matches.append(by_division_id[division_id])
+        if name and name in by_name:
+            matches.append(by_name[name])
+        return self.districts[min(matches)] if matches else None
 
 
 @attr.s(auto_attribs=True)
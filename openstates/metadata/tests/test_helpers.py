@@ -1,5 +1,5 @@
 import pytest  # type: ignore
-from .. import lookup, lookup_district_with_ancestors
+from .. import lookup, lookup_district_with_ancestors, Chamber, District
 from ..data.states import NC, NE
 
 
@@ -103,3 +103,32 @@ def test_lookup_district_with_ancestors_dc_pr() -> None:
     assert state.name == "Puerto Rico"
     assert chamber.chamber_type == "upper"
     assert district.name == "At-Large"
+
+
+def test_chamber_lookup_district_first_match() -> None:
+    chamber = Chamber(
+        chamber_type="upper",
+        name="Senate",
+        title="Senator",
+        num_seats=2,
+        organization_id="ocd-organization/1",
+        districts=[
+            District("A", "upper", "ocd-division/country:us/state:xx/sldu:a"),
+            District("B", "upper", "ocd-division/country:us/state:xx/sldu:b"),
+        ],
+    )
+    assert chamber.lookup_district(name="B").name == "B"
+    # given both, the first district matching either wins, as with a scan
+    assert (
+        chamber.lookup_district("ocd-division/country:us/state:xx/sldu:b", name="A")
+        is chamber.districts[0]
+    )
+    assert chamber.lookup_district(name="C") is None
+
+
+def test_lookup_district_with_ancestors_cached() -> None:
+    division_id = "ocd-division/country:us/state:nc/sldu:1"
+    first = lookup_district_with_ancestors(division_id=division_id)
+    second = lookup_district_with_ancestors(division_id=division_id)
+    assert all(a is b for a, b in zip(first, second))
+    assert first[1].lookup_district(division_id) is first[2]
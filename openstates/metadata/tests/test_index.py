@@ -0,0 +1,41 @@
+# type: ignore
+import pytest  # type: ignore
+from .. import STATES_BY_ABBR, STATES_BY_JID, STATES_BY_NAME, lookup
+from .. import index
+from ..data import STATES_AND_TERRITORIES, INTERNATIONAL
+
+
+def test_index_matches_data_modules():
+    # if this fails, regenerate the index: write_data.py --index-only
+    states = STATES_AND_TERRITORIES + INTERNATIONAL
+    assert sorted(STATES_BY_ABBR) == sorted(s.abbr for s in states)
+    for state in states:
+        assert lookup(abbr=state.abbr) == state
+
+
+def test_state_mappings():
+    nc = STATES_BY_ABBR["NC"]
+    assert STATES_BY_JID["ocd-jurisdiction/country:us/state:nc/government"] is nc
+    assert STATES_BY_NAME["north carolina"] is nc
+    assert "NC" in STATES_BY_ABBR
+    assert "XX" not in STATES_BY_ABBR
+    with pytest.raises(KeyError):
+        STATES_BY_ABBR["XX"]
+
+
+def test_write_index_round_trip(tmp_path, monkeypatch):
+    nc = STATES_BY_ABBR["NC"]
+    ne = STATES_BY_ABBR["NE"]
+    filename = tmp_path / "index.json"
+    index.write_index(
+        {"states": [nc, ne], "territories": [], "districts": [], "international": []},
+        filename,
+    )
+    monkeypatch.setattr(index, "INDEX_PATH", filename)
+    index.get_index.cache_clear()
+    try:
+        assert list(STATES_BY_ABBR) == ["NC", "NE"]
+        assert lookup(abbr="ne") == ne
+        assert lookup(name="north carolina") == nc
+    finally:
+        index.get_index.cache_clear()
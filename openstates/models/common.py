@@ -16,6 +16,8 @@ PERSON_ID_RE = re.compile(
     r"^ocd-person/[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$"
 )
 DATE_RE = re.compile(r"^\d{4}(-\d{2}(-\d{2})?)?$")
+# libyaml's loader is several times faster, fall back if PyYAML was built without it
+YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
 
 
 def validate_str_no_newline(v: typing.Any) -> str:
@@ -78,7 +80,7 @@ class BaseModel(PydanticBaseModel):
     @classmethod
     def load_yaml(cls, filename: Path) -> BaseT:
         with open(filename) as file:
-            data = yaml.safe_load(file)
+            data = yaml.load(file, Loader=YamlLoader)
             return cls(**data)  # type: ignore
 
 
@@ -1,4 +1,5 @@
 import boto3  # noqa
+import contextlib
 import datetime
 from http.client import RemoteDisconnected
 from google.cloud import storage  # type: ignore
@@ -20,6 +21,7 @@ from elasticsearch.exceptions import ConnectionError as ESConnectionError
 from jsonschema import Draft3Validator, FormatChecker
 from warnings import filterwarnings
 from .. import utils, settings
+from ..utils.timing import timings
 from ..exceptions import ScrapeError, ScrapeValueError, EmptyScrape
 
 
@@ -124,6 +126,7 @@ class Scraper(scrapelib.Scraper):
         kafka_producer=None,
         file_archiving_enabled=False,
         http_resilience_mode=False,
+        import_pipeline=None,
     ):
         super(Scraper, self).__init__()
 
@@ -133,6 +136,8 @@ class Scraper(scrapelib.Scraper):
         self.realtime = realtime
         self.kafka = kafka
         self.kafka_producer = kafka_producer
+        # os-update --pipeline: also hand saved objects straight to the importer
+        self.import_pipeline = import_pipeline
         self.file_archiving_enabled = file_archiving_enabled
 
 
@@ -148,6 +153,9 @@ class Scraper(scrapelib.Scraper):
         self._reset_interval = 600  # Reset connection pool every 10 minutes
         self._random_delay_on_failure_min = 5
         self._random_delay_on_failure_max = 15
+        # time spent in requests, so do_scrape can tell fetching from parsing
+        self._fetch_seconds = 0.0
+        self._fetch_depth = 0
 
         # scrapelib setup
         self.timeout = settings.SCRAPELIB_TIMEOUT
@@ -379,20 +387,21 @@ class Scraper(scrapelib.Scraper):
 
         Generally shouldn't be called directly.
         '''
-        clean_whitespace(obj)
-        obj.pre_save(self.jurisdiction)
-
-        filename = f'{obj._type}_{obj._id}.json'.replace('/', '-')
-        self.info(f'save {obj._type} {obj} as {filename}')
-
-        self.debug(
-            json.dumps(
-                OrderedDict(sorted(obj.as_dict().items())),
-                cls=utils.JSONEncoderPlus,
-                indent=4,
-                separators=(',', ': '),
+        with timings.timer('scrape.save.prepare'):
+            clean_whitespace(obj)
+            obj.pre_save(self.jurisdiction)
+
+            filename = f'{obj._type}_{obj._id}.json'.replace('/', '-')
+            self.info(f'save {obj._type} {obj} as {filename}')
+
+            self.debug(
+                json.dumps(
+                    OrderedDict(sorted(obj.as_dict().items())),
+                    cls=utils.JSONEncoderPlus,
+                    indent=4,
+                    separators=(',', ': '),
+                )
             )
-        )
 
         self.output_names[obj._type].add(filename)
 
@@ -534,8 +543,15 @@ class Scraper(scrapelib.Scraper):
 
                 self.push_to_queue()
             else:
-                with open(file_path, 'w') as f:
-                    json.dump(obj.as_dict(), f, cls=utils.JSONEncoderPlus)
+                with timings.timer('scrape.save.serialize'):
+                    data = obj.as_dict()
+                if self.import_pipeline is not None:
+                    self.import_pipeline.put(obj._type, data)
+                if self.import_pipeline is None or self.import_pipeline.keep_json:
+                    # encoding is streamed to the file, so it's timed as part of the write
+                    with timings.timer('scrape.save.write'):
+                        with open(file_path, 'w') as f:
+                            json.dump(data, f, cls=utils.JSONEncoderPlus)
 
             # Periodically push data to GCS by data class
             if self.realtime:
@@ -546,7 +562,8 @@ class Scraper(scrapelib.Scraper):
 
         # validate after writing, allows for inspection on failure
         try:
-            obj.validate()
+            with timings.timer('scrape.save.validate'):
+                obj.validate()
         except ValueError as ve:
             if self.strict_validation:
                 raise ve
@@ -562,7 +579,7 @@ class Scraper(scrapelib.Scraper):
         self.output_names = defaultdict(set)
         record['start'] = utils.utcnow()
         try:
-            for obj in self.scrape(**kwargs) or []:
+            for obj in self._timed_scrape(**kwargs):
                 # allow for returning empty objects in a list
                 if not obj:
                     continue
@@ -597,7 +614,51 @@ class Scraper(scrapelib.Scraper):
             self.__class__.__name__ + ' must provide a scrape() method'
         )
 
+    def _timed_scrape(self, **kwargs):
+        '''
+        Iterate over scrape(), recording the time taken to produce each object,
+        less the time spent fetching pages, as its parse time.
+        '''
+        objects = iter(self.scrape(**kwargs) or [])
+        while True:
+            fetched = self._fetch_seconds
+            start = time.perf_counter()
+            try:
+                obj = next(objects)
+            except StopIteration:
+                return
+            finally:
+                timings.record(
+                    'scrape.parse',
+                    time.perf_counter() - start - (self._fetch_seconds - fetched),
+                )
+            yield obj
+
+    @contextlib.contextmanager
+    def _timed_fetch(self):
+        # retries and delays inside a fetch are part of it, not separate fetches
+        if self._fetch_depth:
+            yield
+            return
+        self._fetch_depth += 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._fetch_depth -= 1
+            elapsed = time.perf_counter() - start
+            self._fetch_seconds += elapsed
+            timings.record('scrape.fetch', elapsed)
+
+    def request(self, method, url, *args, **kwargs):
+        with self._timed_fetch():
+            return super().request(method, url, *args, **kwargs)
+
     def request_resiliently(self, request_func):
+        with self._timed_fetch():
+            return self._request_resiliently(request_func)
+
+    def _request_resiliently(self, request_func):
         try:
             # Reset connection pool if needed
             self._reset_connection_pool_if_needed()
@@ -41,6 +41,11 @@ IMPORT_TRANSFORMERS = {
     },
 }
 
+# count queries per importer method and SQL fingerprint during imports, and
+# flag any fingerprint run more than IMPORT_N_PLUS_ONE_THRESHOLD times for one item
+IMPORT_QUERY_STATS = True
+IMPORT_N_PLUS_ONE_THRESHOLD = 5
+
 # Django settings
 LOGGING = {
     "version": 1,
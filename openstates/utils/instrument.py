@@ -2,14 +2,18 @@ from ast import literal_eval
 import logging
 import logging.config
 import os
+import queue
+import tempfile
+import threading
 import time
 from influxdb_client import InfluxDBClient
 from influxdb_client.client.write_api import SYNCHRONOUS
 from influxdb_client.client.write.point import Point
 from influxdb_client.domain.write_precision import WritePrecision
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
 
 from .. import settings
+from .timing import Timings
 
 """
 Using these functions would look like:
@@ -18,8 +22,16 @@ from utils.instrument import Instrumentation
 stats = Instrumentation()
 stats.write_stats([{"metric": "objects", "fields"{ "scraped": 10}, "tags": {"jurisdiction": "ca"}])
 stats.close()
+
+Stats are handed to a background thread, which writes them in batches so
+scrapers and importers never wait on the stats endpoint. Batches that can't
+be written are appended to a spool file (in line protocol) and replayed
+after the next successful write.
 """
 
+# put on the queue to ask the flusher to write everything and exit
+_STOP = object()
+
 
 class Instrumentation(object):
     def __init__(self) -> None:
@@ -35,13 +47,15 @@ class Instrumentation(object):
         self.logger = logging.getLogger("openstates.stats")
         # use a literal_eval to properly turn a string into a bool (literal_eval 'cause it's safer than stdlib eval)
         self.enabled = literal_eval(os.environ.get("STATS_ENABLED", "False"))
+        self.endpoint: str = os.environ.get("STATS_ENDPOINT", "")
+        if self.enabled and not self.endpoint:
+            self.logger.debug("No stats endpoint defined. Not emitting stats")
+            self.enabled = False
         if not self.enabled:
             self.logger.debug("Stat emission is not enabled.")
             return
         token: str = os.environ.get("OPENSTATES_STATS_AUTH_TOKEN", "")
-        self._batch: List[Dict] = list()
         self.prefix: str = os.environ.get("STATS_PREFIX", "openstates_")
-        self.endpoint: str = os.environ.get("STATS_ENDPOINT", "")
         self.bucket: str = os.environ.get("STATS_BUCKET", "openstates")
         if self.endpoint.endswith("/"):
             self.endpoint = self.endpoint.strip("/")
@@ -51,50 +65,157 @@ class Instrumentation(object):
             org="openstates",
             enable_gzip=True,
         )
+        # only ever called from the flusher thread
         self.write_api = client.write_api(write_options=SYNCHRONOUS)
         self.batch_size: int = int(os.environ.get("STATS_BATCH_SIZE", 50))
+        # seconds a partial batch waits before it's written anyway
+        self.flush_interval: float = float(os.environ.get("STATS_FLUSH_INTERVAL", 10))
+        # metrics waiting for the flusher, past this new metrics are dropped
+        self.queue_size: int = int(os.environ.get("STATS_QUEUE_SIZE", 10000))
+        self.spool_path: str = os.environ.get(
+            "STATS_SPOOL_FILE",
+            os.path.join(tempfile.gettempdir(), "openstates-stats.lp"),
+        )
+        self.spool_max_bytes: int = int(
+            os.environ.get("STATS_SPOOL_MAX_BYTES", 50 * 1024 * 1024)
+        )
+        self.dropped = 0
+        self._queue: "queue.Queue" = queue.Queue(maxsize=self.queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
         self.logger.debug(
             f"Stats emission to {self.endpoint} configured with batch size: {self.batch_size}"
         )
 
-    def _send_stats(self, force: bool = False) -> None:
+    def _ensure_flusher(self) -> None:
         """
-        Needs to be broken out from _process_metric to have a
-        "write at shutdown" function (force=True)
-        Even with force=True, we should only write when there is data
-        to write. Otherwise, just skip things.
+        Start the flusher on first use (or after close), rather than when the
+        module-level Instrumentation objects are created at import time.
         """
-        batch_len = len(self._batch)
-        if (force and batch_len > 0) or batch_len > self.batch_size:
-            if not self.enabled:
-                self.logger.debug("Stats diasbled. Skipping send")
+        if self._thread is not None and self._thread.is_alive():
+            if self._pid == os.getpid():
                 return
-            if not self.endpoint:
-                self.logger.debug("No stats endpoint defined. Not emitting stats")
+        with self._lock:
+            if os.getpid() != self._pid:
+                # forked: the parent's thread and queued metrics didn't come along
+                self._pid = os.getpid()
+                self._queue = queue.Queue(maxsize=self.queue_size)
+                self._thread = None
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="openstates-stats", daemon=True
+                )
+                self._thread.start()
+
+    def _to_line(self, timestamp: int, m: Dict) -> str:
+        if self.prefix:
+            p = Point(f"{self.prefix}{m['metric']}")
+        else:
+            p = Point(m["metric"])
+        p.time(timestamp, WritePrecision.S)
+        """
+        use list comprehensions 'cause they're technically faster than for loops
+        But this is simply turning a dictionary of k=v pairs into tags/fields
+        in the point object
+        """
+        [p.tag(t, v) for t, v in m.get("tags", {}).items()]
+        [p.field(f, v) for f, v in m["fields"].items()]
+        return p.to_line_protocol()
+
+    def _run(self) -> None:
+        """
+        Flusher thread: collect metrics until there's a full batch or
+        flush_interval has passed, then write them.
+        """
+        batch: List[Tuple[int, Dict]] = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                item = None
+            if item is _STOP:
+                self._send_stats(batch)
                 return
-            points = []
-            for m in self._batch:
-                if self.prefix:
-                    p = Point(f"{self.prefix}{m['metric']}")
-                else:
-                    p = Point(m["metric"])
-                p.time(m["timestamp"], WritePrecision.S)
-                """
-                use list comprehensions 'cause they're technically faster than for loops
-                But this is simply turning a dictionary of k=v pairs into tags/fields
-                in the point object
-                """
-                [p.tag(t, v) for t, v in m.get("tags", {}).items()]
-                [p.field(f, v) for f, v in m["fields"].items()]
-                points.append(p)
-            self.logger.debug(f"Sending stats batch: {self._batch}")
+            if item is not None:
+                batch.append(item)
+            if len(batch) >= self.batch_size or time.monotonic() >= deadline:
+                self._send_stats(batch)
+                batch = []
+                deadline = time.monotonic() + self.flush_interval
+
+    def _send_stats(self, batch: List[Tuple[int, Dict]]) -> None:
+        """
+        Write a batch, spooling it to disk if the endpoint can't be reached.
+        Even when forced at shutdown, we should only write when there is data
+        to write. Otherwise, just skip things.
+        """
+        if not batch:
+            return
+        lines = []
+        for timestamp, m in batch:
             try:
-                self.write_api.write(self.bucket, record=points)
-                self._batch = list()
+                lines.append(self._to_line(timestamp, m))
             except Exception as e:
-                self.logger.warning(
-                    f"Failed to write {len(self._batch)} stats to {self.endpoint} :: {e}"
-                )
+                self.logger.warning(f"Skipping malformed stat {m} :: {e}")
+        self.logger.debug(f"Sending stats batch: {lines}")
+        if self._write(lines):
+            self._replay_spool()
+        else:
+            self._spool(lines)
+
+    def _write(self, lines: List[str]) -> bool:
+        try:
+            self.write_api.write(
+                self.bucket, record=lines, write_precision=WritePrecision.S  # type: ignore
+            )
+            return True
+        except Exception as e:
+            self.logger.warning(
+                f"Failed to write {len(lines)} stats to {self.endpoint} :: {e}"
+            )
+            return False
+
+    def _spool(self, lines: List[str]) -> None:
+        try:
+            size = os.path.getsize(self.spool_path)
+        except OSError:
+            size = 0
+        if size >= self.spool_max_bytes:
+            self.logger.warning(
+                f"Stats spool {self.spool_path} is full, dropping {len(lines)} stats"
+            )
+            return
+        try:
+            # a single append per batch, so concurrent processes don't interleave lines
+            with open(self.spool_path, "a") as f:
+                f.write("".join(f"{line}\n" for line in lines))
+        except OSError as e:
+            self.logger.warning(f"Failed to spool {len(lines)} stats :: {e}")
+
+    def _replay_spool(self) -> None:
+        """
+        Send what previous failed writes spooled. The spool is moved aside
+        first so that other processes can keep appending to a fresh one, and
+        whatever can't be sent is appended back.
+        """
+        if not os.path.exists(self.spool_path):
+            return
+        replay_path = f"{self.spool_path}.{os.getpid()}.replay"
+        try:
+            os.replace(self.spool_path, replay_path)
+            with open(replay_path) as f:
+                lines = [line.rstrip("\n") for line in f if line.strip()]
+            os.remove(replay_path)
+        except OSError as e:
+            self.logger.warning(f"Failed to read stats spool :: {e}")
+            return
+        self.logger.info(f"Replaying {len(lines)} spooled stats")
+        for start in range(0, len(lines), self.batch_size):
+            if not self._write(lines[start : start + self.batch_size]):
+                self._spool(lines[start:])
+                return
 
     def write_stats(
         self,
@@ -103,27 +224,52 @@ class Instrumentation(object):
         """
         Ensure consistent formatting of data objects to add to batch for sending
         Primarily, we'll force a timestamp on every metric in a consistent manner
+
+        This only queues the metrics, it never waits on the stats endpoint.
         """
         if not self.enabled:
             return
+        self._ensure_flusher()
         ts = int(time.time())
         for m in metrics:
-            m["timestamp"] = ts
-            self._batch.append(m)
+            try:
+                self._queue.put_nowait((ts, m))
+            except queue.Full:
+                self.dropped += 1
+                if self.dropped == 1:
+                    self.logger.warning(
+                        f"Stats queue is full ({self.queue_size}), dropping stats"
+                    )
+
+    def write_timings(
+        self, timings: Timings, tags: Dict[str, str], prefix: str = ""
+    ) -> None:
         """
-        we attempt to send (without forcing) after
-        adding each stat to make sure we emit
-        batches as quickly as we can, without
-        overloading the write endpoint with tiny writes
+        Send the percentiles of everything timings recorded since the last
+        export (under prefix, if given), adding tags (e.g. the jurisdiction)
+        to each of them.
         """
-        self._send_stats()
+        metrics = timings.export(prefix)
+        for m in metrics:
+            m["tags"].update(tags)
+        self.write_stats(metrics)
 
-    def close(self) -> None:
+    def close(self, timeout: float = 30) -> None:
         """
         "Shut down" our instrumentation connection
-        Currently just forces any batched stats out
-        Keep as a wrapper script for later extensibility
+        Flushes anything queued and waits (up to timeout seconds) for the
+        flusher to finish. Writing more stats afterwards starts a new flusher.
         """
         if not self.enabled:
             return
-        self._send_stats(force=True)
+        thread = self._thread
+        if thread is None or not thread.is_alive() or self._pid != os.getpid():
+            return
+        # block rather than drop the stop signal if the queue is full
+        self._queue.put(_STOP)
+        thread.join(timeout)
+        if thread.is_alive():
+            self.logger.warning(f"Stats flusher didn't finish within {timeout}s")
+        if self.dropped:
+            self.logger.warning(f"Dropped {self.dropped} stats, queue was full")
+            self.dropped = 0
@@ -5,6 +5,8 @@ from .general import (
     get_all_abbreviations,
     dump_obj,
     get_new_filename,
+    get_file_index,
+    file_moved,
     legacy_districts,
     load_municipalities,
 )
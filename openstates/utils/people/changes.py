@@ -0,0 +1,112 @@
+"""
+Incremental syncing of the people repo.
+
+The commit each jurisdiction was last synced from is stored in the
+jurisdiction's extras, so that the next sync only needs to load the YAML
+files git reports as added, modified or deleted since then.
+"""
+import typing
+from dataclasses import dataclass, field
+from pathlib import Path
+import git
+from .general import get_base_path
+
+PEOPLE_COMMIT_KEY = "people_repo_commit"
+COMMITTEES_COMMIT_KEY = "committees_repo_commit"
+PERSON_DIRECTORIES = ("legislature", "executive", "municipalities", "retired")
+
+
+@dataclass
+class RepoChanges:
+    since: str
+    head: str
+    # added or modified files, as paths under the people data directory
+    people: list[Path] = field(default_factory=list)
+    committees: list[Path] = field(default_factory=list)
+    # ids of the objects whose files were deleted or moved away
+    removed_people: set[str] = field(default_factory=set)
+    removed_committees: set[str] = field(default_factory=set)
+
+
+def get_people_repo() -> git.Repo:
+    """the git checkout the people data was copied from"""
+    for candidate in (get_base_path(), Path("people")):
+        try:
+            return git.Repo(candidate)
+        except (git.InvalidGitRepositoryError, git.NoSuchPathError):
+            continue
+    raise EnvironmentError("could not find a git checkout of openstates/people")
+
+
+def _classify(path: str, abbr: str) -> typing.Optional[tuple[str, str]]:
+    """('person' | 'committee', id) for a repo path, None if it isn't either"""
+    pieces = path.split("/")
+    if len(pieces) != 4 or pieces[:2] != ["data", abbr] or not path.endswith(".yml"):
+        return None
+    # files are named <name>-<uuid>.yml, see FileIndex
+    uuid = Path(pieces[3]).stem[-36:]
+    if pieces[2] in PERSON_DIRECTORIES:
+        return "person", f"ocd-person/{uuid}"
+    if pieces[2] == "committees":
+        return "committee", f"ocd-organization/{uuid}"
+    return None
+
+
+def get_repo_changes(
+    repo: git.Repo, since: typing.Optional[str], abbr: str, head: str = "HEAD"
+) -> typing.Optional[RepoChanges]:
+    """
+    Files for abbr that changed between since and head, or None if there's
+    no usable starting commit (first sync, or history that has been
+    rewritten) and everything needs to be loaded.
+    """
+    if not since:
+        return None
+    try:
+        # a full sha doesn't need to exist to become a Commit, so check first
+        repo.git.cat_file("-e", f"{since}^{{commit}}")
+    except git.GitCommandError:
+        return None
+    since_commit = repo.commit(since)
+    head_commit = repo.commit(head)
+    changes = RepoChanges(since=since_commit.hexsha, head=head_commit.hexsha)
+    base_path = get_base_path()
+
+    added: dict[str, list[Path]] = {"person": [], "committee": []}
+    removed: dict[str, set[str]] = {"person": set(), "committee": set()}
+    for diff in since_commit.diff(head_commit, paths=[f"data/{abbr}"]):
+        # renames are a removal of the old path plus an addition of the new one
+        if diff.change_type in ("D", "R") and diff.a_path:
+            found = _classify(diff.a_path, abbr)
+            if found:
+                removed[found[0]].add(found[1])
+        if diff.change_type != "D" and diff.b_path:
+            found = _classify(diff.b_path, abbr)
+            if found:
+                added[found[0]].append(base_path / diff.b_path)
+
+    changes.people = sorted(added["person"])
+    changes.committees = sorted(added["committee"])
+    changes.removed_people = removed["person"]
+    changes.removed_committees = removed["committee"]
+    return changes
+
+
+def get_synced_commit(jurisdiction_id: str, key: str) -> typing.Optional[str]:
+    from openstates.data.models import Jurisdiction
+
+    extras = (
+        Jurisdiction.objects.filter(id=jurisdiction_id)
+        .values_list("extras", flat=True)
+        .first()
+    )
+    return extras.get(key) if extras else None
+
+
+def set_synced_commit(jurisdiction_id: str, key: str, commit: str) -> None:
+    from openstates.data.models import Jurisdiction
+
+    jurisdiction = Jurisdiction.objects.filter(id=jurisdiction_id).first()
+    if jurisdiction:
+        jurisdiction.extras[key] = commit
+        jurisdiction.save(update_fields=["extras"])
@@ -54,6 +54,113 @@ def get_all_abbreviations() -> list[str]:
     return sorted(x.name for x in (get_base_path() / "data").iterdir())
 
 
+class FileIndex:
+    """
+    Maps ids to the YAML files named after them (NAME-UUID.yml) under a
+    directory, scanning the directory once instead of globbing per lookup.
+
+    Files written, moved or retired through the helpers in this package keep
+    the index current.  Files changed by other means are picked up by a
+    rescan, done on a stale hit or on a miss if any directory has changed.
+    """
+
+    def __init__(self, directory: Path, pattern: str = "*.yml"):
+        self.directory = directory
+        self.pattern = pattern
+        self.paths_by_id: dict[str, set[Path]] = {}
+        self._signature: list[tuple[str, int]] = []
+        self.scan()
+
+    @staticmethod
+    def id_for(path: Path) -> str:
+        # ids are the trailing uuid of the filename
+        return path.stem[-36:]
+
+    def _directory_signature(self) -> list[tuple[str, int]]:
+        # mtimes of every directory the pattern descends through
+        depth = len(Path(self.pattern).parts)
+        signature = []
+        directories = [self.directory]
+        for level in range(depth):
+            subdirectories = []
+            for directory in directories:
+                try:
+                    signature.append((str(directory), directory.stat().st_mtime_ns))
+                except FileNotFoundError:
+                    continue
+                if level < depth - 1:
+                    subdirectories.extend(
+                        sorted(p for p in directory.iterdir() if p.is_dir())
+                    )
+            directories = subdirectories
+        return signature
+
+    def refresh(self) -> None:
+        self._signature = self._directory_signature()
+
+    def scan(self) -> None:
+        self.refresh()
+        self.paths_by_id = {}
+        for path in self.directory.glob(self.pattern):
+            self.add(path)
+
+    def covers(self, path: Path) -> bool:
+        try:
+            relative = Path(path).relative_to(self.directory)
+        except ValueError:
+            return False
+        return len(relative.parts) == len(Path(self.pattern).parts) and relative.match(
+            self.pattern
+        )
+
+    def add(self, path: Path) -> None:
+        self.paths_by_id.setdefault(self.id_for(path), set()).add(path)
+
+    def discard(self, path: Path) -> None:
+        self.paths_by_id.get(self.id_for(path), set()).discard(path)
+
+    def find_all(self, id_: str) -> list[Path]:
+        if "/" in id_:
+            id_ = id_.split("/")[1]
+        paths = self.paths_by_id.get(id_)
+        if paths:
+            stale = not all(path.exists() for path in paths)
+        else:
+            stale = self._directory_signature() != self._signature
+        if stale:
+            self.scan()
+            paths = self.paths_by_id.get(id_)
+        return sorted(paths or ())
+
+
+_file_indexes: dict[tuple[Path, str], FileIndex] = {}
+
+
+def get_file_index(directory: Path, pattern: str = "*.yml") -> FileIndex:
+    """shared FileIndex for directory, built on first use"""
+    key = (Path(directory), pattern)
+    if key not in _file_indexes:
+        _file_indexes[key] = FileIndex(Path(directory), pattern)
+    return _file_indexes[key]
+
+
+def file_moved(
+    old: typing.Union[Path, str, None], new: typing.Union[Path, str, None]
+) -> None:
+    """update every FileIndex that covers a file that was written/moved/removed"""
+    for index in _file_indexes.values():
+        changed = False
+        if old and index.covers(Path(old)):
+            index.discard(Path(old))
+            changed = True
+        if new and index.covers(Path(new)):
+            index.add(Path(new))
+            changed = True
+        if changed:
+            # our own change, no need to rescan for it
+            index.refresh()
+
+
 def dump_obj(
     obj: BaseModel,
     *,
@@ -73,6 +180,7 @@ def dump_obj(
             sort_keys=False,
             Dumper=EnumDumper,
         )
+    file_moved(None, filename)
 
 
 def get_new_filename(obj: dict) -> str:
@@ -86,7 +194,7 @@ def get_new_filename(obj: dict) -> str:
 def legacy_districts(
     abbr: typing.Optional[str] = None, jurisdiction_id: typing.Optional[str] = None
 ) -> dict[str, list[str]]:
-    """ can take jurisdiction_id or abbr via kwargs """
+    """can take jurisdiction_id or abbr via kwargs"""
     legacy_districts: dict[str, list[str]] = {"upper": [], "lower": []}
     for d in metadata.lookup(
         abbr=abbr, jurisdiction_id=jurisdiction_id
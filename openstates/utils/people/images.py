@@ -1,84 +1,144 @@
 #!/usr/bin/env python
 import os
 import io
+import json
+import typing
 import hashlib
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 import click
 import boto3  # type: ignore
-import typing
 from PIL import Image  # type: ignore
 from botocore.exceptions import ClientError  # type: ignore
 import requests
+from requests.adapters import HTTPAdapter
 from .general import get_data_path
+from .loader import load_yaml_models
 from ...models.people import Person
 
 
 ALLOWED_CONTENT_TYPES = ("image/jpeg", "image/png", "image/gif", "image/jpg")
+DOWNLOAD_WORKERS = int(os.environ.get("IMAGE_DOWNLOAD_WORKERS", 8))
+RESIZE_WORKERS = int(os.environ.get("IMAGE_RESIZE_WORKERS", os.cpu_count() or 1))
+UPLOAD_WORKERS = int(os.environ.get("IMAGE_UPLOAD_WORKERS", 8))
+# people are processed (and the manifest saved, if changed) this many at a time
+BATCH_SIZE = 50
+# one manifest per state, so syncs of different states never overwrite each other
+MANIFEST_KEY = "images/manifests/{abbr}.json"
+# resized versions, largest dimension in px
+SIZES = {"small": 200}
 
 
 _IMAGE_RETURN_TYPE = tuple[typing.Optional[bytes], typing.Optional[str]]
 
 
-def upload(
-    img_callable: typing.Callable[[], _IMAGE_RETURN_TYPE],
-    key_name: str,
-    skip_existing: bool,
-) -> typing.Optional[bytes]:
-    """upload works as a sort of decorator around img_callable, which is
-    only called if necessary after checking if there's already an image"""
-    s3 = boto3.client("s3")
-    try:
-        obj = s3.head_object(Bucket=os.environ["S3_BUCKET"], Key=key_name)
-    except ClientError:
-        obj = None
-
-    if obj and skip_existing:
-        click.secho(f"{key_name} already exists", fg="yellow")
-        return None
-
-    # if we need to get the object, call the (potentially expensive) callable
-    img_bytes, content_type = img_callable()
-    if not img_bytes:
-        return None
-
-    # compare sha1 hashes
-    sha1 = hashlib.sha1(img_bytes).hexdigest()
-    if obj and obj["Metadata"].get("sha1") == sha1:
-        click.secho(f"{key_name} already up to date", fg="yellow")
-        return img_bytes
-
-    click.secho(f"uploading {key_name}", fg="green")
-    s3.upload_fileobj(
-        io.BytesIO(img_bytes),
-        os.environ["S3_BUCKET"],
-        key_name,
-        ExtraArgs={
-            "Metadata": {"sha1": sha1},
-            "ContentType": content_type,
-            "ACL": "public-read",
-        },
-    )
-
-    # return the raw bytes, which may be reused for resizing/etc.
-    return img_bytes
-
-
-def download_image(url: str) -> _IMAGE_RETURN_TYPE:
+class S3Store:
+    """images stored in S3_BUCKET"""
+
+    def __init__(self, bucket: typing.Optional[str] = None):
+        self.bucket = bucket or os.environ["S3_BUCKET"]
+        self.s3 = boto3.client("s3")
+
+    def get_metadata(self, key: str) -> typing.Optional[dict[str, str]]:
+        try:
+            return self.s3.head_object(Bucket=self.bucket, Key=key)["Metadata"]
+        except ClientError:
+            return None
+
+    def read(self, key: str) -> typing.Optional[bytes]:
+        try:
+            obj = self.s3.get_object(Bucket=self.bucket, Key=key)
+        except ClientError:
+            return None
+        return obj["Body"].read()
+
+    def write(
+        self,
+        key: str,
+        data: bytes,
+        content_type: str,
+        metadata: dict[str, str],
+        public: bool = True,
+    ) -> None:
+        extra_args = {"Metadata": metadata, "ContentType": content_type}
+        if public:
+            extra_args["ACL"] = "public-read"
+        self.s3.upload_fileobj(io.BytesIO(data), self.bucket, key, ExtraArgs=extra_args)
+
+
+class LocalStore:
+    """stand-in for S3Store that writes to a local directory, metadata alongside"""
+
+    def __init__(self, directory: typing.Union[Path, str]):
+        self.directory = Path(directory)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key
+
+    def get_metadata(self, key: str) -> typing.Optional[dict[str, str]]:
+        try:
+            with open(f"{self._path(key)}.meta.json") as f:
+                return typing.cast(dict, json.load(f))
+        except FileNotFoundError:
+            return None
+
+    def read(self, key: str) -> typing.Optional[bytes]:
+        try:
+            return self._path(key).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def write(
+        self,
+        key: str,
+        data: bytes,
+        content_type: str,
+        metadata: dict[str, str],
+        public: bool = True,
+    ) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+        with open(f"{path}.meta.json", "w") as f:
+            json.dump(dict(metadata, content_type=content_type), f)
+
+
+ImageStore = typing.Union[S3Store, LocalStore]
+
+
+def get_image_store() -> ImageStore:
+    # OS_IMAGE_DIR allows syncing to a local directory instead of S3
+    if os.environ.get("OS_IMAGE_DIR"):
+        return LocalStore(os.environ["OS_IMAGE_DIR"])
+    return S3Store()
+
+
+def download_image(
+    session: requests.Session, url: str, etag: str = ""
+) -> tuple[typing.Optional[bytes], typing.Optional[str], str]:
+    """
+    returns (bytes, content type, etag), bytes are None if the image
+    couldn't be fetched or hasn't changed since etag
+    """
+    headers = {"If-None-Match": etag} if etag else {}
     try:
-        resp = requests.get(url)
+        resp = session.get(url, headers=headers, timeout=30)
     except Exception as e:
         click.secho(f"could not fetch {url}, {e}", fg="red")
-        return None, None
+        return None, None, ""
 
+    if resp.status_code == 304:
+        return None, None, etag
     if resp.status_code != 200:
         click.secho(f"could not fetch {url}, {resp.status_code}", fg="red")
-        return None, None
+        return None, None, ""
 
     content_type = resp.headers["content-type"]
     if content_type not in ALLOWED_CONTENT_TYPES:
         click.secho(f"unknown content type for {url}, {content_type}", fg="red")
-        return None, None
+        return None, None, ""
 
-    return resp.content, content_type
+    return resp.content, content_type, resp.headers.get("etag", "")
 
 
 def resize_image(img_bytes: bytes, size: int) -> _IMAGE_RETURN_TYPE:
@@ -91,30 +151,205 @@ def resize_image(img_bytes: bytes, size: int) -> _IMAGE_RETURN_TYPE:
     return output.read(), "image/jpeg"
 
 
-def download_state_images(abbr: str, skip_existing: bool) -> None:
-    for filename in (get_data_path(abbr) / "legislature").glob("*.yml"):
-        person: Person = Person.load_yaml(filename)
-        url = person.image
-        if not url:
-            continue
+def _resize_all(img_bytes: bytes) -> dict[str, _IMAGE_RETURN_TYPE]:
+    return {name: resize_image(img_bytes, size) for name, size in SIZES.items()}
+
 
-        # safe to cast because we've bailed above if url is None
-        img_bytes = upload(
-            lambda: download_image(typing.cast(str, url)),
-            f"images/original/{person.id}",
-            skip_existing,
+class ImageSync:
+    """
+    Syncs people's images (plus resized versions) to an ImageStore.
+
+    A private manifest per state of source URL -> ETag, sha1 and uploaded keys
+    is kept in the store, so unchanged images are skipped without re-uploading (or, with
+    skip_existing, without even a request) and an interrupted sync resumes
+    where it left off.  Downloads share a pooled session across a thread
+    pool, resizing happens in a process pool and uploads are made in batches.
+    """
+
+    def __init__(
+        self,
+        store: ImageStore,
+        skip_existing: bool = True,
+        session: typing.Optional[requests.Session] = None,
+        download_workers: int = DOWNLOAD_WORKERS,
+        resize_workers: int = RESIZE_WORKERS,
+        upload_workers: int = UPLOAD_WORKERS,
+    ):
+        self.store = store
+        self.skip_existing = skip_existing
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_maxsize=download_workers)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+        self.session = session
+        self.downloads = ThreadPoolExecutor(download_workers)
+        self.uploads = ThreadPoolExecutor(upload_workers)
+        self.resizes = ProcessPoolExecutor(resize_workers) if resize_workers else None
+        # the manifest of the state being synced, and whether it needs saving
+        self.manifest: dict[str, dict[str, typing.Any]] = {}
+        self.manifest_changed = False
+
+    def close(self) -> None:
+        self.downloads.shutdown()
+        self.uploads.shutdown()
+        if self.resizes:
+            self.resizes.shutdown()
+
+    def load_manifest(self, abbr: str) -> None:
+        data = self.store.read(MANIFEST_KEY.format(abbr=abbr))
+        self.manifest = json.loads(data) if data else {}
+        self.manifest_changed = False
+
+    def save_manifest(self, abbr: str) -> None:
+        if not self.manifest_changed:
+            return
+        self.store.write(
+            MANIFEST_KEY.format(abbr=abbr),
+            json.dumps(self.manifest, sort_keys=True).encode(),
+            "application/json",
+            {},
+            public=False,
+        )
+        self.manifest_changed = False
+
+    def _keys(self, person_id: str) -> dict[str, str]:
+        keys = {"original": f"images/original/{person_id}"}
+        for name in SIZES:
+            keys[name] = f"images/{name}/{person_id}"
+        return keys
+
+    def _needs_download(self, person_id: str, url: str) -> bool:
+        original_key = self._keys(person_id)["original"]
+        entry = self.manifest.get(url)
+        if not self.skip_existing:
+            return True
+        if entry and original_key in entry["keys"]:
+            return False
+        # not in the manifest, but may have been uploaded before there was one
+        metadata = self.store.get_metadata(original_key)
+        if metadata is None:
+            return True
+        click.secho(f"{original_key} already exists", fg="yellow")
+        entry = self.manifest.setdefault(
+            url, {"etag": "", "sha1": metadata.get("sha1", ""), "keys": {}}
+        )
+        entry["keys"][original_key] = metadata.get("sha1", "")
+        self.manifest_changed = True
+        return False
+
+    def _etag(self, person_id: str, url: str) -> str:
+        """
+        ETag to make a conditional request for url with, only if all of this
+        person's images are up to date with it.  Otherwise a 304 would leave
+        them missing (another person with the same image, or a new size), so
+        the image is fetched in full.
+        """
+        entry = self.manifest.get(url)
+        if not entry:
+            return ""
+        if all(
+            entry["keys"].get(key) == entry["sha1"]
+            for key in self._keys(person_id).values()
+        ):
+            return typing.cast(str, entry.get("etag", ""))
+        return ""
+
+    def sync(self, abbr: str, people: list[Person]) -> dict[str, int]:
+        counts = {"skipped": 0, "unchanged": 0, "uploaded": 0, "failed": 0}
+        jobs = [(person.id, person.image) for person in people if person.image]
+        self.load_manifest(abbr)
+        for start in range(0, len(jobs), BATCH_SIZE):
+            self._sync_batch(jobs[start : start + BATCH_SIZE], counts)
+            self.save_manifest(abbr)
+        return counts
+
+    def _sync_batch(self, jobs: list[tuple[str, str]], counts: dict[str, int]) -> None:
+        to_fetch = []
+        for person_id, url in jobs:
+            if self._needs_download(person_id, url):
+                to_fetch.append((person_id, url))
+            else:
+                counts["skipped"] += 1
+
+        downloads = self.downloads.map(
+            lambda job: download_image(self.session, job[1], self._etag(*job)),
+            to_fetch,
+        )
+        changed = []
+        for (person_id, url), (img_bytes, content_type, etag) in zip(
+            to_fetch, downloads
+        ):
+            entry = self.manifest.get(url, {"etag": "", "sha1": "", "keys": {}})
+            keys = self._keys(person_id)
+            if img_bytes is None:
+                if etag and all(key in entry["keys"] for key in keys.values()):
+                    counts["unchanged"] += 1
+                else:
+                    counts["failed"] += 1
+                continue
+            sha1 = hashlib.sha1(img_bytes).hexdigest()
+            if entry["sha1"] == sha1 and all(
+                entry["keys"].get(key) == sha1 for key in keys.values()
+            ):
+                if entry.get("etag") != etag:
+                    entry["etag"] = etag
+                    self.manifest_changed = True
+                counts["unchanged"] += 1
+                continue
+            changed.append((person_id, url, img_bytes, content_type, etag, sha1))
+
+        if self.resizes:
+            resized = list(self.resizes.map(_resize_all, [c[2] for c in changed]))
+        else:
+            resized = [_resize_all(c[2]) for c in changed]
+
+        uploads = []
+        for (person_id, url, img_bytes, content_type, etag, sha1), versions in zip(
+            changed, resized
+        ):
+            keys = self._keys(person_id)
+            uploads.append((keys["original"], img_bytes, content_type, sha1))
+            for name, (data, resized_type) in versions.items():
+                uploads.append(
+                    (keys[name], typing.cast(bytes, data), resized_type, sha1)
+                )
+        list(
+            self.uploads.map(
+                lambda upload: self.store.write(
+                    upload[0], upload[1], upload[2], {"sha1": upload[3]}
+                ),
+                uploads,
+            )
         )
-        # if the image got skipped, we can't do the resizes either, this means if we add new
-        # profiles we need to run with --no-skip-existing
-        if not img_bytes:
-            continue
-
-        # resize image so largest dimension is 200px
-        upload(
-            lambda: resize_image(typing.cast(bytes, img_bytes), 200),
-            f"images/small/{person.id}",
-            skip_existing,
+
+        # only recorded once everything for the batch is uploaded
+        for person_id, url, img_bytes, content_type, etag, sha1 in changed:
+            click.secho(f"uploaded images for {person_id}", fg="green")
+            entry = self.manifest.setdefault(url, {"keys": {}})
+            entry.update(etag=etag, sha1=sha1)
+            for key in self._keys(person_id).values():
+                entry["keys"][key] = sha1
+            counts["uploaded"] += 1
+            self.manifest_changed = True
+
+
+def download_state_images(
+    abbr: str, skip_existing: bool, syncer: typing.Optional[ImageSync] = None
+) -> dict[str, int]:
+    people = [
+        person
+        for _, person in load_yaml_models(
+            Person, (get_data_path(abbr) / "legislature").glob("*.yml")
         )
+    ]
+    if syncer:
+        return syncer.sync(abbr, people)
+    syncer = ImageSync(get_image_store(), skip_existing)
+    try:
+        return syncer.sync(abbr, people)
+    finally:
+        syncer.close()
 
 
 # def recognize(key):
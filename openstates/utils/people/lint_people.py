@@ -1,9 +1,12 @@
+import os
 import re
 import datetime
 import click
 import typing
+import yaml
 from pathlib import Path
-from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
 from collections import defaultdict, Counter
 from openstates import metadata
 from enum import Enum, auto
@@ -11,9 +14,11 @@ from pydantic import ValidationError
 from .retire import retire_file
 from .general import (
     dump_obj,
+    get_data_path,
     legacy_districts,
     load_municipalities,
 )
+from .loader import load_yaml_models
 from ...models.people import Person
 
 
@@ -39,6 +44,8 @@ JURISDICTION_RE = re.compile(
     r"ocd-jurisdiction/country:us/(state|district|territory):\w\w/((place|county):[a-z_]+/)?government"
 )
 
+LINT_WORKERS = int(os.environ.get("OS_PEOPLE_LINT_WORKERS", os.cpu_count() or 1))
+
 # constant to check for this particular fix
 MOVED_TO_RETIRED = "moved to retired"
 
@@ -156,7 +163,9 @@ _ACTUAL_DISTRICTS_TYPE = defaultdict[str, defaultdict[str, list[str]]]
 
 
 def get_expected_districts(
-        settings: dict[str, dict], abbr: str
+        settings: dict[str, dict],
+        abbr: str,
+        echo: typing.Callable[..., None] = click.secho,
 ) -> _EXPECTED_DISTRICTS_TYPE:
     expected = {}
 
@@ -174,22 +183,20 @@ def get_expected_districts(
     # remove vacancies
     vacancies = settings.get(abbr, {}).get("vacancies", [])
     if vacancies:
-        click.secho(f"Processing {len(vacancies)} vacancies:")
+        echo(f"Processing {len(vacancies)} vacancies:")
     for vacancy in vacancies:
         if datetime.date.today() < vacancy["vacant_until"]:
             expected[vacancy["chamber"]][str(vacancy["district"])] -= 1
-            click.secho(
+            echo(
                 "\t{chamber}-{district} (until {vacant_until})".format(**vacancy),
                 fg="green",
             )
         else:
-            click.secho(
+            raise BadVacancy(
                 "\t{chamber}-{district} expired {vacant_until} remove & re-run".format(
                     **vacancy
-                ),
-                fg="red",
+                )
             )
-            raise BadVacancy()
 
     return expected
 
@@ -222,12 +229,67 @@ def compare_districts(
     return errors
 
 
+def format_validation_error(ve: ValidationError) -> list[str]:
+    return [
+        f"  {'.'.join(str(l) for l in error['loc'])}: {error['msg']}"
+        for error in ve.errors()
+    ]
+
+
+@dataclass
+class LintReport:
+    abbr: str
+    errors: dict[str, list[str]]
+    warnings: dict[str, list[str]]
+    fixes: dict[str, list[str]]
+    # errors that aren't tied to a single file: duplicates & seat counts
+    state_errors: list[str]
+    # (message, style) of anything echoed while linting, printed with the
+    # report so that states linted in parallel don't interleave
+    output: list[tuple[str, dict[str, typing.Any]]] = field(default_factory=list)
+
+    @property
+    def error_count(self) -> int:
+        return sum(len(errors) for errors in self.errors.values()) + len(
+            self.state_errors
+        )
+
+    def print(self, verbose: bool) -> int:  # pragma: no cover
+        for message, style in self.output:
+            click.secho(message, **style)
+        for fn, errors in self.errors.items():
+            warnings = self.warnings.get(fn, [])
+            fixes = self.fixes.get(fn, [])
+            if errors or warnings or fixes:
+                click.echo(fn)
+                for fix in fixes:
+                    click.secho(" " + fix, fg="green")
+                for err in errors:
+                    click.secho(" " + err, fg="red")
+                for warning in warnings:
+                    click.secho(" " + warning, fg="yellow")
+            if not errors and verbose > 0:
+                click.secho(fn + " OK!", fg="green")
+
+        for err in self.state_errors:
+            click.secho(err, fg="red")
+
+        return self.error_count
+
+
+PersonEntry = tuple[
+    Path, PersonType, typing.Union[dict[str, typing.Any], Person, ValidationError]
+]
+
+
 class Validator:
     def __init__(self, abbr: str, settings: dict, fix: bool, save_all: bool, ignore_role_warnings: bool):
+        self.abbr = abbr
         self.fix = fix
         self.save_all = save_all
         self.ignore_role_warnings = ignore_role_warnings
-        self.expected = get_expected_districts(settings, abbr)
+        self.output: list[tuple[str, dict[str, typing.Any]]] = []
+        self.expected = get_expected_districts(settings, abbr, self.echo)
         self.errors: defaultdict[str, list[str]] = defaultdict(list)
         self.warnings: defaultdict[str, list[str]] = defaultdict(list)
         self.fixes: defaultdict[str, list[str]] = defaultdict(list)
@@ -244,6 +306,45 @@ class Validator:
         for m in self.municipalities:
             if not JURISDICTION_RE.match(m):
                 raise ValueError(f"invalid municipality id {m}")
+        # precomputed tables the checks look values up in
+        self.valid_jurisdictions = set(metadata.STATES_BY_JID) | set(
+            self.municipalities
+        )
+        self.district_names: dict[str, set[str]] = {
+            chamber: set(districts) for chamber, districts in self.expected.items()
+        }
+        for chamber, names in self.legacy_districts.items():
+            self.district_names.setdefault(chamber, set()).update(names)
+
+    def echo(self, message: str, **style: typing.Any) -> None:
+        self.output.append((message, style))
+
+    def validate_person(
+            self,
+            data: dict[str, typing.Any],
+            filename: Path,
+            person_type: PersonType,
+    ) -> None:
+        self.validate_people([(filename, person_type, data)])
+
+    def validate_people(self, entries: typing.Iterable[PersonEntry]) -> None:
+        """
+        Validate a batch of (filename, person_type, data) entries, where data
+        is the raw YAML data, an already loaded Person, or the ValidationError
+        raised while loading it.
+        """
+        for filename, person_type, data in entries:
+            if isinstance(data, ValidationError):
+                # if we couldn't create a valid person, there's nothing more to check
+                self.errors[filename.name] = format_validation_error(data)
+                continue
+            if not isinstance(data, Person):
+                try:
+                    data = Person(**data)
+                except ValidationError as ve:
+                    self.errors[filename.name] = format_validation_error(ve)
+                    continue
+            self._validate(filename, person_type, data)
 
     def process_validator_result(
             self,
@@ -259,31 +360,19 @@ class Validator:
             self.fixes[original_filename.name].extend(result.fixes)
             dump_obj(person, filename=original_filename)
 
-    def validate_person(
-            self,
-            data: dict[str, typing.Any],
-            filename: Path,
-            person_type: PersonType,
-    ) -> None:
+    def _validate(self, filename: Path, person_type: PersonType, person: Person) -> None:
         print_filename = filename.name
-        try:
-            person = Person(**data)
-            self.errors[print_filename] = []
-        except ValidationError as ve:
-            self.errors[print_filename] = [
-                f"  {'.'.join(str(l) for l in error['loc'])}: {error['msg']}"
-                for error in ve.errors()
-            ]
-            # if we couldn't create a valid person, bail now
-            return
+        self.errors[print_filename] = []
 
         uid = person.id.split("/")[1]
         if uid not in print_filename:
             self.errors[print_filename].append(f"id piece {uid} not in filename")
 
-        self.errors[print_filename].extend(
-            validate_jurisdictions(person, self.municipalities)
-        )
+        for role in person.roles:
+            if role.jurisdiction not in self.valid_jurisdictions:
+                self.errors[print_filename].append(
+                    f"{role.jurisdiction} is not a valid jurisdiction_id"
+                )
 
         # looser validation for upstream-maintained unitedstates.io data
         if "/us/legislature" not in str(filename):
@@ -317,11 +406,11 @@ class Validator:
 
         # special case for the auto-retirement fix
         if MOVED_TO_RETIRED in self.fixes[print_filename]:
-            retire_file(filename)
+            filename = Path(retire_file(filename))
 
         if self.save_all:
             # save person if save_all, will re-order fields/etc.
-            click.secho(f"re-saving {filename}", fg="green")
+            self.echo(f"re-saving {filename}", fg="green")
             dump_obj(person, filename=filename)
 
     def validate_old_district_names(self, person: Person) -> list[str]:
@@ -329,8 +418,11 @@ class Validator:
         for role in person.roles:
             if (
                     role.district
-                    and role.district not in self.expected[role.type]
-                    and role.district not in self.legacy_districts[role.type]
+                    and (
+                        role.type in self.district_names
+                        or role.type in ("upper", "lower", "legislature")
+                    )
+                    and role.district not in self.district_names.get(role.type, ())
             ):
                 errors.append(f"unknown district name: {role.type} {role.district}")
         return errors
@@ -352,31 +444,72 @@ class Validator:
                     errors.append(f'duplicate {key}: "{value}" {instance_str}')
         return errors
 
-    def print_validation_report(self, verbose: bool) -> int:  # pragma: no cover
-        error_count = 0
-
-        for fn, errors in self.errors.items():
-            warnings = self.warnings[fn]
-            fixes = self.fixes[fn]
-            if errors or warnings or fixes:
-                click.echo(fn)
-                for fix in fixes:
-                    click.secho(" " + fix, fg="green")
-                for err in errors:
-                    click.secho(" " + err, fg="red")
-                    error_count += 1
-                for warning in warnings:
-                    click.secho(" " + warning, fg="yellow")
-            if not errors and verbose > 0:
-                click.secho(fn + " OK!", fg="green")
-
-        for err in self.check_duplicates():
-            click.secho(err, fg="red")
-            error_count += 1
-
-        errors = compare_districts(self.expected, self.active_legislators)
-        for err in errors:
-            click.secho(err, fg="red")
-            error_count += 1
+    def report(self) -> LintReport:
+        return LintReport(
+            self.abbr,
+            dict(self.errors),
+            {fn: warnings for fn, warnings in self.warnings.items() if warnings},
+            {fn: fixes for fn, fixes in self.fixes.items() if fixes},
+            self.check_duplicates()
+            + compare_districts(self.expected, self.active_legislators),
+            self.output,
+        )
 
-        return error_count
+    def print_validation_report(self, verbose: bool) -> int:  # pragma: no cover
+        return self.report().print(verbose)
+
+
+def load_state_people(abbr: str, municipal: bool) -> list[PersonEntry]:
+    """load every person in a state once, keeping the files that don't validate"""
+    state_dir = get_data_path(abbr)
+    directories = [
+        ("legislature", PersonType.LEGISLATIVE),
+        ("retired", PersonType.RETIRED),
+        ("executive", PersonType.EXECUTIVE),
+    ]
+    if municipal:
+        directories.append(("municipalities", PersonType.MUNICIPAL))
+
+    entries: list[PersonEntry] = []
+    for directory, person_type in directories:
+        errors: list[tuple[Path, Exception]] = []
+        loaded = load_yaml_models(Person, (state_dir / directory).glob("*.yml"), errors)
+        found: dict[Path, typing.Any] = dict(loaded)
+        for filename, exc in errors:
+            if not isinstance(exc, ValidationError):
+                raise exc
+            found[filename] = exc
+        entries.extend((filename, person_type, found[filename]) for filename in sorted(found))
+    return entries
+
+
+def lint_state(
+        abbr: str, municipal: bool, fix: bool, save_all: bool, ignore_role_warnings: bool
+) -> LintReport:
+    state_dir = get_data_path(abbr)
+    # a hack... need to get data path then traverse up
+    with open(state_dir.parents[1] / "settings.yml") as f:
+        settings = yaml.safe_load(f)
+
+    validator = Validator(abbr, settings, fix, save_all, ignore_role_warnings)
+    validator.validate_people(load_state_people(abbr, municipal))
+    return validator.report()
+
+
+def lint_states(
+        abbreviations: list[str],
+        municipal: bool,
+        fix: bool,
+        save_all: bool,
+        ignore_role_warnings: bool,
+        workers: int = LINT_WORKERS,
+) -> list[LintReport]:
+    """lint each state, in parallel if workers > 1, returning reports in order"""
+    args = [
+        (abbr, municipal, fix, save_all, ignore_role_warnings) for abbr in abbreviations
+    ]
+    if workers > 1 and len(args) > 1:
+        # load_yaml_models sees it's in a worker and doesn't start a pool of its own
+        with ProcessPoolExecutor(min(workers, len(args))) as pool:
+            return list(pool.map(lint_state, *zip(*args)))
+    return [lint_state(*a) for a in args]
@@ -0,0 +1,189 @@
+"""
+Loading of people & committee YAML directories.
+
+Files are parsed with libyaml when it is available, in a process pool when
+there are enough of them to make that worthwhile (unless this is already a
+worker process of someone else's pool), and the validated models
+are kept in an on-disk cache keyed by (path, mtime, size) so that unchanged
+files are never parsed twice.  The cache is thrown away whenever the code that
+produced it (the models, their validators, or this loader) changes.
+"""
+import os
+import sys
+import pickle
+import multiprocessing
+import functools
+import typing
+import hashlib
+import tempfile
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+import yaml
+from pydantic import BaseModel as PydanticBaseModel
+from ...models.common import BaseModel, YamlLoader
+
+# set OS_PEOPLE_CACHE_DIR to an empty string to disable the cache
+CACHE_DIR = os.environ.get(
+    "OS_PEOPLE_CACHE_DIR", str(Path.home() / ".cache" / "openstates-people")
+)
+# fewer files than this are parsed in-process, a pool isn't worth starting
+POOL_THRESHOLD = 64
+LOAD_WORKERS = int(os.environ.get("OS_PEOPLE_LOAD_WORKERS", os.cpu_count() or 1))
+
+ModelT = typing.TypeVar("ModelT", bound=BaseModel)
+CacheKey = tuple[int, int]
+
+
+def load_yaml_data(filename: Path) -> typing.Any:
+    with open(filename) as file:
+        return yaml.load(file, Loader=YamlLoader)
+
+
+def _parse(ModelCls: type[ModelT], filename: Path) -> typing.Union[ModelT, Exception]:
+    # exceptions are returned rather than raised so one bad file doesn't
+    # take the rest of a pool's results with it
+    try:
+        return ModelCls(**load_yaml_data(filename))
+    except Exception as e:
+        return e
+
+
+@functools.lru_cache(maxsize=None)
+def _code_version(ModelCls: type[PydanticBaseModel]) -> str:
+    """
+    Digest of ModelCls's schema and the source of every module defining it or
+    the models it contains (validators included), plus this loader's.
+    """
+    modules = {__name__}
+    seen: set[type[PydanticBaseModel]] = set()
+    todo = [ModelCls]
+    while todo:
+        cls = todo.pop()
+        if cls in seen:
+            continue
+        seen.add(cls)
+        modules.update(base.__module__ for base in cls.__mro__)
+        for field in cls.__fields__.values():
+            for sub in [field, *(field.sub_fields or [])]:
+                if isinstance(sub.type_, type) and issubclass(
+                    sub.type_, PydanticBaseModel
+                ):
+                    todo.append(sub.type_)
+
+    digest = hashlib.sha1(ModelCls.schema_json(sort_keys=True).encode())
+    for name in sorted(modules):
+        filename = getattr(sys.modules.get(name), "__file__", None)
+        if filename:
+            with open(filename, "rb") as f:
+                digest.update(f.read())
+    return digest.hexdigest()
+
+
+def _cache_path(ModelCls: type, filenames: list[Path]) -> typing.Optional[Path]:
+    if not CACHE_DIR or not filenames:
+        return None
+    # one cache file per model & set of directories
+    directories = sorted({str(f.parent.resolve()) for f in filenames})
+    digest = hashlib.sha1("\n".join(directories).encode()).hexdigest()[:16]
+    return (
+        Path(CACHE_DIR) / f"{ModelCls.__module__}.{ModelCls.__name__}-{digest}.pickle"
+    )
+
+
+def _read_cache(
+    path: typing.Optional[Path], version: str
+) -> dict[str, tuple[CacheKey, typing.Any]]:
+    if not path:
+        return {}
+    try:
+        with open(path, "rb") as f:
+            cache_version, entries = pickle.load(f)
+    except Exception:
+        return {}
+    return entries if cache_version == version else {}
+
+
+def _write_cache(
+    path: typing.Optional[Path],
+    version: str,
+    entries: dict[str, tuple[CacheKey, typing.Any]],
+) -> None:
+    if not path:
+        return
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # write & rename so concurrent runs never see a partial file
+        with tempfile.NamedTemporaryFile(dir=path.parent, delete=False) as f:
+            pickle.dump((version, entries), f, pickle.HIGHEST_PROTOCOL)
+        os.replace(f.name, path)
+    except OSError as e:
+        print(f"could not write cache {path}: {e}")
+
+
+def load_yaml_models(
+    ModelCls: type[ModelT],
+    filenames: typing.Iterable[Path],
+    errors: typing.Optional[list[tuple[Path, Exception]]] = None,
+) -> list[tuple[Path, ModelT]]:
+    """
+    Load & validate every file as a ModelCls, returning (filename, obj) pairs
+    sorted by filename.
+
+    If errors is passed, files that fail to load are appended to it as
+    (filename, exception) and skipped, otherwise the first error is raised.
+    """
+    filenames = sorted(Path(f) for f in filenames)
+    cache_path = _cache_path(ModelCls, filenames)
+    version = _code_version(ModelCls) if cache_path else ""
+    cached = _read_cache(cache_path, version)
+
+    # entries for files not loaded this time are kept as long as the file
+    # still exists, so loading a subset doesn't drop the rest of the cache
+    entries = {name: entry for name, entry in cached.items() if os.path.exists(name)}
+    results: dict[Path, typing.Union[ModelT, Exception]] = {}
+    to_parse = []
+    for filename in filenames:
+        stat = filename.stat()
+        key = (stat.st_mtime_ns, stat.st_size)
+        entry = cached.get(str(filename))
+        if entry and entry[0] == key:
+            results[filename] = entry[1]
+        else:
+            entries.pop(str(filename), None)
+            to_parse.append((filename, key))
+
+    # a worker of another pool (e.g. lint_states') parses in-process rather
+    # than starting a pool of its own
+    in_worker = multiprocessing.parent_process() is not None
+    if len(to_parse) >= POOL_THRESHOLD and LOAD_WORKERS > 1 and not in_worker:
+        with ProcessPoolExecutor(LOAD_WORKERS) as pool:
+            parsed = list(
+                pool.map(
+                    _parse,
+                    [ModelCls] * len(to_parse),
+                    [f for f, _ in to_parse],
+                    chunksize=32,
+                )
+            )
+    else:
+        parsed = [_parse(ModelCls, f) for f, _ in to_parse]
+
+    for (filename, key), obj in zip(to_parse, parsed):
+        results[filename] = obj
+        if not isinstance(obj, Exception):
+            entries[str(filename)] = (key, obj)
+
+    # only rewrite the cache if something changed
+    if to_parse or len(entries) != len(cached):
+        _write_cache(cache_path, version, entries)
+
+    loaded = []
+    for filename in filenames:
+        obj = results[filename]
+        if isinstance(obj, Exception):
+            if errors is None:
+                raise obj
+            errors.append((filename, obj))
+        else:
+            loaded.append((filename, typing.cast(ModelT, obj)))
+    return loaded
@@ -4,17 +4,21 @@ import json
 import click
 import copy
 import datetime
+import time
+from collections import defaultdict
 from pathlib import Path
 from pydantic import BaseModel
 from ... import metadata
 from ..people import (
     get_new_filename,
     get_data_path,
+    get_file_index,
     dump_obj,
     ocd_uuid,
     retire_person,
     retire_file,
 )
+from .names import NameIndex
 from ...models.people import (
     Person,
     Role,
@@ -31,12 +35,10 @@ def find_file(leg_id: str, *, state: str = "*") -> Path:
         leg_id = leg_id.split("/")[1]
     assert len(leg_id) == 36
 
-    if state == "*":
-        filedir = get_data_path(".")
-        files = list(filedir.glob(f"*/*/*{leg_id}.yml"))
-    else:
-        filedir = get_data_path(state)
-        files = list(filedir.glob(f"*/*{leg_id}.yml"))
+    # one index covers every state, so lookups don't rescan the whole repo
+    files = get_file_index(get_data_path("."), "*/*/*.yml").find_all(leg_id)
+    if state != "*":
+        files = [f for f in files if f.parts[-3] == state]
 
     if len(files) == 1:
         return files[0]
@@ -293,15 +295,34 @@ def roles_equalish(role1: Role, role2: Role) -> bool:
     )
 
 
-def incoming_merge(
-    abbr: str,
-    existing_people: list[Person],
-    new_people: list[Person],
-    retirement: str,
-    reset_offices: bool,
-) -> list[tuple[Person, list[Person]]]:
-    unmatched = []
+class MergeIndex:
+    """
+    Blocking index over existing people, so that each scraped person is only
+    compared to people who could match: those with the same normalized name
+    or a role for the same seat.  Candidates keep their original order.
+    """
 
+    def __init__(self, people: list[Person]):
+        self.people = people
+        # the "ids" in this index are positions in people
+        self.by_name = NameIndex()
+        self.by_seat: defaultdict[
+            tuple[str, typing.Optional[str]], list[int]
+        ] = defaultdict(list)
+        for i, person in enumerate(people):
+            self.by_name.add(person.name, str(i))
+            for role in person.roles:
+                self.by_seat[(role.type, role.district)].append(i)
+
+    def candidates(self, new: Person) -> list[Person]:
+        indexes = {int(i) for i in self.by_name.lookup(new.name)}
+        if new.roles:
+            seat = (new.roles[0].type, new.roles[0].district)
+            indexes.update(self.by_seat.get(seat, []))
+        return [self.people[i] for i in sorted(indexes)]
+
+
+def seats_for_districts(abbr: str) -> dict[str, dict[str, int]]:
     seats_for_district = {}
     state = metadata.lookup(abbr=abbr)
     for chamber in state.chambers:
@@ -313,29 +334,51 @@ def incoming_merge(
         seats_for_district[chtype] = {
             district.name: district.num_seats for district in chamber.districts
         }
+    return seats_for_district
+
+
+def matching_role(
+    new: Person,
+    existing: Person,
+    seats_for_district: dict[str, dict[str, int]],
+    name_match: bool,
+) -> typing.Optional[Role]:
+    for role in existing.roles:
+        if role.type == "mayor" or role.type == "governor":
+            continue
+        seats = seats_for_district[role.type].get(typing.cast(str, role.district), 1)
+        # roles match if they are equal and there's only one seat, or
+        # if there is already a name match on this legislator
+        if roles_equalish(new.roles[0], role) and (seats == 1 or name_match):
+            return role
+    return None
+
+
+def incoming_merge(
+    abbr: str,
+    existing_people: list[Person],
+    new_people: list[Person],
+    retirement: str,
+    reset_offices: bool,
+) -> list[tuple[Person, list[Person]]]:
+    unmatched = []
+
+    seats_for_district = seats_for_districts(abbr)
+    index = MergeIndex(existing_people)
 
     # find candidate(s) for each new person
     for new in new_people:
         matched = False
         role_matches = []
 
-        for existing in existing_people:
+        for existing in index.candidates(new):
             name_match = new.name == existing.name
-            role_match = False
-            for role in existing.roles:
-                if role.type == "mayor" or role.type == "governor":
-                    continue
-                seats = seats_for_district[role.type].get(
-                    typing.cast(str, role.district), 1
-                )
-                # roles match if they are equal and there's only one seat, or
-                # if there is already a name match on this legislator
-                if roles_equalish(new.roles[0], role) and (seats == 1 or name_match):
-                    role_match = True
-                    # if they match without start date, copy the start date over so it isn't
-                    # altered or otherwise removed in the merge
-                    new.roles[0] = role
-                    break
+            role = matching_role(new, existing, seats_for_district, name_match)
+            role_match = role is not None
+            if role is not None:
+                # if they match without start date, copy the start date over so it isn't
+                # altered or otherwise removed in the merge
+                new.roles[0] = role
             if name_match or role_match:
                 matched = interactive_merge(
                     abbr,
@@ -361,6 +404,65 @@ def incoming_merge(
     return unmatched
 
 
+def benchmark_merge_index(
+    abbr: str, size: int, sample: int = 200
+) -> dict[str, typing.Any]:
+    """
+    Compare finding merge candidates with MergeIndex against scanning every
+    existing person, on a synthetic roster of size people spread over abbr's
+    districts.  Only the first sample scraped people are scanned, the scan
+    being quadratic.
+    """
+    seats_for_district = seats_for_districts(abbr)
+    jurisdiction_id = metadata.lookup(abbr=abbr).jurisdiction_id
+    seats = [
+        (chamber, district)
+        for chamber, districts in seats_for_district.items()
+        for district in districts
+    ]
+
+    def person(n: int, name: str) -> Person:
+        chamber, district = seats[n % len(seats)]
+        return Person(
+            id=ocd_uuid("person"),
+            name=name,
+            party=[Party(name="Independent")],
+            roles=[Role(type=chamber, district=district, jurisdiction=jurisdiction_id)],
+        )
+
+    existing_people = [person(n, f"Existing Person {n}") for n in range(size)]
+    # half of the scraped people are already known by name, all share seats
+    new_people = [
+        person(n, f"Existing Person {n}" if n % 2 else f"New Person {n}")
+        for n in range(size)
+    ]
+
+    def matches(new: Person, candidates: list[Person]) -> list[tuple[str, bool]]:
+        found = []
+        for existing in candidates:
+            name_match = new.name == existing.name
+            role = matching_role(new, existing, seats_for_district, name_match)
+            if name_match or role is not None:
+                found.append((existing.id, name_match))
+        return found
+
+    start = time.perf_counter()
+    scanned = [matches(new, existing_people) for new in new_people[:sample]]
+    scan_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index = MergeIndex(existing_people)
+    indexed = [matches(new, index.candidates(new)) for new in new_people]
+    index_seconds = time.perf_counter() - start
+
+    return {
+        "people": size,
+        "scan_ms_per_person": scan_seconds / min(sample, size) * 1000,
+        "index_ms_per_person": index_seconds / size * 1000,
+        "mismatches": sum(a != b for a, b in zip(scanned, indexed)),
+    }
+
+
 def write_new_file(abbr: str, new: Person, _type: str) -> None:
     filedir = get_data_path(abbr)
     fname = get_new_filename(new.dict())
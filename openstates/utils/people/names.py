@@ -0,0 +1,124 @@
+"""
+Name matching for people, used to link scraped names (committee members,
+merge candidates) to existing people.
+"""
+import re
+import typing
+import unicodedata
+from ...models.people import Person, SUFFIX_RE
+
+# names shorter than this are never fuzzy matched, too many false positives
+MIN_FUZZY_LENGTH = 5
+
+
+def name_tokens(name: str) -> list[str]:
+    """lowercased, accent & punctuation free tokens of a name, minus any suffixes"""
+    name = unicodedata.normalize("NFKD", name)
+    name = "".join(c for c in name if not unicodedata.combining(c)).lower()
+    # O'Brien -> obrien, M.D. -> md, but Mary-Kate -> mary kate
+    name = re.sub(r"['.’]", "", name)
+    tokens = re.sub(r"[\W_]", " ", name).split()
+    while len(tokens) > 1 and SUFFIX_RE.fullmatch(tokens[-1]):
+        tokens.pop()
+    return tokens
+
+
+def normalize_name(name: str) -> str:
+    return " ".join(name_tokens(name))
+
+
+def edit_distance(a: str, b: str) -> int:
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(
+                min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb))
+            )
+        previous = current
+    return previous[-1]
+
+
+class BKTree:
+    """metric tree for finding words within an edit distance of a query"""
+
+    def __init__(self) -> None:
+        self.root: typing.Optional[tuple[str, dict]] = None
+
+    def add(self, word: str) -> None:
+        if self.root is None:
+            self.root = (word, {})
+            return
+        node_word, children = self.root
+        while True:
+            distance = edit_distance(word, node_word)
+            if distance == 0:
+                return
+            if distance not in children:
+                children[distance] = (word, {})
+                return
+            node_word, children = children[distance]
+
+    def search(self, word: str, max_distance: int) -> list[tuple[int, str]]:
+        results = []
+        stack = [self.root] if self.root else []
+        while stack:
+            node_word, children = stack.pop()
+            distance = edit_distance(word, node_word)
+            if distance <= max_distance:
+                results.append((distance, node_word))
+            # triangle inequality: only children in this band can be close enough
+            for child_distance, child in children.items():
+                if distance - max_distance <= child_distance <= distance + max_distance:
+                    stack.append(child)
+        return sorted(results)
+
+
+class NameIndex:
+    """
+    Maps normalized names to the ids of the people that go by them.
+
+    Each person is indexed by their full name, family name (only if it is set,
+    a last name is never guessed from the full name) and other names.  If
+    max_distance is set, names without an exact match fall back to the closest
+    indexed names within that edit distance.
+    """
+
+    def __init__(self, max_distance: int = 0):
+        self.max_distance = max_distance
+        self.ids_by_name: dict[str, set[str]] = {}
+        self._tree = BKTree()
+
+    def add(self, name: str, id_: str) -> None:
+        key = normalize_name(name)
+        if not key:
+            return
+        if key not in self.ids_by_name:
+            self.ids_by_name[key] = set()
+            if self.max_distance:
+                self._tree.add(key)
+        self.ids_by_name[key].add(id_)
+
+    def add_person(self, person: Person) -> None:
+        self.add(person.name, person.id)
+        if person.family_name:
+            self.add(person.family_name, person.id)
+        for other in person.other_names:
+            self.add(other.name, person.id)
+
+    def lookup(self, name: str) -> set[str]:
+        """ids of everyone matching name, the closest matches if fuzzy"""
+        key = normalize_name(name)
+        if key in self.ids_by_name:
+            return self.ids_by_name[key]
+        if not self.max_distance or len(key) < MIN_FUZZY_LENGTH:
+            return set()
+        matches = self._tree.search(key, self.max_distance)
+        if not matches:
+            return set()
+        best = matches[0][0]
+        ids: set[str] = set()
+        for distance, match in matches:
+            if distance == best:
+                ids |= self.ids_by_name[match]
+        return ids
@@ -6,6 +6,7 @@ from pathlib import Path
 from datetime import datetime
 from ... import metadata
 from ...models.people import Person
+from .general import file_moved
 
 
 def add_vacancy(person: Person, until: datetime) -> None:
@@ -56,4 +57,5 @@ def retire_file(filename: typing.Union[Path, str]) -> str:  # pragma: no cover
         "/municipalities/", "/retired/"
     )
     os.renames(filename, new_filename)
+    file_moved(filename, new_filename)
     return new_filename
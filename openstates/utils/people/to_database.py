@@ -1,5 +1,7 @@
 import typing
 import datetime
+from collections import Counter, defaultdict
+from enum import Enum
 from functools import lru_cache
 import click
 from openstates import metadata
@@ -24,122 +26,133 @@ def cached_lookup(ModelCls: DjangoModel, **kwargs: str) -> DjangoModelInstance:
     return m
 
 
-def update_subobjects(
-    person: DjangoModelInstance,
-    fieldname: str,
-    objects: list[DataDict],
-    read_manager: typing.Any = None,
-) -> bool:
-    """ returns True if there are any updates """
-    # we need the default manager for this field in case we need to do updates
-    manager = getattr(person, fieldname)
-
-    # if a read_manager is passed, we'll use that for all read operations
-    # this is used for DjangoPerson.memberships to ensure we don't wipe out committee memberships
-    if read_manager is None:
-        read_manager = manager
-
-    current_count = read_manager.count()
-    updated = False
-
-    # if counts differ, we need to do an update for sure
-    if current_count != len(objects):
-        updated = True
-
-    # check if all objects exist
-    if not updated:
-        qs = read_manager
-        for obj in objects:
-            qs = qs.exclude(**obj)
-
-        if qs.exists():
-            updated = True
-
-    # if there's been an update, wipe the old & insert the new
-    if updated:
-        if current_count:
-            read_manager.all().delete()
-        for obj in objects:
-            manager.create(**obj)
-        # save to bump updated_at timestamp
-        person.save()
-
-    return updated
-
-
-def get_update_or_create(
-    ModelCls: DjangoModel, data: dict, lookup_keys: list[str]
-) -> tuple[DjangoModelInstance, bool, bool]:
-    updated = created = False
-    kwargs = {k: data[k] for k in lookup_keys}
-    try:
-        obj = ModelCls.objects.get(**kwargs)
-        for field, value in data.items():
-            # special case datetime since comparisons won't work between str/datetime
-            if isinstance(value, datetime.date):
-                value = str(value)
-            if getattr(obj, field) != value:
-                setattr(obj, field, value)
-                updated = True
-        if updated:
-            obj.save()
-    except ModelCls.DoesNotExist:
-        obj = ModelCls.objects.create(**data)
-        created = True
-    return obj, created, updated
+# fields compared when diffing each kind of subobject against the database
+SUBOBJECT_FIELDS = {
+    "other_names": ("name", "note", "start_date", "end_date"),
+    "links": ("url", "note"),
+    "sources": ("url", "note"),
+    "offices": ("classification", "address", "voice", "fax", "name"),
+    "identifiers": ("scheme", "identifier"),
+    "memberships": ("organization_id", "post_id", "role", "start_date", "end_date"),
+}
+PERSON_FIELDS = (
+    "name",
+    "given_name",
+    "family_name",
+    "gender",
+    "email",
+    "biography",
+    "birth_date",
+    "death_date",
+    "image",
+    "extras",
+)
+COMPUTED_FIELDS = ("primary_party", "current_role", "current_jurisdiction_id")
+# note that we don't manage committee memberships here
+COMMITTEE_CLASSIFICATIONS = ["committee", "subcommittee"]
+BATCH_SIZE = 1000
+
+
+def _db_value(value: typing.Any) -> typing.Any:
+    """convert a value from the YAML models to the way it is stored in the DB"""
+    # special case datetime since comparisons won't work between str/datetime
+    if isinstance(value, datetime.date):
+        return str(value)
+    if isinstance(value, Enum):
+        return value.value
+    return value
+
+
+def _subobject_key(obj: DataDict, fields: tuple[str, ...]) -> tuple:
+    return tuple(obj[field] for field in fields)
+
+
+def diff_subobjects(
+    rows: list[DjangoModelInstance], objects: list[DataDict], fields: tuple[str, ...]
+) -> tuple[list[DjangoModelInstance], list[DataDict]]:
+    """
+    compare existing rows to the desired objects as multisets of field values,
+    returns (rows to delete, objects to create)
+    """
+    wanted = Counter(_subobject_key(obj, fields) for obj in objects)
+    to_delete = []
+    for row in rows:
+        key = tuple(getattr(row, field) for field in fields)
+        if wanted[key]:
+            wanted[key] -= 1
+        else:
+            to_delete.append(row)
+    to_create = []
+    for obj in objects:
+        key = _subobject_key(obj, fields)
+        if wanted[key]:
+            wanted[key] -= 1
+            to_create.append(obj)
+    return to_delete, to_create
+
+
+class OrganizationLookup:
+    """
+    parties, jurisdiction organizations and their posts for a batch of people,
+    fetched up front in three queries
+    """
+
+    def __init__(self, people: list[Person]):
+        from openstates.data.models import Organization, Post
+
+        party_names = {party.name for data in people for party in data.party}
+        self.parties = {
+            org.name: org
+            for org in Organization.objects.filter(
+                classification="party", name__in=party_names
+            )
+        }
+        jurisdiction_ids = {role.jurisdiction for data in people for role in data.roles}
+        self.orgs = {
+            (org.classification, org.jurisdiction_id): org
+            for org in Organization.objects.filter(
+                jurisdiction_id__in=jurisdiction_ids
+            ).exclude(classification__in=COMMITTEE_CLASSIFICATIONS)
+        }
+        self.posts = {
+            (post.organization_id, post.label): post
+            for post in Post.objects.filter(organization__in=self.orgs.values())
+        }
 
+    def party(self, name: str) -> DjangoModelInstance:
+        return self.parties.get(name)
 
-def load_person(data: Person) -> tuple[bool, bool]:
-    # import has to be here so that Django is set up
-    from openstates.data.models import Organization, Post
-    from openstates.data.models import Person as DjangoPerson
+    def org(self, classification: str, jurisdiction_id: str) -> DjangoModelInstance:
+        return self.orgs.get((_db_value(classification), jurisdiction_id))
 
-    fields = dict(
-        id=data.id,
-        name=data.name,
-        given_name=data.given_name,
-        family_name=data.family_name,
-        gender=data.gender,
-        email=data.email,
-        biography=data.biography,
-        birth_date=data.birth_date,
-        death_date=data.death_date,
-        image=data.image,
-        extras=data.extras,
-    )
-    person, created, updated = get_update_or_create(DjangoPerson, fields, ["id"])
-
-    updated |= update_subobjects(
-        person, "other_names", [n.dict() for n in data.other_names]
-    )
-    updated |= update_subobjects(person, "links", [n.dict() for n in data.links])
-    updated |= update_subobjects(person, "sources", [n.dict() for n in data.sources])
-    updated |= update_subobjects(person, "offices", [n.dict() for n in data.offices])
+    def post(
+        self, org: DjangoModelInstance, label: typing.Optional[str]
+    ) -> DjangoModelInstance:
+        return self.posts.get((org.id, label))
 
-    identifiers = []
-    for scheme, value in data.ids.dict().items():
-        if value:
-            identifiers.append({"scheme": scheme, "identifier": value})
-    for identifier in data.other_identifiers:
-        identifiers.append(
-            {"scheme": identifier.scheme, "identifier": identifier.identifier}
-        )
-    updated |= update_subobjects(person, "identifiers", identifiers)
 
+def get_memberships(
+    data: Person, lookup: OrganizationLookup
+) -> tuple[list[DataDict], DataDict]:
+    """
+    returns the party & role memberships for a person along with the computed
+    primary_party, current_role, and current_jurisdiction_id fields
+    """
     memberships = []
     primary_party = ""
     current_jurisdiction_id = None
     current_role = None
     for party in data.party:
         party_name = party.name
-        try:
-            org = cached_lookup(Organization, classification="party", name=party.name)
-        except Organization.DoesNotExist:
+        org = lookup.party(party.name)
+        if org is None:
             click.secho(f"no such party {party.name}", fg="red")
             raise CancelTransaction()
         memberships.append(
             {
-                "organization": org,
+                "organization_id": org.id,
+                "post_id": None,
+                "role": "",
                 "start_date": party.start_date,
                 "end_date": party.end_date,
             }
@@ -175,28 +188,21 @@ def load_person(data: Person) -> tuple[bool, bool]:
             use_district = True
         else:
             raise ValueError(f"unsupported role type: {role.type}")
-        try:
-            org = cached_lookup(
-                Organization, classification=org_type, jurisdiction_id=role.jurisdiction
-            )
-            if use_district:
-                post = org.posts.get(label=role.district)
-            else:
-                post = None
-        except Organization.DoesNotExist:
+
+        org = lookup.org(org_type, role.jurisdiction)
+        if org is None:
             click.secho(
-                f"{person} no such organization {role.jurisdiction} {org_type}",
+                f"{data.name} no such organization {role.jurisdiction} {org_type}",
                 fg="red",
             )
             raise CancelTransaction()
-        except Post.DoesNotExist:
+        post = lookup.post(org, role.district) if use_district else None
+        if use_district and post is None:
             # if this is a legacy district, be quiet
             lds = legacy_districts(jurisdiction_id=role.jurisdiction)
             if role.district not in lds[role.type]:
                 click.secho(f"no such post {role}", fg="red")
                 raise CancelTransaction()
-            else:
-                post = None
 
         if role.is_active():
             current_jurisdiction_id = role.jurisdiction
@@ -224,38 +230,232 @@ def load_person(data: Person) -> tuple[bool, bool]:
         elif not current_jurisdiction_id:
             current_jurisdiction_id = role.jurisdiction
 
-        membership = {
-            "organization": org,
-            "post": post,
-            "start_date": role.start_date,
-            "end_date": role.end_date,
-        }
-        if not use_district:
-            membership["role"] = role_name
-        memberships.append(membership)
-
-    # note that we don't manage committee memberships here
-    updated |= update_subobjects(
-        person,
-        "memberships",
-        memberships,
-        read_manager=person.memberships.exclude(
-            organization__classification__in=["committee", "subcommittee"]
-        ),
+        memberships.append(
+            {
+                "organization_id": org.id,
+                "post_id": post.id if post else None,
+                "role": "" if use_district else role_name,
+                "start_date": role.start_date,
+                "end_date": role.end_date,
+            }
+        )
+
+    computed = {
+        "primary_party": primary_party,
+        "current_role": current_role,
+        "current_jurisdiction_id": current_jurisdiction_id,
+    }
+    return memberships, computed
+
+
+def get_subobjects(data: Person, memberships: list[DataDict]) -> dict[str, list]:
+    identifiers = []
+    for scheme, value in data.ids.dict().items():
+        if value:
+            identifiers.append({"scheme": scheme, "identifier": value})
+    for identifier in data.other_identifiers:
+        identifiers.append(
+            {"scheme": identifier.scheme, "identifier": identifier.identifier}
+        )
+
+    subobjects = {
+        "other_names": [n.dict() for n in data.other_names],
+        "links": [n.dict() for n in data.links],
+        "sources": [n.dict() for n in data.sources],
+        "offices": [n.dict() for n in data.offices],
+        "identifiers": identifiers,
+        "memberships": memberships,
+    }
+    return {
+        name: [
+            {field: _db_value(obj.get(field, "")) for field in SUBOBJECT_FIELDS[name]}
+            for obj in objects
+        ]
+        for name, objects in subobjects.items()
+    }
+
+
+def load_people(people: list[Person]) -> list[tuple[bool, bool]]:
+    """
+    Sync a batch of people to the database, returning (created, updated) for each.
+
+    Existing people, their subobjects, and all organizations & posts they
+    reference are fetched up front, differences are computed in memory and
+    written with bulk queries.  Raises CancelTransaction if a party,
+    organization or (non-legacy) post doesn't exist.
+    """
+    # import has to be here so that Django is set up
+    from openstates.data.models import (
+        Membership,
+        PersonIdentifier,
+        PersonLink,
+        PersonName,
+        PersonOffice,
+        PersonSource,
+    )
+    from openstates.data.models import Person as DjangoPerson
+    from django.utils import timezone  # type: ignore
+
+    models: dict[str, DjangoModel] = {
+        "other_names": PersonName,
+        "links": PersonLink,
+        "sources": PersonSource,
+        "offices": PersonOffice,
+        "identifiers": PersonIdentifier,
+        "memberships": Membership,
+    }
+
+    # everything that can fail is computed before any writes
+    lookup = OrganizationLookup(people)
+    desired = []
+    for data in people:
+        memberships, computed = get_memberships(data, lookup)
+        fields = {field: _db_value(getattr(data, field)) for field in PERSON_FIELDS}
+        desired.append((data, fields, get_subobjects(data, memberships), computed))
+
+    ids = [data.id for data in people]
+    existing = DjangoPerson.objects.in_bulk(ids)
+    current: dict[str, defaultdict[str, list]] = {}
+    for name, ModelCls in models.items():
+        current[name] = defaultdict(list)
+        qs = ModelCls.objects.filter(person_id__in=ids)
+        if name == "memberships":
+            qs = qs.exclude(organization__classification__in=COMMITTEE_CLASSIFICATIONS)
+        for row in qs:
+            current[name][row.person_id].append(row)
+
+    now = timezone.now()
+    results = []
+    to_create = []
+    to_update = []
+    delete_ids: defaultdict[str, list] = defaultdict(list)
+    create_rows: defaultdict[str, list] = defaultdict(list)
+    for data, fields, subobjects, computed in desired:
+        created = updated = False
+        person = existing.get(data.id)
+        if person is None:
+            person = DjangoPerson(id=data.id, **fields, **computed)
+            to_create.append(person)
+            created = True
+        else:
+            for field, value in fields.items():
+                if getattr(person, field) != value:
+                    setattr(person, field, value)
+                    updated = True
+
+        for name, objects in subobjects.items():
+            rows, new = diff_subobjects(
+                current[name][data.id], objects, SUBOBJECT_FIELDS[name]
+            )
+            if rows or new:
+                updated = True
+                delete_ids[name].extend(row.pk for row in rows)
+                create_rows[name].extend(
+                    models[name](person_id=data.id, **obj) for obj in new
+                )
+
+        if not created:
+            # computed fields don't count as an update, but are saved all the same
+            changed = updated
+            for field, value in computed.items():
+                if getattr(person, field) != value:
+                    setattr(person, field, value)
+                    changed = True
+            if changed:
+                # bulk_update doesn't touch auto_now fields
+                person.updated_at = now
+                to_update.append(person)
+
+        results.append((created, updated))
+
+    DjangoPerson.objects.bulk_create(to_create, batch_size=BATCH_SIZE)
+    for name, pks in delete_ids.items():
+        for i in range(0, len(pks), BATCH_SIZE):
+            models[name].objects.filter(pk__in=pks[i : i + BATCH_SIZE]).delete()
+    for name, rows in create_rows.items():
+        models[name].objects.bulk_create(rows, batch_size=BATCH_SIZE)
+    DjangoPerson.objects.bulk_update(
+        to_update,
+        PERSON_FIELDS + COMPUTED_FIELDS + ("updated_at",),
+        batch_size=BATCH_SIZE,
+    )
+
+    return results
+
+
+def load_person(data: Person) -> tuple[bool, bool]:
+    return load_people([data])[0]
+
+
+# tables from openstates.org apps that aren't installed here but still reference
+# people, not updating them causes foreign key constraint issues on merge
+# (table, column, whether rows are repointed or deleted)
+PEOPLE_ADMIN_TABLES = (
+    ("people_admin_unmatchedname", "matched_person_id", "update"),
+    ("people_admin_persondelta", "person_id", "delete"),
+    ("people_admin_personretirement", "person_id", "delete"),
+)
+
+
+def find_merges(missing_ids: typing.Iterable[str]) -> dict[str, str]:
+    """map ids that went missing to the people that list them as an openstates id"""
+    from openstates.data.models import PersonIdentifier
+
+    return dict(
+        PersonIdentifier.objects.filter(
+            scheme="openstates", identifier__in=list(missing_ids)
+        ).values_list("identifier", "person_id")
     )
 
-    # set computed fields (avoid extra save)
-    if (
-        person.primary_party != primary_party
-        or person.current_role != current_role
-        or person.current_jurisdiction_id != current_jurisdiction_id
-    ):
-        person.primary_party = primary_party
-        person.current_role = current_role
-        person.current_jurisdiction_id = current_jurisdiction_id
-        person.save()
-
-    return created, updated
+
+def merge_people(merged: dict[str, str]) -> None:
+    """
+    Repoint everything referencing the old ids in merged at the new ones, then
+    delete the old people.
+
+    The mapping is loaded into a temporary table so each referencing table
+    is updated with a single statement regardless of how many people merged.
+    """
+    from django.db import connection  # type: ignore
+    from openstates.data.models import Person as DjangoPerson
+    from openstates.data.models import BillSponsorship, PersonVote
+
+    if not merged:
+        return
+
+    updates = [
+        (BillSponsorship._meta.db_table, "person_id"),
+        (PersonVote._meta.db_table, "voter_id"),
+    ]
+    deletes: list[tuple[str, str]] = []
+    existing_tables = set(connection.introspection.table_names())
+    for table, column, action in PEOPLE_ADMIN_TABLES:
+        if table in existing_tables:
+            (updates if action == "update" else deletes).append((table, column))
+
+    with connection.cursor() as cursor:
+        cursor.execute("DROP TABLE IF EXISTS person_merge")
+        cursor.execute(
+            "CREATE TEMPORARY TABLE person_merge "
+            "(old_id varchar PRIMARY KEY, new_id varchar NOT NULL)"
+        )
+        cursor.execute(
+            "INSERT INTO person_merge (old_id, new_id) "
+            "SELECT * FROM unnest(%s::varchar[], %s::varchar[])",
+            [list(merged.keys()), list(merged.values())],
+        )
+        for table, column in updates:
+            cursor.execute(
+                f"UPDATE {table} t SET {column} = m.new_id "
+                f"FROM person_merge m WHERE t.{column} = m.old_id"
+            )
+        for table, column in deletes:
+            cursor.execute(
+                f"DELETE FROM {table} t USING person_merge m WHERE t.{column} = m.old_id"
+            )
+        cursor.execute("DROP TABLE person_merge")
+
+    DjangoPerson.objects.filter(id__in=list(merged)).delete()
 
 
 def create_parties() -> None:
@@ -0,0 +1,211 @@
+"""
+Sampling profiler for os-update --profile.
+
+A background thread samples the stack of every (non-daemon) thread at a fixed
+interval, so overhead doesn't depend on how many calls are made and the run
+can stay close to its normal speed.  Samples are kept as collapsed stacks,
+the format flamegraph.pl and speedscope read:
+
+    phase;thread;module:function;module:function <count>
+
+Each phase also counts the SQL queries run on the connections of the thread
+that entered it.  A phase entered on another thread (e.g. a pipelined import)
+only applies to that thread's samples, the rest follow the main thread's.
+"""
+import collections
+import contextlib
+import sys
+import threading
+import time
+import types
+import typing
+
+DEFAULT_INTERVAL = 0.01
+TOP_FUNCTIONS = 20
+
+
+class QueryCounter:
+    """a connection.execute_wrapper counting queries and time spent in them"""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(
+        self,
+        execute: typing.Callable,
+        sql: str,
+        params: typing.Any,
+        many: bool,
+        context: dict[str, typing.Any],
+    ) -> typing.Any:
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - start
+
+
+def _frame_name(frame: typing.Any) -> str:
+    code = frame.f_code
+    return f"{frame.f_globals.get('__name__', code.co_filename)}:{code.co_name}"
+
+
+class SamplingProfiler:
+    def __init__(self, interval: float = DEFAULT_INTERVAL):
+        self.interval = interval
+        # the main thread's phase, also used for threads without their own
+        self.phase = "run"
+        # thread id -> phase, for phases entered on other threads
+        self.thread_phases: dict[int, str] = {}
+        # collapsed stack -> samples
+        self.stacks: collections.Counter = collections.Counter()
+        self.samples_by_phase: collections.Counter = collections.Counter()
+        self._stop = threading.Event()
+        self._thread: typing.Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="openstates-profiler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            self.sample(skip=me)
+
+    def sample(self, skip: typing.Optional[int] = None) -> None:
+        threads = {
+            t.ident: t.name
+            for t in threading.enumerate()
+            if not t.daemon and t.ident != skip
+        }
+        default, thread_phases = self.phase, dict(self.thread_phases)
+        for ident, top in sys._current_frames().items():
+            if ident not in threads:
+                continue
+            phase = thread_phases.get(ident, default)
+            names = []
+            frame: typing.Optional[types.FrameType] = top
+            while frame is not None:
+                names.append(_frame_name(frame))
+                frame = frame.f_back
+            names.append(threads[ident])
+            names.append(phase)
+            self.stacks[";".join(reversed(names))] += 1
+            self.samples_by_phase[phase] += 1
+
+    @contextlib.contextmanager
+    def in_phase(self, phase: str) -> typing.Iterator[None]:
+        ident = threading.get_ident()
+        if ident == threading.main_thread().ident:
+            previous, self.phase = self.phase, phase
+            try:
+                yield
+            finally:
+                self.phase = previous
+            return
+        outer = self.thread_phases.get(ident)
+        self.thread_phases[ident] = phase
+        try:
+            yield
+        finally:
+            if outer is None:
+                del self.thread_phases[ident]
+            else:
+                self.thread_phases[ident] = outer
+
+    def top_functions(self, n: int = TOP_FUNCTIONS) -> list[dict[str, typing.Any]]:
+        """
+        Functions by how many samples they were running in (self), and how
+        many they were anywhere on the stack (total).
+        """
+        own: collections.Counter = collections.Counter()
+        total: collections.Counter = collections.Counter()
+        for stack, count in self.stacks.items():
+            # drop the phase and thread
+            frames = stack.split(";")[2:]
+            if not frames:
+                continue
+            own[frames[-1]] += count
+            for name in set(frames):
+                total[name] += count
+        samples = sum(self.stacks.values()) or 1
+        return [
+            {
+                "function": name,
+                "self": count,
+                "total": total[name],
+                "self_pct": round(100 * count / samples, 1),
+            }
+            for name, count in own.most_common(n)
+        ]
+
+    def write_collapsed(self, filename: str) -> None:
+        with open(filename, "w") as f:
+            for stack, count in sorted(self.stacks.items()):
+                f.write(f"{stack} {count}\n")
+
+
+class RunProfiler:
+    """profile an os-update run phase by phase"""
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL):
+        self.sampler = SamplingProfiler(interval)
+        self.phases: dict[str, dict[str, typing.Any]] = {}
+
+    def start(self) -> None:
+        self.sampler.start()
+
+    def stop(self) -> None:
+        self.sampler.stop()
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> typing.Iterator[None]:
+        counter = QueryCounter()
+        start = time.perf_counter()
+        with contextlib.ExitStack() as stack:
+            stack.enter_context(self.sampler.in_phase(name))
+            for connection in _django_connections():
+                stack.enter_context(connection.execute_wrapper(counter))
+            try:
+                yield
+            finally:
+                self.phases[name] = {
+                    "seconds": round(time.perf_counter() - start, 3),
+                    "queries": counter.count,
+                    "sql_seconds": round(counter.seconds, 3),
+                }
+
+    def results(self, output: str, n: int = TOP_FUNCTIONS) -> dict[str, typing.Any]:
+        """write the collapsed stacks to output, returning what to add to the report"""
+        self.sampler.write_collapsed(output)
+        for name, phase in self.phases.items():
+            phase["samples"] = self.sampler.samples_by_phase[name]
+        return {
+            "output": output,
+            "interval": self.sampler.interval,
+            "phases": self.phases,
+            "top_functions": self.sampler.top_functions(n),
+        }
+
+
+def _django_connections() -> list[typing.Any]:
+    """this thread's database connections, if Django has been set up"""
+    try:
+        from django.conf import settings
+        from django.db import connections
+    except ImportError:
+        return []
+    if not settings.configured:
+        return []
+    return list(connections.all())
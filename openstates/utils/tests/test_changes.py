@@ -0,0 +1,71 @@
+import git
+import pytest  # type: ignore
+from pathlib import Path
+from openstates.utils.people.changes import get_repo_changes
+
+PERSON_A = "11111111-1111-1111-1111-111111111111"
+PERSON_B = "22222222-2222-2222-2222-222222222222"
+PERSON_C = "33333333-3333-3333-3333-333333333333"
+COMMITTEE = "44444444-4444-4444-4444-444444444444"
+
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    monkeypatch.setenv("OS_PEOPLE_DIRECTORY", str(tmp_path))
+    repo = git.Repo.init(tmp_path)
+    with repo.config_writer() as config:
+        config.set_value("user", "name", "test")
+        config.set_value("user", "email", "test@example.com")
+    return repo
+
+
+def _write(repo, path, content):
+    filename = Path(repo.working_tree_dir) / path
+    filename.parent.mkdir(parents=True, exist_ok=True)
+    filename.write_text(content)
+    repo.index.add([path])
+
+
+def _commit(repo):
+    return repo.index.commit("update").hexsha
+
+
+def test_get_repo_changes(repo, tmp_path):
+    _write(repo, f"data/ak/legislature/Amy-{PERSON_A}.yml", "name: Amy\n")
+    _write(repo, f"data/ak/legislature/Bo-{PERSON_B}.yml", "name: Bo\n")
+    _write(repo, f"data/ak/committees/upper-Rules-{COMMITTEE}.yml", "name: Rules\n")
+    _write(repo, f"data/wy/legislature/Cy-{PERSON_C}.yml", "name: Cy\n")
+    first = _commit(repo)
+
+    # no previous commit, or one that doesn't exist means a full sync
+    assert get_repo_changes(repo, None, "ak") is None
+    assert get_repo_changes(repo, "0" * 40, "ak") is None
+
+    _write(repo, f"data/ak/legislature/Amy-{PERSON_A}.yml", "name: Amy Smith\n")
+    (tmp_path / "data/ak/retired").mkdir()
+    repo.index.move(
+        [
+            f"data/ak/legislature/Bo-{PERSON_B}.yml",
+            f"data/ak/retired/Bo-{PERSON_B}.yml",
+        ]
+    )
+    repo.index.remove([f"data/ak/committees/upper-Rules-{COMMITTEE}.yml"])
+    _write(repo, f"data/wy/legislature/Cy-{PERSON_C}.yml", "name: Cy Young\n")
+    _write(repo, "data/ak/municipalities.yml", "[]\n")
+    second = _commit(repo)
+
+    changes = get_repo_changes(repo, first, "ak")
+    assert changes.since == first
+    assert changes.head == second
+    assert changes.people == [
+        tmp_path / f"data/ak/legislature/Amy-{PERSON_A}.yml",
+        tmp_path / f"data/ak/retired/Bo-{PERSON_B}.yml",
+    ]
+    # moved files count as removed, the loader skips ids that are still present
+    assert changes.removed_people == {f"ocd-person/{PERSON_B}"}
+    assert changes.committees == []
+    assert changes.removed_committees == {f"ocd-organization/{COMMITTEE}"}
+
+    changes = get_repo_changes(repo, second, "ak")
+    assert changes.people == changes.committees == []
+    assert not changes.removed_people and not changes.removed_committees
@@ -64,6 +64,31 @@ def test_person_matcher_match(person_matcher):
     assert person_matcher.match("lower", "Gordy") is None
 
 
+def test_person_matcher_normalized(person_matcher):
+    assert (
+        person_matcher.match("lower", "NGUYEN, JR.")
+        == "ocd-person/00000000-0000-0000-0000-222222222222"
+    )
+    # no fuzzy matching unless asked for
+    person_matcher.add_name(
+        "lower", "Richardson", "ocd-person/00000000-0000-0000-0000-444444444444"
+    )
+    assert person_matcher.match("lower", "Richardsen") is None
+
+
+def test_person_matcher_fuzzy():
+    pm = PersonMatcher("wa", TEST_DATA_PATH / "no-such-dir", max_distance=1)
+    pm.add_name(
+        "lower", "Richardson", "ocd-person/00000000-0000-0000-0000-444444444444"
+    )
+    # a typo within the edit distance still matches, in any chamber view
+    assert (
+        pm.match("legislature", "Richardsen")
+        == "ocd-person/00000000-0000-0000-0000-444444444444"
+    )
+    assert pm.match("upper", "Richardsen") is None
+
+
 def test_merge_committees_name():
     comdir = CommitteeDir(abbr="wa", directory=TEST_DATA_PATH / "committees")
     id_one = "ocd-organization/00000000-0000-0000-0000-000000000001"
@@ -0,0 +1,174 @@
+import io
+import json
+import pytest  # type: ignore
+from unittest import mock
+from PIL import Image  # type: ignore
+from openstates.models.people import Person, Party
+from openstates.utils.people import images
+from openstates.utils.people.images import (
+    ImageSync,
+    LocalStore,
+    S3Store,
+    MANIFEST_KEY,
+)
+
+PERSON_ID = "ocd-person/abcdefab-0000-1111-2222-1234567890ab"
+OTHER_ID = "ocd-person/abcdefab-0000-1111-2222-0987654321ab"
+URL = "https://example.com/jane.png"
+
+
+def png_bytes(color):
+    output = io.BytesIO()
+    Image.new("RGB", (400, 300), color).save(output, "PNG")
+    return output.getvalue()
+
+
+class FakeResponse:
+    def __init__(self, status_code, content=b"", etag=""):
+        self.status_code = status_code
+        self.content = content
+        self.headers = {"content-type": "image/png", "etag": etag}
+
+
+class FakeSession:
+    """serves one image, honoring If-None-Match"""
+
+    def __init__(self, content, etag):
+        self.content = content
+        self.etag = etag
+        self.requests = []
+
+    def get(self, url, headers, timeout):
+        self.requests.append(headers)
+        if headers.get("If-None-Match") == self.etag:
+            return FakeResponse(304)
+        return FakeResponse(200, self.content, self.etag)
+
+
+@pytest.fixture
+def person():
+    return Person(
+        id=PERSON_ID,
+        name="Jane Smith",
+        party=[Party(name="Democratic")],
+        roles=[],
+        image=URL,
+    )
+
+
+def sync(store, session, people, skip_existing, abbr="nc"):
+    syncer = ImageSync(store, skip_existing, session=session, resize_workers=0)
+    try:
+        return syncer.sync(abbr, people)
+    finally:
+        syncer.close()
+
+
+def test_image_sync_local(tmp_path, person):
+    store = LocalStore(tmp_path)
+    session = FakeSession(png_bytes("red"), '"v1"')
+
+    counts = sync(store, session, [person], skip_existing=False)
+    assert counts["uploaded"] == 1
+    original = store.read(
+        "images/original/ocd-person/abcdefab-0000-1111-2222-1234567890ab"
+    )
+    assert original == session.content
+    small = Image.open(
+        io.BytesIO(
+            store.read("images/small/ocd-person/abcdefab-0000-1111-2222-1234567890ab")
+        )
+    )
+    assert max(small.size) == 200
+    manifest = json.loads(store.read(MANIFEST_KEY.format(abbr="nc")))
+    assert manifest[URL]["etag"] == '"v1"'
+    assert len(manifest[URL]["keys"]) == 2
+
+    # unchanged etag: a conditional request and no uploads
+    counts = sync(store, session, [person], skip_existing=False)
+    assert counts == {"skipped": 0, "unchanged": 1, "uploaded": 0, "failed": 0}
+    assert session.requests[-1] == {"If-None-Match": '"v1"'}
+
+    # with skip_existing the manifest alone is enough
+    counts = sync(store, session, [person], skip_existing=True)
+    assert counts["skipped"] == 1
+    assert len(session.requests) == 2
+
+    # changed image is uploaded again
+    session.content, session.etag = png_bytes("blue"), '"v2"'
+    counts = sync(store, session, [person], skip_existing=False)
+    assert counts["uploaded"] == 1
+    assert (
+        store.read("images/original/ocd-person/abcdefab-0000-1111-2222-1234567890ab")
+        == session.content
+    )
+
+
+def test_image_sync_existing_without_manifest(tmp_path, person):
+    store = LocalStore(tmp_path)
+    store.write(
+        "images/original/ocd-person/abcdefab-0000-1111-2222-1234567890ab",
+        b"...",
+        "image/png",
+        {"sha1": "abc"},
+    )
+    session = FakeSession(png_bytes("red"), '"v1"')
+    counts = sync(store, session, [person], skip_existing=True)
+    assert counts["skipped"] == 1
+    assert session.requests == []
+
+
+def test_image_sync_shared_url(tmp_path, person, monkeypatch):
+    store = LocalStore(tmp_path)
+    session = FakeSession(png_bytes("red"), '"v1"')
+    assert sync(store, session, [person], skip_existing=False)["uploaded"] == 1
+
+    # someone else with the same image isn't sent the first person's etag
+    other = person.copy(update={"id": OTHER_ID})
+    counts = sync(store, session, [person, other], skip_existing=True)
+    assert counts == {"skipped": 1, "unchanged": 0, "uploaded": 1, "failed": 0}
+    assert session.requests[-1] == {}
+    assert store.read(f"images/small/{OTHER_ID}")
+
+    # and now both are up to date
+    counts = sync(store, session, [person, other], skip_existing=False)
+    assert counts["unchanged"] == 2
+    assert session.requests[-2:] == [{"If-None-Match": '"v1"'}] * 2
+
+    # a new size is added for everyone
+    monkeypatch.setattr(images, "SIZES", {"small": 200, "medium": 300})
+    counts = sync(store, session, [person, other], skip_existing=False)
+    assert counts["uploaded"] == 2
+    assert store.read(f"images/medium/{PERSON_ID}")
+
+
+def test_image_sync_manifest_per_state(tmp_path, person, monkeypatch):
+    store = LocalStore(tmp_path)
+    session = FakeSession(png_bytes("red"), '"v1"')
+    other = person.copy(update={"id": OTHER_ID, "image": "https://example.com/o"})
+    sync(store, session, [person], skip_existing=False, abbr="nc")
+    sync(store, session, [other], skip_existing=False, abbr="sc")
+    assert list(json.loads(store.read(MANIFEST_KEY.format(abbr="nc")))) == [URL]
+    assert list(json.loads(store.read(MANIFEST_KEY.format(abbr="sc")))) == [
+        "https://example.com/o"
+    ]
+
+    # nothing changed, the manifest isn't written again
+    write = mock.Mock(wraps=store.write)
+    monkeypatch.setattr(store, "write", write)
+    assert sync(store, session, [person], skip_existing=True)["skipped"] == 1
+    assert not write.called
+
+
+def test_s3_store_manifest_is_private():
+    with mock.patch.object(images.boto3, "client") as client:
+        store = S3Store("bucket")
+        store.write("images/original/x", b"...", "image/png", {"sha1": "abc"})
+        store.write(
+            MANIFEST_KEY.format(abbr="nc"), b"{}", "application/json", {}, public=False
+        )
+    image_args, manifest_args = [
+        call.kwargs["ExtraArgs"] for call in client().upload_fileobj.call_args_list
+    ]
+    assert image_args["ACL"] == "public-read"
+    assert "ACL" not in manifest_args
@@ -0,0 +1,71 @@
+import pytest  # type: ignore
+from openstates.utils.instrument import Instrumentation
+
+
+class FakeWriteApi:
+    def __init__(self):
+        self.fail = False
+        self.writes = []
+
+    def write(self, bucket, record, write_precision):
+        if self.fail:
+            raise ConnectionError("unreachable")
+        self.writes.append(list(record))
+
+
+@pytest.fixture
+def stats(tmp_path, monkeypatch):
+    monkeypatch.setenv("STATS_ENABLED", "True")
+    monkeypatch.setenv("STATS_ENDPOINT", "http://stats.invalid")
+    monkeypatch.setenv("STATS_BATCH_SIZE", "2")
+    monkeypatch.setenv("STATS_SPOOL_FILE", str(tmp_path / "stats.lp"))
+    stats = Instrumentation()
+    stats.write_api = FakeWriteApi()
+    return stats
+
+
+def _metric(n):
+    return {"metric": "objects", "fields": {"scraped": n}, "tags": {"state": "ak"}}
+
+
+def test_disabled(monkeypatch):
+    monkeypatch.setenv("STATS_ENABLED", "True")
+    monkeypatch.delenv("STATS_ENDPOINT", raising=False)
+    stats = Instrumentation()
+    assert not stats.enabled
+    stats.write_stats([_metric(1)])
+    stats.close()
+
+
+def test_write_stats_batches(stats):
+    stats.write_stats([_metric(1), _metric(2), _metric(3)])
+    stats.close()
+    lines = [line for batch in stats.write_api.writes for line in batch]
+    assert len(lines) == 3
+    assert lines[0].startswith("openstates_objects,state=ak scraped=1i ")
+    assert all(len(batch) <= 2 for batch in stats.write_api.writes)
+
+
+def test_spool_and_replay(stats, tmp_path):
+    stats.write_api.fail = True
+    stats.write_stats([_metric(1)])
+    stats.close()
+    assert stats.write_api.writes == []
+    assert (tmp_path / "stats.lp").read_text().count("\n") == 1
+
+    # writing after close starts a new flusher, which replays the spool
+    stats.write_api.fail = False
+    stats.write_stats([_metric(2)])
+    stats.close()
+    lines = [line for batch in stats.write_api.writes for line in batch]
+    assert [line.split()[1] for line in lines] == ["scraped=2i", "scraped=1i"]
+    assert not (tmp_path / "stats.lp").exists()
+
+
+def test_queue_full_drops(stats, monkeypatch):
+    stats.queue_size = 1
+    stats._queue.maxsize = 1
+    # keep the flusher from draining the queue
+    monkeypatch.setattr(stats, "_ensure_flusher", lambda: None)
+    stats.write_stats([_metric(1), _metric(2), _metric(3)])
+    assert stats.dropped == 2
@@ -1,6 +1,8 @@
 import pytest  # type: ignore
 import datetime
+import yaml
 from pathlib import Path
+from openstates.utils.people import loader
 from openstates.utils.people.lint_people import (
     validate_name,
     validate_roles,
@@ -10,6 +12,7 @@ from openstates.utils.people.lint_people import (
     Validator,
     BadVacancy,
     PersonType,
+    lint_states,
 )  # noqa
 from openstates.models.people import Person, Role, Party, Office
 
@@ -303,3 +306,109 @@ def test_filename_id_test():
             break
     else:
         raise AssertionError("did not check for id in filename")
+
+
+def _write_person(directory, uid, name, roles):
+    directory.mkdir(parents=True, exist_ok=True)
+    with open(directory / f"{name.replace(' ', '-')}-{uid}.yml", "w") as f:
+        yaml.dump(
+            {
+                "id": f"ocd-person/{uid}",
+                "name": name,
+                "party": [{"name": "Independent"}],
+                "roles": roles,
+            },
+            f,
+        )
+
+
+def test_lint_states(tmp_path, monkeypatch):
+    monkeypatch.setenv("OS_PEOPLE_DIRECTORY", str(tmp_path))
+    monkeypatch.setattr(loader, "CACHE_DIR", "")
+    (tmp_path / "settings.yml").write_text("{}")
+    jid = "ocd-jurisdiction/country:us/state:ak/government"
+    ak = tmp_path / "data" / "ak"
+    _write_person(
+        ak / "legislature",
+        "11111111-1111-1111-1111-111111111111",
+        "Amy Smith",
+        [{"type": "upper", "district": "A", "jurisdiction": jid}],
+    )
+    _write_person(
+        ak / "legislature",
+        "22222222-2222-2222-2222-222222222222",
+        "Bo Jones",
+        [{"type": "upper", "district": "A", "jurisdiction": jid}],
+    )
+    _write_person(
+        ak / "legislature",
+        "55555555-5555-5555-5555-555555555555",
+        "Di",
+        [{"type": "lower", "district": "1", "jurisdiction": jid}],
+    )
+    _write_person(
+        ak / "retired",
+        "33333333-3333-3333-3333-333333333333",
+        "Cy Old",
+        [
+            {
+                "type": "lower",
+                "district": "99",
+                "jurisdiction": jid,
+                "end_date": "2000-01-01",
+            }
+        ],
+    )
+    (ak / "legislature" / "Bad-44444444-4444-4444-4444-444444444444.yml").write_text(
+        "id: ocd-person/44444444-4444-4444-4444-444444444444\nroles: []\n"
+    )
+
+    (report,) = lint_states(["ak"], False, False, False, False, workers=1)
+    assert report.abbr == "ak"
+    errors = report.errors
+    assert errors["Amy-Smith-11111111-1111-1111-1111-111111111111.yml"] == [
+        "missing given_name that could be set to 'Amy', run with --fix",
+        "missing family_name that could be set to 'Smith', run with --fix",
+    ]
+    assert errors["Cy-Old-33333333-3333-3333-3333-333333333333.yml"][-1] == (
+        "unknown district name: lower 99"
+    )
+    assert errors["Bad-44444444-4444-4444-4444-444444444444.yml"] == [
+        "  name: field required"
+    ]
+    assert any(
+        e.startswith("extra legislator for upper A") for e in report.state_errors
+    )
+    assert "missing legislator for upper B" in report.state_errors
+    assert "missing legislator for lower 2" in report.state_errors
+
+
+def test_lint_states_output_kept_per_state(tmp_path, monkeypatch, capfd):
+    monkeypatch.setenv("OS_PEOPLE_DIRECTORY", str(tmp_path))
+    monkeypatch.setattr(loader, "CACHE_DIR", "")
+    (tmp_path / "settings.yml").write_text(
+        yaml.safe_dump(
+            {
+                "ak": {
+                    "vacancies": [
+                        {
+                            "chamber": "upper",
+                            "district": "A",
+                            "vacant_until": datetime.date(2100, 1, 1),
+                        }
+                    ]
+                }
+            }
+        )
+    )
+    for abbr in ("ak", "ne"):
+        (tmp_path / "data" / abbr / "legislature").mkdir(parents=True)
+
+    ak, ne = lint_states(["ak", "ne"], False, False, False, False, workers=2)
+    # nothing is printed by the workers, it's all in each state's report
+    assert capfd.readouterr().out == ""
+    assert ak.output == [
+        ("Processing 1 vacancies:", {}),
+        ("\tupper-A (until 2100-01-01)", {"fg": "green"}),
+    ]
+    assert ne.output == []
@@ -0,0 +1,121 @@
+import hashlib
+import shutil
+import pytest  # type: ignore
+from pathlib import Path
+from unittest import mock
+from pydantic import ValidationError
+from openstates.models.committees import Committee
+from openstates.models.people import Person
+from openstates.utils.people import loader
+
+TEST_DATA_PATH = Path(__file__).parent / "testdata"
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(loader, "CACHE_DIR", str(tmp_path / "cache"))
+    return tmp_path / "cache"
+
+
+@pytest.fixture
+def parse_count(monkeypatch):
+    calls = []
+    parse = loader._parse
+
+    def counting_parse(ModelCls, filename):
+        calls.append(filename)
+        return parse(ModelCls, filename)
+
+    monkeypatch.setattr(loader, "_parse", counting_parse)
+    return calls
+
+
+def test_load_yaml_models_cache(tmp_path, cache_dir, parse_count):
+    shutil.copytree(TEST_DATA_PATH / "committees", tmp_path / "committees")
+    filenames = list((tmp_path / "committees").glob("*.yml"))
+
+    first = loader.load_yaml_models(Committee, filenames)
+    assert len(first) == 4
+    assert len(parse_count) == 4
+    assert [f for f, _ in first] == sorted(filenames)
+    assert len(list(cache_dir.iterdir())) == 1
+
+    # nothing changed, nothing is parsed
+    second = loader.load_yaml_models(Committee, filenames)
+    assert len(parse_count) == 4
+    assert [c for _, c in second] == [c for _, c in first]
+
+    # only the changed file is re-parsed
+    with open(filenames[0], "a") as f:
+        f.write("\n")
+    loader.load_yaml_models(Committee, filenames)
+    assert parse_count[4:] == [filenames[0]]
+
+
+def test_load_yaml_models_cache_subset(tmp_path, cache_dir, parse_count):
+    shutil.copytree(TEST_DATA_PATH / "committees", tmp_path / "committees")
+    filenames = sorted((tmp_path / "committees").glob("*.yml"))
+    loader.load_yaml_models(Committee, filenames)
+
+    # loading part of the directory keeps the rest of it cached
+    loader.load_yaml_models(Committee, filenames[:1])
+    filenames[1].touch()
+    loader.load_yaml_models(Committee, filenames[1:2])
+    loader.load_yaml_models(Committee, filenames)
+    assert parse_count[4:] == [filenames[1]]
+
+    # but not once the file is gone
+    filenames[2].unlink()
+    loader.load_yaml_models(Committee, filenames[:1])
+    _, entries = loader.pickle.loads(next(cache_dir.iterdir()).read_bytes())
+    assert sorted(entries) == [str(f) for f in filenames if f != filenames[2]]
+
+
+def test_load_yaml_models_pool(tmp_path, cache_dir, monkeypatch):
+    monkeypatch.setattr(loader, "POOL_THRESHOLD", 1)
+    monkeypatch.setattr(loader, "LOAD_WORKERS", 2)
+    filenames = list((TEST_DATA_PATH / "committees").glob("*.yml"))
+    loaded = loader.load_yaml_models(Committee, filenames)
+    assert sorted(c.name for _, c in loaded) == [
+        "Agriculture",
+        "Education",
+        "Education",
+        "Rules",
+    ]
+
+
+def test_load_yaml_models_no_pool_in_worker(cache_dir, monkeypatch):
+    monkeypatch.setattr(loader, "POOL_THRESHOLD", 1)
+    monkeypatch.setattr(loader, "LOAD_WORKERS", 2)
+    monkeypatch.setattr(loader.multiprocessing, "parent_process", lambda: object())
+    filenames = list((TEST_DATA_PATH / "committees").glob("*.yml"))
+    with mock.patch.object(loader, "ProcessPoolExecutor") as pool:
+        assert len(loader.load_yaml_models(Committee, filenames)) == 4
+    assert not pool.called
+
+
+def test_load_yaml_models_errors(cache_dir):
+    filenames = list((TEST_DATA_PATH / "broken-committees").glob("*.yml"))
+    with pytest.raises(ValidationError):
+        loader.load_yaml_models(Committee, filenames)
+
+    errors: list = []
+    assert loader.load_yaml_models(Committee, filenames, errors) == []
+    assert [f for f, _ in errors] == sorted(filenames)
+
+
+def test_load_yaml_models_cache_code_version(tmp_path, cache_dir, parse_count):
+    filenames = list((TEST_DATA_PATH / "committees").glob("*.yml"))
+    version = loader._code_version(Committee)
+    assert version == loader._code_version(Committee)
+    assert version != loader._code_version(Person)
+
+    loader.load_yaml_models(Committee, filenames)
+    assert len(parse_count) == 4
+
+    # as if the models or loader changed, nothing cached is reused
+    loader._code_version.cache_clear()
+    with mock.patch.object(loader.hashlib, "sha1", hashlib.md5):
+        loader.load_yaml_models(Committee, filenames)
+    loader._code_version.cache_clear()
+    assert len(parse_count) == 8
@@ -12,8 +12,18 @@ from openstates.utils.people.merge import (
     merge_offices,
     find_file,
     collapse_duplicates,
+    MergeIndex,
+    benchmark_merge_index,
+)
+from openstates.utils.people import get_file_index, retire_file
+from openstates.models.people import (
+    OtherName,
+    OtherIdentifier,
+    Office,
+    Party,
+    Person,
+    Role,
 )
-from openstates.models.people import OtherName, OtherIdentifier, Office, Party
 from pydantic import BaseModel
 
 
@@ -483,3 +493,66 @@ def test_find_file_missing():
     # good file, bad directory
     with pytest.raises(FileNotFoundError):
         find_file("a2e4a1b2-f0fd-4c35-9e0c-bb009778792f", state="nc")
+
+
+def test_file_index(tmp_path):
+    ids = ["a2e4a1b2-f0fd-4c35-9e0c-bb00977879%02d" % n for n in range(3)]
+    (tmp_path / "pa" / "legislature").mkdir(parents=True)
+    (tmp_path / "pa" / "retired").mkdir(parents=True)
+    for n, id_ in enumerate(ids[:2]):
+        (tmp_path / "pa" / "legislature" / f"Person-{n}-{id_}.yml").write_text("")
+
+    index = get_file_index(tmp_path, "*/*/*.yml")
+    assert index.find_all(f"ocd-person/{ids[0]}") == [
+        tmp_path / "pa" / "legislature" / f"Person-0-{ids[0]}.yml"
+    ]
+
+    # files added behind the index's back are found by a rescan
+    new_file = tmp_path / "pa" / "legislature" / f"Person-2-{ids[2]}.yml"
+    new_file.write_text("")
+    assert index.find_all(ids[2]) == [new_file]
+
+    # retiring keeps the index current
+    retired = retire_file(new_file)
+    assert index.find_all(ids[2]) == [Path(retired)]
+    assert index.find_all("77777777-ffff-0000-9000-bbbbbbbbbbbb") == []
+
+
+def _legislator(n, name, district):
+    return Person(
+        id=f"ocd-person/00000000-0000-0000-0000-00000000000{n}",
+        name=name,
+        party=[Party(name="Democratic")],
+        roles=[
+            Role(
+                type="lower",
+                district=district,
+                jurisdiction="ocd-jurisdiction/country:us/state:nh/government",
+            )
+        ],
+    )
+
+
+def test_merge_index_candidates():
+    existing = [
+        _legislator(1, "Jane Smith", "Hillsborough 1"),
+        _legislator(2, "John Doe", "Hillsborough 2"),
+        _legislator(3, "Sam Jones", "Hillsborough 1"),
+        _legislator(4, "Jane Smith Jr.", "Merrimack 1"),
+    ]
+    index = MergeIndex(existing)
+    # same seat or same name, in original order
+    assert index.candidates(_legislator(5, "Jane Smith", "Coos 1")) == [
+        existing[0],
+        existing[3],
+    ]
+    assert index.candidates(_legislator(5, "Pat Lee", "Hillsborough 1")) == [
+        existing[0],
+        existing[2],
+    ]
+    assert index.candidates(_legislator(5, "Pat Lee", "Coos 1")) == []
+
+
+def test_merge_index_matches_full_scan():
+    result = benchmark_merge_index("nh", 500, sample=500)
+    assert result["mismatches"] == 0
@@ -0,0 +1,77 @@
+import pytest  # type: ignore
+from openstates.models.people import Person, OtherName
+from openstates.utils.people.names import (
+    BKTree,
+    NameIndex,
+    edit_distance,
+    normalize_name,
+)
+
+
+@pytest.mark.parametrize(
+    "name,normalized",
+    [
+        ("Smith", "smith"),
+        ("Smith, Jr.", "smith"),
+        ("José O'Brien III", "jose obrien"),
+        ("Mary-Kate Ellis M.D.", "mary kate ellis"),
+        # a lone suffix-like token is kept
+        ("V", "v"),
+    ],
+)
+def test_normalize_name(name, normalized):
+    assert normalize_name(name) == normalized
+
+
+def test_bktree_search():
+    tree = BKTree()
+    words = ["smith", "smyth", "jones", "johnson", "nguyen", "cristobal"]
+    for word in words:
+        tree.add(word)
+    assert tree.search("smith", 0) == [(0, "smith")]
+    assert tree.search("smithe", 1) == [(1, "smith")]
+    assert tree.search("smitt", 1) == [(1, "smith")]
+    # same results as checking everything
+    for query in ("jonsen", "nguen", "xyz"):
+        assert tree.search(query, 2) == sorted(
+            (edit_distance(query, w), w) for w in words if edit_distance(query, w) <= 2
+        )
+
+
+def test_name_index_person_keys():
+    index = NameIndex()
+    index.add_person(
+        Person(
+            id="ocd-person/00000000-0000-0000-0000-111111111111",
+            name="Robert Jones Jr.",
+            roles=[],
+            other_names=[OtherName(name="Bobby Jones")],
+        )
+    )
+    index.add_person(
+        Person(
+            id="ocd-person/00000000-0000-0000-0000-222222222222",
+            name="Ann Smith",
+            family_name="Smith",
+            roles=[],
+        )
+    )
+    for name in ("Robert Jones", "BOBBY JONES"):
+        assert index.lookup(name) == {"ocd-person/00000000-0000-0000-0000-111111111111"}
+    assert index.lookup("smith") == {"ocd-person/00000000-0000-0000-0000-222222222222"}
+    # without a family_name, no part of the name is indexed on its own
+    assert index.lookup("Jones") == set()
+    assert index.lookup("Robert") == set()
+
+
+def test_name_index_fuzzy():
+    exact = NameIndex()
+    fuzzy = NameIndex(max_distance=1)
+    for index in (exact, fuzzy):
+        index.add("Richardson", "a")
+        index.add("Richards", "b")
+        index.add("Green", "c")
+    assert exact.lookup("Richardsen") == set()
+    assert fuzzy.lookup("Richardsen") == {"a"}
+    # short names are never fuzzy matched
+    assert fuzzy.lookup("Gren") == set()
@@ -0,0 +1,82 @@
+import threading
+import time
+from openstates.utils.profiler import QueryCounter, RunProfiler, SamplingProfiler
+
+
+def _busy_wait():
+    end = time.perf_counter() + 0.2
+    while time.perf_counter() < end:
+        pass
+
+
+def test_sample_collapsed_stacks(tmp_path):
+    profiler = SamplingProfiler()
+    with profiler.in_phase("scrape"):
+        profiler.sample()
+    assert profiler.phase == "run"
+
+    (stack,) = profiler.stacks
+    phase, thread, *frames = stack.split(";")
+    assert phase == "scrape"
+    assert thread == "MainThread"
+    # sampled from this thread, so sample() itself is on top
+    assert frames[-2:] == [
+        f"{__name__}:test_sample_collapsed_stacks",
+        "openstates.utils.profiler:sample",
+    ]
+
+    output = tmp_path / "profile.folded"
+    profiler.write_collapsed(str(output))
+    assert output.read_text() == f"{stack} 1\n"
+
+
+def test_sample_thread_phases():
+    profiler = SamplingProfiler()
+    entered, done = threading.Event(), threading.Event()
+
+    def import_thread():
+        with profiler.in_phase("import"):
+            entered.set()
+            done.wait()
+
+    thread = threading.Thread(target=import_thread, name="importer")
+    thread.start()
+    entered.wait()
+    try:
+        with profiler.in_phase("scrape"):
+            profiler.sample()
+    finally:
+        done.set()
+        thread.join()
+
+    phases = {stack.split(";")[1]: stack.split(";")[0] for stack in profiler.stacks}
+    assert phases == {"MainThread": "scrape", "importer": "import"}
+    assert profiler.thread_phases == {}
+
+
+def test_run_profiler(tmp_path):
+    profiler = RunProfiler(interval=0.001)
+    profiler.start()
+    with profiler.phase("import"):
+        _busy_wait()
+    profiler.stop()
+
+    profile = profiler.results(str(tmp_path / "profile.folded"))
+    phase = profile["phases"]["import"]
+    assert phase["samples"] > 0
+    # no Django connections were set up
+    assert phase["queries"] == 0
+    assert f"{__name__}:_busy_wait" in [
+        func["function"] for func in profile["top_functions"]
+    ]
+
+
+def test_query_counter():
+    counter = QueryCounter()
+
+    def execute(sql, params, many, context):
+        return sql
+
+    assert counter(execute, "SELECT 1", (), False, {}) == "SELECT 1"
+    assert counter.count == 1
+    assert counter.seconds >= 0
@@ -0,0 +1,74 @@
+import pytest  # type: ignore
+from openstates.utils.timing import Histogram, Timings
+
+
+def test_histogram_percentiles():
+    histogram = Histogram()
+    for ms in range(1, 101):
+        histogram.record(ms / 1000)
+    assert histogram.count == 100
+    assert histogram.max == 0.1
+    # buckets are within 1/8th of the value they hold
+    assert histogram.percentile(50) == pytest.approx(0.050, rel=1 / 8)
+    assert histogram.percentile(90) == pytest.approx(0.090, rel=1 / 8)
+    assert histogram.percentile(99) == pytest.approx(0.099, rel=1 / 8)
+    assert histogram.percentile(100) <= histogram.max
+    # a bucket per eighth of each power of two, not per value
+    assert len(histogram.buckets) < 50
+
+
+def test_timer_and_timed():
+    timings = Timings()
+
+    with timings.timer("stage"):
+        pass
+
+    @timings.timed("func")
+    def func(x):
+        if x:
+            raise ValueError(x)
+        return "ok"
+
+    assert func(0) == "ok"
+    with pytest.raises(ValueError):
+        func(1)
+
+    assert timings.histograms["stage"].count == 1
+    # failed calls are timed too
+    assert timings.histograms["func"].count == 2
+
+
+def test_export():
+    timings = Timings()
+    timings.record("import.bill.prepare", 0.002)
+    timings.count("resolve_person", hit=True)
+    timings.count("resolve_person", hit=True)
+    timings.count("resolve_person", hit=False)
+
+    timing, cache = timings.export()
+    assert timing["metric"] == "timing"
+    assert timing["tags"] == {"stage": "import.bill.prepare"}
+    assert timing["fields"]["count"] == 1
+    assert timing["fields"]["p50_ms"] == pytest.approx(2, rel=1 / 8)
+    assert cache == {
+        "metric": "cache",
+        "fields": {"hits": 2, "misses": 1, "hit_ratio": 2 / 3},
+        "tags": {"cache": "resolve_person"},
+    }
+    # exporting starts over
+    assert timings.export() == []
+
+
+def test_export_prefix():
+    timings = Timings()
+    timings.record("scrape.fetch", 0.1)
+    timings.record("import.bill.write", 0.1)
+    timings.count("resolve_person", hit=True)
+
+    (scrape,) = timings.export("scrape.")
+    assert scrape["tags"] == {"stage": "scrape.fetch"}
+    # the rest is left for the next export
+    assert [m["tags"] for m in timings.export()] == [
+        {"stage": "import.bill.write"},
+        {"cache": "resolve_person"},
+    ]
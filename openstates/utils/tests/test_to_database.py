@@ -1,7 +1,15 @@
 import pytest  # type: ignore
-from openstates.data.models import Organization, Jurisdiction, Division
+from openstates.data.models import Organization, Jurisdiction, Division, Bill
 from openstates.data.models import Person as DjangoPerson
-from openstates.utils.people.to_database import load_person, cached_lookup
+from openstates.utils.people.to_database import (
+    load_person,
+    load_people,
+    cached_lookup,
+    diff_subobjects,
+    find_merges,
+    merge_people,
+    CancelTransaction,
+)
 from openstates.models.people import (
     Person,
     Party,
@@ -12,7 +20,7 @@ from openstates.models.people import (
     Office,
 )
 from openstates.models.committees import Committee, Membership
-from openstates.cli.committees import committee_to_db, _parent_lookup
+from openstates.cli.committees import committee_to_db, load_committees
 
 
 def setup():
@@ -43,7 +51,6 @@ def setup():
     # clear cache here because we can't have lru_cache keep the old party ids, etc. around
     # between tests as setup() is called once per test
     cached_lookup.cache_clear()
-    _parent_lookup.cache_clear()
 
 
 @pytest.fixture
@@ -212,6 +219,73 @@ def test_person_offices(person):
     assert p.offices.count() == 2
 
 
+def test_diff_subobjects():
+    class Row:
+        def __init__(self, url, note=""):
+            self.url = url
+            self.note = note
+
+    a, a2, b = Row("https://a"), Row("https://a"), Row("https://b")
+    fields = ("url", "note")
+    assert diff_subobjects([a, b], [{"url": "https://b", "note": ""}], fields) == (
+        [a],
+        [],
+    )
+    # duplicates are compared as a multiset
+    to_delete, to_create = diff_subobjects(
+        [a, a2], [{"url": "https://a", "note": ""}] * 3, fields
+    )
+    assert to_delete == []
+    assert to_create == [{"url": "https://a", "note": ""}]
+
+
+@pytest.mark.django_db
+def test_load_people_batch(person, django_assert_max_num_queries):
+    people = [
+        person.copy(
+            update={
+                "id": f"ocd-person/abcdefab-0000-1111-2222-12345678900{n}",
+                "roles": [
+                    Role(
+                        type="lower",
+                        district=n,
+                        jurisdiction="ocd-jurisdiction/country:us/state:nc/government",
+                    )
+                ],
+                "links": [Link(url=f"https://example.com/{n}")],
+            },
+            deep=True,
+        )
+        for n in range(1, 4)
+    ]
+    # query count doesn't depend on the number of people
+    with django_assert_max_num_queries(20):
+        results = load_people(people)
+    assert results == [(True, True)] * 3
+    assert DjangoPerson.objects.count() == 3
+    assert (
+        DjangoPerson.objects.get(pk=people[1].id).memberships.get(post__isnull=False)
+    ).post.label == "2"
+
+    people[2].links.append(Link(url="https://example.com/new"))
+    assert load_people(people) == [(False, False), (False, False), (False, True)]
+    assert DjangoPerson.objects.get(pk=people[2].id).links.count() == 2
+
+
+@pytest.mark.django_db
+def test_load_people_missing_party(person):
+    other = person.copy(
+        update={
+            "id": "ocd-person/abcdefab-0000-1111-2222-123456789000",
+            "party": [Party(name="Green")],
+        }
+    )
+    with pytest.raises(CancelTransaction):
+        load_people([person, other])
+    # nothing is written when any person fails
+    assert DjangoPerson.objects.count() == 0
+
+
 @pytest.mark.django_db
 def test_person_party(person):
     created, updated = load_person(person)
@@ -371,6 +445,43 @@ def test_committee_to_db_memberships():
     assert w_mem.person == wendy
 
 
+@pytest.mark.django_db
+def test_load_committees_membership_delta(django_assert_max_num_queries):
+    parent = Committee(
+        id="ocd-organization/00000000-1111-1111-1111-222222222222",
+        name="Finance",
+        chamber="lower",
+        jurisdiction="ocd-jurisdiction/country:us/state:nc/government",
+        members=[
+            Membership(name="Steve", role="chair"),
+            Membership(name="Wendy", role="member"),
+        ],
+    )
+    sub = Committee(
+        id="ocd-organization/00000000-1111-1111-1111-333333333333",
+        name="Taxes",
+        chamber="lower",
+        classification="subcommittee",
+        parent=parent.id,
+        jurisdiction="ocd-jurisdiction/country:us/state:nc/government",
+        members=[Membership(name="Steve", role="chair")],
+    )
+    # subcommittee first, parent must still be created before it
+    assert load_committees([sub, parent]) == [(True, False, False)] * 2
+    steve_id = (
+        Organization.objects.get(pk=parent.id).memberships.get(person_name="Steve").id
+    )
+
+    parent.members[1] = Membership(name="Wanda", role="member")
+    with django_assert_max_num_queries(8):
+        results = load_committees([sub, parent])
+    assert results == [(False, False, False), (False, True, False)]
+    org = Organization.objects.get(pk=parent.id)
+    assert {m.person_name for m in org.memberships.all()} == {"Steve", "Wanda"}
+    # unchanged memberships keep their ids
+    assert org.memberships.get(person_name="Steve").id == steve_id
+
+
 @pytest.mark.django_db
 def test_no_person_updates_with_committee(person):
     created, updated = load_person(person)
@@ -399,3 +510,34 @@ def test_no_person_updates_with_committee(person):
 
     created, updated = load_person(person)
     assert not created and not updated
+
+
+@pytest.mark.django_db
+def test_merge_people(person):
+    old_id = "ocd-person/00000000-0000-0000-0000-000000000001"
+    load_person(
+        Person(id=old_id, name="J. Smith", party=[Party(name="Democratic")], roles=[])
+    )
+    person.other_identifiers = [OtherIdentifier(scheme="openstates", identifier=old_id)]
+    load_person(person)
+
+    house = Organization.objects.get(classification="lower")
+    session = house.jurisdiction.legislative_sessions.create(
+        identifier="2021", name="2021"
+    )
+    bill = Bill.objects.create(
+        legislative_session=session,
+        identifier="HB 1",
+        title="Test",
+        from_organization=house,
+    )
+    bill.sponsorships.create(
+        name="Smith", person_id=old_id, primary=True, classification="primary"
+    )
+
+    merged = find_merges([old_id, "ocd-person/00000000-0000-0000-0000-000000000002"])
+    assert merged == {old_id: person.id}
+    merge_people(merged)
+
+    assert not DjangoPerson.objects.filter(pk=old_id).exists()
+    assert bill.sponsorships.get().person_id == person.id
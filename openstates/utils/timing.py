@@ -0,0 +1,211 @@
+"""
+Low overhead timings for the hot paths of scraping and importing.
+
+Durations are recorded into fixed-size log-linear histograms, so recording is
+a perf_counter() call and a dict increment no matter how many times a stage
+runs, and percentiles are computed only when the timings are exported:
+
+    from openstates.utils.timing import timings
+
+    with timings.timer("scrape.fetch"):
+        ...
+
+    @timings.timed("import.prepare")
+    def prepare(...):
+        ...
+
+    timings.count("resolve_person", hit=True)
+
+Instrumentation.write_timings() sends everything recorded so far as stats,
+or only the stages under a prefix, so a scrape's timings can be sent while an
+import running alongside it is still recording its own.
+"""
+import functools
+import threading
+import time
+import typing
+
+# each power of two is split into 2**SUB_BUCKET_BITS buckets, which keeps
+# percentiles within 1/8th of the real value
+SUB_BUCKET_BITS = 3
+_EXACT_LIMIT = 1 << (SUB_BUCKET_BITS + 1)
+PERCENTILES = (50, 90, 99)
+
+_F = typing.TypeVar("_F", bound=typing.Callable[..., typing.Any])
+
+
+class Histogram:
+    """histogram of durations, bucketed by microsecond"""
+
+    __slots__ = ("buckets", "count", "total", "max")
+
+    def __init__(self) -> None:
+        # lower bound of bucket (in microseconds) -> count
+        self.buckets: dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        micros = int(seconds * 1_000_000)
+        if micros >= _EXACT_LIMIT:
+            shift = micros.bit_length() - SUB_BUCKET_BITS - 1
+            micros = (micros >> shift) << shift
+        self.buckets[micros] = self.buckets.get(micros, 0) + 1
+
+    @staticmethod
+    def _bucket_value(lower: int) -> float:
+        """midpoint of the bucket starting at lower, in seconds"""
+        if lower < _EXACT_LIMIT:
+            return lower / 1_000_000
+        width = 1 << (lower.bit_length() - SUB_BUCKET_BITS - 1)
+        return (lower + width / 2) / 1_000_000
+
+    def percentile(self, pct: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = pct / 100 * self.count
+        seen = 0
+        for lower in sorted(self.buckets):
+            seen += self.buckets[lower]
+            if seen >= rank:
+                return min(self._bucket_value(lower), self.max)
+        return self.max
+
+
+class _Timer:
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram: Histogram):
+        self.histogram = histogram
+
+    def __enter__(self) -> "_Timer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: typing.Any) -> None:
+        self.histogram.record(time.perf_counter() - self.start)
+
+
+class Timings:
+    def __init__(self) -> None:
+        self.histograms: dict[str, Histogram] = {}
+        # name -> [hits, misses]
+        self.counters: dict[str, list[int]] = {}
+        # only taken to add a name or export, never to record
+        self._lock = threading.Lock()
+
+    def histogram(self, name: str) -> Histogram:
+        try:
+            return self.histograms[name]
+        except KeyError:
+            with self._lock:
+                return self.histograms.setdefault(name, Histogram())
+
+    def record(self, name: str, seconds: float) -> None:
+        self.histogram(name).record(seconds)
+
+    def timer(self, name: str) -> _Timer:
+        """context manager recording how long its body takes"""
+        return _Timer(self.histogram(name))
+
+    def timed(self, name: str) -> typing.Callable[[_F], _F]:
+        """decorator recording how long each call takes"""
+
+        def decorator(func: _F) -> _F:
+            @functools.wraps(func)
+            def wrapper(*args: typing.Any, **kwargs: typing.Any) -> typing.Any:
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.histogram(name).record(time.perf_counter() - start)
+
+            return typing.cast(_F, wrapper)
+
+        return decorator
+
+    def count(self, name: str, hit: bool) -> None:
+        """count a cache lookup as a hit or a miss"""
+        try:
+            counter = self.counters[name]
+        except KeyError:
+            with self._lock:
+                counter = self.counters.setdefault(name, [0, 0])
+        counter[0 if hit else 1] += 1
+
+    def reset(self) -> None:
+        self.histograms = {}
+        self.counters = {}
+
+    def export(self, prefix: str = "") -> list[dict[str, typing.Any]]:
+        """
+        Everything recorded since the last export whose name starts with
+        prefix, as metrics for Instrumentation.write_stats.  Durations are in
+        milliseconds.
+        """
+        with self._lock:
+            histograms, self.histograms = _split(self.histograms, prefix)
+            counters, self.counters = _split(self.counters, prefix)
+        metrics = []
+        for name, histogram in sorted(histograms.items()):
+            fields: dict[str, typing.Any] = {
+                "count": histogram.count,
+                "total_ms": histogram.total * 1000,
+                "max_ms": histogram.max * 1000,
+            }
+            for pct in PERCENTILES:
+                fields[f"p{pct}_ms"] = histogram.percentile(pct) * 1000
+            metrics.append(
+                {"metric": "timing", "fields": fields, "tags": {"stage": name}}
+            )
+        for name, (hits, misses) in sorted(counters.items()):
+            metrics.append(
+                {
+                    "metric": "cache",
+                    "fields": {
+                        "hits": hits,
+                        "misses": misses,
+                        "hit_ratio": hits / (hits + misses) if hits + misses else 0.0,
+                    },
+                    "tags": {"cache": name},
+                }
+            )
+        return metrics
+
+    def summary(self) -> str:
+        """a human readable table of what's been recorded"""
+        lines = []
+        for name, histogram in sorted(self.histograms.items()):
+            lines.append(
+                f"{name:<30} n={histogram.count:<8} total={histogram.total:9.3f}s "
+                + " ".join(
+                    f"p{pct}={histogram.percentile(pct) * 1000:.2f}ms"
+                    for pct in PERCENTILES
+                )
+            )
+        for name, (hits, misses) in sorted(self.counters.items()):
+            total = hits + misses
+            ratio = hits / total if total else 0.0
+            lines.append(f"{name:<30} hits={hits} misses={misses} ({ratio:.1%})")
+        return "\n".join(lines)
+
+
+_V = typing.TypeVar("_V")
+
+
+def _split(items: dict[str, _V], prefix: str) -> tuple[dict[str, _V], dict[str, _V]]:
+    """(items whose name starts with prefix, the rest)"""
+    matched: dict[str, _V] = {}
+    rest: dict[str, _V] = {}
+    for name, value in items.items():
+        (matched if name.startswith(prefix) else rest)[name] = value
+    return matched, rest
+
+
+# shared by everything in this process
+timings = Timings()